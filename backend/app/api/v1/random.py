@@ -3,24 +3,51 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
 from app.schemas.user import UserOut
-from app.services.user_service import get_random_user_service
+from app.services.random_pool import RandomUserPool, get_random_pool
+from app.services.user_service import get_random_user_service, get_random_users_service
 
 router: APIRouter = APIRouter(prefix="/api/v1", tags=["random"])
 db_dependency = Depends(get_db)
+pool_dependency = Depends(get_random_pool)
 
 
-@router.get("/random", response_model=UserOut)
-async def get_random_user(db: AsyncSession = db_dependency) -> UserOut:
+@router.get("/random", response_model=UserOut | list[UserOut])
+async def get_random_user(
+    n: int | None = None,
+    seed: int | None = None,
+    db: AsyncSession = db_dependency,
+    pool: RandomUserPool = pool_dependency,
+) -> UserOut | list[UserOut]:
     """
-    Получает случайного пользователя из базы данных.
+    Получает случайного пользователя или, с параметром ``n``, список из ``n`` различных пользователей.
 
+    Пользователь берется из пула в Redis, а если пул пуст или Redis недоступен — из базы данных.
+    Параметр ``seed`` делает выборку воспроизводимой.
+
+    :param n: Количество пользователей (от 1 до ``RANDOM_MAX_BATCH``).
+    :type n: int | None
+    :param seed: Зерно генератора для воспроизводимой выборки.
+    :type seed: int | None
     :param db: Асинхронная сессия SQLAlchemy.
     :type db: AsyncSession
-    :returns: Данные случайного пользователя.
-    :rtype: UserOut
-    :raises HTTPException: Если в базе нет пользователей.
+    :param pool: Пул случайных пользователей.
+    :type pool: RandomUserPool
+    :returns: Данные случайного пользователя или список пользователей.
+    :rtype: UserOut | list[UserOut]
+    :raises HTTPException: Если в базе нет пользователей или n вне допустимого диапазона.
     """
-    user = await get_random_user_service(db)
+    if n is not None or seed is not None:
+        try:
+            users = await get_random_users_service(db, pool, n if n is not None else 1, seed)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        if n is None:
+            if not users:
+                raise HTTPException(status_code=404, detail="User not found") from None
+            return users[0]
+        return users
+
+    user = await pool.pick() or await get_random_user_service(db)
     if not user:
         raise HTTPException(status_code=404, detail="User not found") from None
     return user
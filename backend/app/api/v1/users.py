@@ -1,18 +1,24 @@
 from fastapi import (
     APIRouter,
     Depends,
+    Header,
     HTTPException,
+    Response,
 )
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.cache import RedisCache, get_cache
 from app.db.session import get_db
-from app.schemas.user import UserOut, UserUpdate
+from app.schemas.user import UserBatch, UserIds, UserImportJob, UserOut, UserUpdate
+from app.services.counters import CountMode, count_users_service
+from app.services.import_jobs import ImportJobManager, ImportJobStoreError, ImportQueueFullError, get_import_jobs
 from app.services.user_service import (
     delete_user_service,
     fetch_and_save_users,
-    get_user_service,
-    get_users_service,
+    get_user_body,
+    get_users_batch_service,
+    get_users_page_body,
     update_user_service,
 )
 
@@ -20,68 +26,239 @@ router: APIRouter = APIRouter(prefix="/api/v1", tags=["users"])
 
 db_dependency = Depends(get_db)
 redis_dependency = Depends(get_cache)
+jobs_dependency = Depends(get_import_jobs)
+if_none_match_header = Header(default=None)
 
 
-@router.post("/users/fetch", response_model=list[UserOut])
-async def fetch_users(count: int, db: AsyncSession = db_dependency) -> list[UserOut]:
+def cached_json_response(body: bytes, etag: str, if_none_match: str | None) -> Response:
+    """
+    Возвращает готовое JSON-тело с ETag или 304, если клиент уже имеет эту версию.
+
+    :param body: Закодированное тело ответа.
+    :type body: bytes
+    :param etag: ETag тела.
+    :type etag: str
+    :param if_none_match: Значение заголовка ``If-None-Match``.
+    :type if_none_match: str | None
+    :returns: Ответ 200 с телом или 304 без тела.
+    :rtype: Response
+    """
+    if if_none_match is not None:
+        # Для If-None-Match используется слабое сравнение: префикс W/ не учитывается
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@router.post("/users/fetch", response_model=list[UserOut], responses={202: {"model": UserImportJob}})
+async def fetch_users(
+    count: int,
+    background: bool = False,
+    db: AsyncSession = db_dependency,
+    jobs: ImportJobManager = jobs_dependency,
+) -> list[UserOut] | JSONResponse:
     """
     Загружает указанное количество пользователей из randomuser.me.
 
+    С ``background=true`` загрузка ставится в очередь фоновых задач, а ответ 202
+    сразу возвращает состояние задачи с ее идентификатором.
+
     :param count: Количество пользователей для загрузки.
     :type count: int
+    :param background: Выполнить загрузку в фоновой задаче.
+    :type background: bool
     :param db: Асинхронная сессия SQLAlchemy.
     :type db: AsyncSession
-    :returns: Список созданных пользователей.
-    :rtype: List[UserOut]
-    :raises HTTPException: Если count > 10000 или запрос к API не удался.
+    :param jobs: Менеджер фоновых задач загрузки.
+    :type jobs: ImportJobManager
+    :returns: Список созданных пользователей или состояние фоновой задачи.
+    :rtype: list[UserOut] | JSONResponse
+    :raises HTTPException: Если count превышает лимит, задачу не удалось поставить в очередь или запрос к API не удался.
     """
     try:
+        if background:
+            job = await jobs.submit(count)
+            return JSONResponse(status_code=202, content=job.model_dump(mode="json"))
+
         users: list[UserOut] = await fetch_and_save_users(db, count)
         return users
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
+    except (ImportQueueFullError, ImportJobStoreError) as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+
+
+@router.get("/users/fetch/{job_id}", response_model=UserImportJob)
+async def read_import_job(job_id: str, jobs: ImportJobManager = jobs_dependency) -> UserImportJob:
+    """
+    Получает состояние фоновой задачи загрузки пользователей.
+
+    :param job_id: Идентификатор задачи.
+    :type job_id: str
+    :param jobs: Менеджер фоновых задач загрузки.
+    :type jobs: ImportJobManager
+    :returns: Состояние задачи: статус и счетчики fetched, inserted, duplicates, failed, processed.
+    :rtype: UserImportJob
+    :raises HTTPException: Если задача не найдена.
+    """
+    job = await jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found") from None
+    return job
+
+
+@router.post("/users/fetch/{job_id}/resume", status_code=202, response_model=UserImportJob)
+async def resume_import_job(job_id: str, jobs: ImportJobManager = jobs_dependency) -> UserImportJob:
+    """
+    Возобновляет прерванную фоновую задачу загрузки с последней сохраненной точки.
+
+    :param job_id: Идентификатор задачи.
+    :type job_id: str
+    :param jobs: Менеджер фоновых задач загрузки.
+    :type jobs: ImportJobManager
+    :returns: Состояние поставленной в очередь задачи.
+    :rtype: UserImportJob
+    :raises HTTPException: Если задача не найдена, не может быть возобновлена или не удалось поставить ее в очередь.
+    """
+    try:
+        job = await jobs.resume(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    except (ImportQueueFullError, ImportJobStoreError) as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found") from None
+    return job
 
 
 @router.get("/users", response_model=list[UserOut])
 async def read_users(
-    limit: int = 10, offset: int = 0, db: AsyncSession = db_dependency, cache: RedisCache = redis_dependency
-) -> list[UserOut]:
+    limit: int = 10,
+    offset: int = 0,
+    after: str | None = None,
+    count: CountMode | None = None,
+    if_none_match: str | None = if_none_match_header,
+    db: AsyncSession = db_dependency,
+    cache: RedisCache = redis_dependency,
+) -> Response:
     """
     Получает список пользователей с пагинацией.
 
+    Курсор следующей страницы возвращается в заголовке ``X-Next-Cursor``;
+    передача его в ``after`` дает страницу, стоимость которой не зависит от глубины.
+    С параметром ``count`` общее количество пользователей возвращается в заголовке ``X-Total-Count``.
+    Тело ответа берется из кэша уже закодированным, минуя ``response_model``, вместе
+    с ETag; если он совпадает с ``If-None-Match``, возвращается 304 без тела.
+
     :param limit: Количество записей на страницу (по умолчанию 10).
     :type limit: int
     :param offset: Смещение для пагинации (по умолчанию 0).
     :type offset: int
+    :param after: Курсор из заголовка ``X-Next-Cursor`` предыдущей страницы.
+    :type after: str | None
+    :param count: Режим подсчета общего количества: ``exact``, ``estimate`` или ``auto``.
+    :type count: CountMode | None
+    :param if_none_match: ETag, полученные клиентом ранее.
+    :type if_none_match: str | None
     :param db: Асинхронная сессия SQLAlchemy.
     :type db: AsyncSession
     :param cache: Класс для работы с Redis кэшем.
     :type cache: RedisCache
-    :returns: Список пользователей.
-    :rtype: list[UserOut]
+    :returns: JSON-массив пользователей или 304.
+    :rtype: Response
+    :raises HTTPException: Если курсор поврежден или передан вместе с offset.
     """
-    return await get_users_service(db, cache, limit, offset)
+    if after is not None and offset:
+        raise HTTPException(status_code=400, detail="Use either after or offset, not both")
+    try:
+        body, next_cursor, etag = await get_users_page_body(db, cache, limit, offset, after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    response = cached_json_response(body, etag, if_none_match)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if count:
+        response.headers["X-Total-Count"] = str(await count_users_service(db, cache, count))
+    return response
+
+
+@router.get("/users/batch", response_model=UserBatch)
+async def read_users_batch(
+    ids: str, db: AsyncSession = db_dependency, cache: RedisCache = redis_dependency
+) -> UserBatch:
+    """
+    Получает пользователей по списку ID через запятую.
+
+    :param ids: ID пользователей через запятую, например ``1,2,3``.
+    :type ids: str
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :returns: Пользователи в порядке запроса и список ненайденных ID.
+    :rtype: UserBatch
+    :raises HTTPException: Если список ID некорректен или слишком длинный.
+    """
+    try:
+        user_ids = [int(user_id) for user_id in ids.split(",") if user_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers") from None
+    return await read_users_batch_by_body(UserIds(ids=user_ids), db, cache)
+
+
+@router.post("/users/batch", response_model=UserBatch)
+async def read_users_batch_by_body(
+    body: UserIds, db: AsyncSession = db_dependency, cache: RedisCache = redis_dependency
+) -> UserBatch:
+    """
+    Получает пользователей по списку ID из тела запроса.
+
+    :param body: Список ID пользователей.
+    :type body: UserIds
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :returns: Пользователи в порядке запроса и список ненайденных ID.
+    :rtype: UserBatch
+    :raises HTTPException: Если ID слишком много.
+    """
+    try:
+        return await get_users_batch_service(db, cache, body.ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
 
 
 @router.get("/users/{user_id}", response_model=UserOut)
-async def read_user(user_id: int, db: AsyncSession = db_dependency, cache: RedisCache = redis_dependency) -> UserOut:
+async def read_user(
+    user_id: int,
+    if_none_match: str | None = if_none_match_header,
+    db: AsyncSession = db_dependency,
+    cache: RedisCache = redis_dependency,
+) -> Response:
     """
     Получает пользователя по ID.
 
+    Тело ответа берется из кэша уже закодированным, минуя ``response_model``, вместе
+    с ETag; если он совпадает с ``If-None-Match``, возвращается 304 без тела.
+
     :param user_id: ID пользователя.
     :type user_id: int
+    :param if_none_match: ETag, полученные клиентом ранее.
+    :type if_none_match: str | None
     :param db: Асинхронная сессия SQLAlchemy.
     :type db: AsyncSession
     :param cache: Класс для работы с Redis кэшем.
     :type cache: RedisCache
-    :returns: Данные пользователя.
-    :rtype: UserOut
+    :returns: JSON пользователя или 304.
+    :rtype: Response
     :raises HTTPException: Если пользователь не найден.
     """
-    user = await get_user_service(db, cache, user_id)
-    if not user:
+    cached = await get_user_body(db, cache, user_id)
+    if cached is None:
         raise HTTPException(status_code=404, detail="User not found") from None
-    return user
+    return cached_json_response(*cached, if_none_match)
 
 
 @router.put("/users/{user_id}", response_model=UserOut)
@@ -1,28 +1,790 @@
+import asyncio
 import builtins
-import json
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+import importlib
+import math
+import random
+import time
+from typing import TypeVar
+from uuid import uuid4
+import zlib
 
+import pydantic_core
 import redis.asyncio as redis
 
 from app.core.config import settings
 from app.core.logging import logger
+from app.monitoring.prometheus import local_cache_entries, local_cache_events, redis_circuit_state
 
 JsonType = dict | list | str | int | float | bool
+T = TypeVar("T")
 
+# INCRBY только для существующего ключа: иначе счетчик появился бы со значением delta
+INCR_IF_EXISTS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return nil
+"""
 
-class RedisCache:
-    """Клиент для работы с Redis."""
+# Читает поля хеша {ARGV[1]}{версия}, где версия — текущее значение счетчика KEYS[1], за один проход.
+# Ключ хеша вычисляется в скрипте, поэтому скрипт рассчитан на Redis без кластера
+VERSIONED_HMGET_SCRIPT = """
+local version = redis.call('GET', KEYS[1]) or '0'
+local values = redis.call('HMGET', ARGV[1] .. version, unpack(ARGV, 2))
+table.insert(values, 1, version)
+return values
+"""
+
+# Записывает значения KEYS[1..n], только если их версии KEYS[n+1..2n] не изменились с момента чтения из БД.
+# ARGV[1] — TTL, ARGV[2..n+1] — прочитанные версии, ARGV[n+2..2n+1] — значения
+SET_IF_VERSION_SCRIPT = """
+local n = #KEYS / 2
+local written = {}
+for i = 1, n do
+    written[i] = 0
+    if (redis.call('GET', KEYS[n + i]) or '0') == ARGV[i + 1] then
+        redis.call('SET', KEYS[i], ARGV[n + i + 1], 'EX', ARGV[1])
+        written[i] = 1
+    end
+end
+return written
+"""
+# Записывает значения KEYS[2..], только если общий счетчик версий KEYS[1] не изменился с момента чтения из БД.
+# ARGV[1] — прочитанная версия, ARGV[2] — TTL, ARGV[3..] — значения
+SET_MANY_IF_VERSION_SCRIPT = """
+if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] then
+    return 0
+end
+for i = 2, #KEYS do
+    redis.call('SET', KEYS[i], ARGV[i + 1], 'EX', ARGV[2])
+end
+return 1
+"""
+# Время хранения версии ключа, в секундах; должно с запасом превышать время загрузки значения из БД
+VERSION_TTL = 86400
+
+# Снимает блокировку, только если она все еще принадлежит вызывающему (не истекла и не перехвачена)
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+# Интервал проверки чужой блокировки загрузки, в секундах
+LOCK_POLL_INTERVAL = 0.05
+
+# Сколько секунд ключ считается обновляемым другим воркером после начала фонового обновления
+REFRESH_LOCK_TTL = 10
+
+# Тег формата значения в первом байте: сериализатор в младших битах, сжатие — в старших.
+# Значения без тега начинаются с печатного символа JSON, поэтому теги не пересекаются с ними
+CODEC_JSON = 0x01
+CODEC_MSGPACK = 0x02
+CODEC_ZLIB = 0x80
+CODEC_ZSTD = 0x40
+CODEC_SERIALIZER_MASK = 0x0F
+CODEC_TAGS = frozenset(
+    serializer | compression
+    for serializer in (CODEC_JSON, CODEC_MSGPACK)
+    for compression in (0, CODEC_ZLIB, CODEC_ZSTD)
+)
+
+# Ключи, которые дополнительно кэшируются в памяти процесса
+LOCAL_CACHE_PREFIX = "user:"
+# Канал pub/sub, через который воркеры сообщают друг другу об удаленных ключах
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+def version_key(key: str) -> str:
+    """
+    Возвращает ключ счетчика версий значения.
+
+    :param key: Ключ значения.
+    :type key: str
+    :returns: Ключ счетчика версий.
+    :rtype: str
+    """
+    return f"version:{key}"
+
+
+class CircuitBreaker:
+    """
+    Автомат отключения Redis при повторяющихся ошибках.
+
+    После ``threshold`` ошибок подряд цепь размыкается, и на ``cooldown`` секунд
+    обращения к Redis не выполняются. Затем цепь становится полуоткрытой: пропускается
+    одно пробное обращение, успех которого замыкает цепь, а ошибка снова размыкает ее.
+    Состояние экспортируется в метрику ``redis_circuit_state``.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, threshold: int, cooldown: float) -> None:
+        """
+        Инициализирует замкнутую цепь.
+
+        :param threshold: Количество ошибок подряд, после которого цепь размыкается (0 — никогда).
+        :type threshold: int
+        :param cooldown: Время в разомкнутом состоянии до пробного обращения, в секундах.
+        :type cooldown: float
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._set_state(self.CLOSED)
+
+    def allow(self) -> bool:
+        """
+        Решает, можно ли обратиться к Redis.
+
+        :returns: True для замкнутой цепи и для единственного пробного обращения после ``cooldown``.
+        :rtype: bool
+        """
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Отмечает успешное обращение и замыкает цепь."""
+        self.failures = 0
+        self._probing = False
+        if self.state != self.CLOSED:
+            logger.info("Redis circuit breaker closed")
+            self._set_state(self.CLOSED)
+
+    def release(self) -> None:
+        """
+        Завершает пробное обращение, даже если оно прервано без результата.
+
+        Без этого отмененное пробное обращение оставило бы цепь полуоткрытой навсегда:
+        :meth:`allow` не пропускает второе пробное обращение, пока идет первое.
+        """
+        self._probing = False
+
+    def record_failure(self) -> None:
+        """Отмечает ошибку и размыкает цепь, если ошибок слишком много или не удалось пробное обращение."""
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or (self.threshold and self.failures >= self.threshold):
+            if self.state != self.OPEN:
+                logger.warning(f"Redis circuit breaker opened for {self.cooldown}s after {self.failures} failures")
+            self._opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def _set_state(self, state: int) -> None:
+        """
+        Меняет состояние и обновляет метрику.
+
+        :param state: Новое состояние.
+        :type state: int
+        """
+        self.state = state
+        redis_circuit_state.set(state)
+
+
+class LocalCache:
+    """
+    Кэш в памяти процесса перед Redis: LRU с ограничением размера и TTL записей.
+
+    Значения хранятся уже декодированными и возвращаются без копирования,
+    поэтому вызывающий код не должен их изменять.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        """
+        Инициализирует пустой кэш.
+
+        :param max_size: Максимальное количество записей.
+        :type max_size: int
+        :param ttl: Время жизни записи в секундах.
+        :type ttl: float
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, JsonType]] = OrderedDict()
+
+    def get(self, key: str) -> JsonType | None:
+        """
+        Получает значение, если оно есть и не истекло.
+
+        :param key: Ключ кэша.
+        :type key: str
+        :returns: Значение или None.
+        :rtype: JsonType | None
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            local_cache_events.labels("miss").inc()
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        local_cache_events.labels("hit").inc()
+        return entry[1]
+
+    def set(self, key: str, value: JsonType) -> None:
+        """
+        Сохраняет значение, вытесняя самые давно использованные записи при переполнении.
+
+        :param key: Ключ кэша.
+        :type key: str
+        :param value: Значение.
+        :type value: JsonType
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+            local_cache_events.labels("eviction").inc()
+        local_cache_entries.set(len(self._entries))
+
+    def delete(self, key: str) -> None:
+        """
+        Удаляет значение.
+
+        :param key: Ключ кэша.
+        :type key: str
+        """
+        self._entries.pop(key, None)
+        local_cache_entries.set(len(self._entries))
+
+    def clear(self) -> None:
+        """Удаляет все значения."""
+        self._entries.clear()
+        local_cache_entries.set(0)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Возвращает статистику кэша.
+
+        :returns: Количество попаданий, промахов, вытеснений и текущий размер.
+        :rtype: dict[str, int]
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._entries)}
+
+
+class CacheCodec:
+    """
+    Кодирует значения кэша в байты и обратно.
+
+    Значение сериализуется в JSON (``pydantic_core``) или msgpack и, если результат
+    длиннее ``compress_threshold`` байт, сжимается zlib или zstd. Первый байт — тег
+    формата, поэтому значения, записанные с другими настройками кодека, читаются
+    без очистки Redis. Значения без тега (JSON-текст прежних версий) читаются как JSON.
+    Целые числа пишутся без тега десятичной строкой, чтобы к ним применялись ``INCR``
+    и ``INCRBY``. Для msgpack и zstd нужны пакеты ``msgpack`` и ``zstandard``;
+    если они не установлены, используются JSON и zlib.
+    """
+
+    def __init__(self, serializer: str = "json", compression: str = "zlib", compress_threshold: int = 1024) -> None:
+        """
+        Инициализирует кодек.
+
+        :param serializer: Формат сериализации: ``json`` или ``msgpack``.
+        :type serializer: str
+        :param compression: Алгоритм сжатия: ``zlib``, ``zstd`` или ``none``.
+        :type compression: str
+        :param compress_threshold: Минимальный размер сериализованного значения для сжатия, в байтах.
+        :type compress_threshold: int
+        :raises ValueError: Если формат или алгоритм неизвестен.
+        """
+        if serializer not in ("json", "msgpack") or compression not in ("zlib", "zstd", "none"):
+            raise ValueError(f"Unknown cache codec: {serializer}/{compression}")
+        self._msgpack = self._import("msgpack")
+        self._zstd = self._import("zstandard")
+        if serializer == "msgpack" and self._msgpack is None:
+            logger.warning("msgpack is not installed, cached values are encoded as JSON")
+            serializer = "json"
+        if compression == "zstd" and self._zstd is None:
+            logger.warning("zstandard is not installed, cached values are compressed with zlib")
+            compression = "zlib"
+        self.serializer = CODEC_MSGPACK if serializer == "msgpack" else CODEC_JSON
+        self.compression = {"zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD, "none": 0}[compression]
+        self.compress_threshold = compress_threshold
+
+    @staticmethod
+    def _import(name: str) -> object | None:
+        """
+        Импортирует необязательный модуль.
+
+        :param name: Имя модуля.
+        :type name: str
+        :returns: Модуль или None, если он не установлен.
+        :rtype: object | None
+        """
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            return None
+
+    def encode(self, value: JsonType) -> bytes:
+        """
+        Кодирует значение.
+
+        :param value: Значение.
+        :type value: JsonType
+        :returns: Тег формата и закодированное значение.
+        :rtype: bytes
+        """
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+
+        if self.serializer == CODEC_MSGPACK:
+            data = self._msgpack.packb(value, default=str)
+        else:
+            data = pydantic_core.to_json(value, fallback=str)
+
+        tag = self.serializer
+        if self.compression and len(data) > self.compress_threshold:
+            tag |= self.compression
+            data = zlib.compress(data, 1) if self.compression == CODEC_ZLIB else self._zstd.compress(data)
+        return bytes([tag]) + data
+
+    def decode(self, data: bytes) -> JsonType:
+        """
+        Декодирует значение, записанное любым кодеком или без тега.
+
+        :param data: Закодированное значение.
+        :type data: bytes
+        :returns: Значение.
+        :rtype: JsonType
+        :raises ValueError: Если формат требует неустановленного пакета или данные повреждены.
+        """
+        tag = data[0]
+        if tag not in CODEC_TAGS:
+            # Значение без тега: JSON-текст или целое число
+            return pydantic_core.from_json(data)
+
+        payload = data[1:]
+        if tag & CODEC_ZLIB:
+            payload = zlib.decompress(payload)
+        elif tag & CODEC_ZSTD:
+            if self._zstd is None:
+                raise ValueError("Cached value is compressed with zstd, but zstandard is not installed")
+            payload = self._zstd.decompress(payload)
+
+        if tag & CODEC_SERIALIZER_MASK == CODEC_MSGPACK:
+            if self._msgpack is None:
+                raise ValueError("Cached value is encoded with msgpack, but msgpack is not installed")
+            return self._msgpack.unpackb(payload)
+        return pydantic_core.from_json(payload)
+
+
+class CachePolicy:
+    """
+    Мягкое истечение записей одного семейства ключей.
+
+    Значение хранится в конверте ``{"value", "expires", "delta"}``. После ``expires``
+    (через ``ttl`` секунд после записи) оно считается устаревшим, но еще ``stale_ttl``
+    секунд отдается из кэша, пока обновляется в фоне. С ``beta > 0`` обновление
+    запускается и до ``expires`` с вероятностью, которая растет по мере приближения
+    к нему и пропорциональна времени загрузки значения ``delta`` (XFetch).
+    """
+
+    def __init__(self, ttl: int, stale_ttl: int = 0, beta: float = 0.0) -> None:
+        """
+        Инициализирует политику.
+
+        :param ttl: Через сколько секунд после записи значение устаревает.
+        :type ttl: int
+        :param stale_ttl: Сколько секунд устаревшее значение еще отдается из кэша.
+        :type stale_ttl: int
+        :param beta: Коэффициент досрочного обновления XFetch (0 — отключено).
+        :type beta: float
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.beta = beta
+
+    @property
+    def hard_ttl(self) -> int:
+        """Время жизни ключа в Redis."""
+        return self.ttl + self.stale_ttl
+
+    def wrap(self, value: JsonType, delta: float = 0.0) -> dict:
+        """
+        Оборачивает значение в конверт с мягким истечением.
+
+        :param value: Значение.
+        :type value: JsonType
+        :param delta: Время загрузки значения в секундах.
+        :type delta: float
+        :returns: Конверт для записи в кэш.
+        :rtype: dict
+        """
+        return {"value": value, "expires": time.time() + self.ttl, "delta": delta}
+
+    def unwrap(self, entry: JsonType | None) -> tuple[JsonType | None, bool]:
+        """
+        Извлекает значение из конверта и решает, пора ли его обновить.
+
+        :param entry: Прочитанная из кэша запись.
+        :type entry: JsonType | None
+        :returns: Значение (None, если записи нет или она не в конверте) и признак необходимости обновления.
+        :rtype: tuple[JsonType | None, bool]
+        """
+        if not isinstance(entry, dict) or "expires" not in entry:
+            return None, False
+        now = time.time()
+        if self.beta > 0:
+            # -log(u) > 0, поэтому момент обновления сдвигается раньше expires
+            now -= entry["delta"] * self.beta * math.log(1 - random.random())
+        return entry["value"], now >= entry["expires"]
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные загрузки одного ключа внутри процесса.
+
+    Первый вызов :meth:`do` запускает загрузку отдельной задачей, остальные вызовы
+    с тем же ключом ждут ее результата или исключения, пока она не завершится.
+    """
 
     def __init__(self) -> None:
-        """Инициализирует RedisCache без немедленного подключения."""
+        """Инициализирует пустой реестр загрузок."""
+        self._calls: dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, load: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет загрузку ключа или присоединяется к уже выполняющейся.
+
+        :param key: Ключ загрузки.
+        :type key: str
+        :param load: Функция загрузки.
+        :type load: Callable[[], Awaitable[T]]
+        :returns: Результат загрузки.
+        :rtype: T
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(load())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # Отмена одного из ожидающих запросов не отменяет загрузку для остальных
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        """
+        Удаляет завершенную загрузку из реестра.
+
+        :param key: Ключ загрузки.
+        :type key: str
+        :param task: Завершенная задача загрузки.
+        :type task: asyncio.Task
+        """
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Исключение считается полученным, даже если все ожидающие запросы были отменены
+        if not task.cancelled():
+            task.exception()
+
+
+class CachePipeline:
+    """
+    Накопитель команд для :meth:`RedisCache.pipeline`.
+
+    Методы только ставят команды в очередь, сериализуя значения так же, как :class:`RedisCache`;
+    все команды отправляются одним проходом по сети при выходе из контекста.
+    """
+
+    def __init__(self, pipe: redis.client.Pipeline, codec: CacheCodec, local: LocalCache | None = None) -> None:
+        """
+        Оборачивает конвейер redis-py.
+
+        :param pipe: Конвейер redis-py.
+        :type pipe: redis.client.Pipeline
+        :param codec: Кодек значений.
+        :type codec: CacheCodec
+        :param local: Кэш процесса, который обновляется вместе с Redis.
+        :type local: LocalCache | None
+        """
+        self._pipe = pipe
+        self._codec = codec
+        self._local = local
+
+    def set(self, key: str, value: JsonType, ttl: int = 60) -> None:
+        """
+        Ставит в очередь запись значения с TTL.
+
+        :param key: Ключ кэша.
+        :type key: str
+        :param value: Значение для кэширования.
+        :type value: JsonType
+        :param ttl: Время жизни кэша в секундах.
+        :type ttl: int
+        """
+        self._pipe.setex(key, ttl, self._codec.encode(value))
+        if self._local is not None and key.startswith(LOCAL_CACHE_PREFIX):
+            self._local.set(key, value)
+
+    def set_versioned(self, key: str, value: JsonType, ttl: int = 60) -> None:
+        """
+        Ставит в очередь запись нового значения вместе с увеличением его версии.
+
+        Значение, прочитанное из БД до этой записи, :meth:`RedisCache.set_many_if_unchanged`
+        уже не запишет поверх нового. Кэш процесса остальных воркеров инвалидируется.
+
+        :param key: Ключ кэша.
+        :type key: str
+        :param value: Значение для кэширования.
+        :type value: JsonType
+        :param ttl: Время жизни кэша в секундах.
+        :type ttl: int
+        """
+        self.bump_version(key)
+        self._pipe.setex(key, ttl, self._codec.encode(value))
+        self._invalidate_local(key)
+
+    def set_many_if_version(self, mapping: dict[str, JsonType], version_key: str, version: int, ttl: int = 60) -> None:
+        """
+        Ставит в очередь запись значений, если счетчик ``version_key`` не изменился.
+
+        Нужна, когда ключи значений неизвестны до запроса к БД и их версии нельзя прочитать
+        заранее: тогда до запроса читается общий счетчик, который увеличивает любое изменение.
+        В кэш процесса значения не попадают, потому что результат проверки станет известен
+        только после выполнения конвейера.
+
+        :param mapping: Ключи и значения для кэширования.
+        :type mapping: dict[str, JsonType]
+        :param version_key: Ключ общего счетчика версий.
+        :type version_key: str
+        :param version: Значение счетчика, прочитанное до запроса к БД.
+        :type version: int
+        :param ttl: Время жизни кэша в секундах.
+        :type ttl: int
+        """
+        if not mapping:
+            return
+        values = (self._codec.encode(value) for value in mapping.values())
+        self._pipe.eval(SET_MANY_IF_VERSION_SCRIPT, 1 + len(mapping), version_key, *mapping, version, ttl, *values)
+
+    def bump_version(self, key: str) -> None:
+        """
+        Ставит в очередь увеличение версии значения.
+
+        :param key: Ключ значения.
+        :type key: str
+        """
+        self._pipe.incr(version_key(key))
+        self._pipe.expire(version_key(key), VERSION_TTL)
+
+    def delete(self, *keys: str) -> None:
+        """
+        Ставит в очередь удаление ключей.
+
+        Ключи, кэшируемые в памяти процесса, удаляются из нее сразу, а остальным
+        воркерам об их удалении сообщается через pub/sub в том же конвейере.
+
+        :param keys: Ключи кэша.
+        :type keys: str
+        """
+        if not keys:
+            return
+        self._pipe.delete(*keys)
+        for key in keys:
+            self._invalidate_local(key)
+
+    def _invalidate_local(self, key: str) -> None:
+        """
+        Удаляет ключ из кэша процесса и ставит в очередь сообщение об этом остальным воркерам.
+
+        :param key: Ключ кэша.
+        :type key: str
+        """
+        if self._local is not None and key.startswith(LOCAL_CACHE_PREFIX):
+            self._local.delete(key)
+            self._pipe.publish(INVALIDATION_CHANNEL, key)
+
+    def setbit(self, key: str, offset: int, value: int) -> None:
+        """
+        Ставит в очередь установку бита строки.
+
+        :param key: Ключ строки.
+        :type key: str
+        :param offset: Номер бита.
+        :type offset: int
+        :param value: Значение бита (0 или 1).
+        :type value: int
+        """
+        self._pipe.setbit(key, offset, value)
+
+    def sadd(self, key: str, *members: str) -> None:
+        """
+        Ставит в очередь добавление элементов в множество.
+
+        :param key: Ключ множества.
+        :type key: str
+        :param members: Элементы множества.
+        :type members: str
+        """
+        self._pipe.sadd(key, *members)
+
+    def incr(self, key: str) -> None:
+        """
+        Ставит в очередь увеличение счетчика на 1.
+
+        :param key: Ключ счетчика.
+        :type key: str
+        """
+        self._pipe.incr(key)
+
+    def incr_if_exists(self, key: str, amount: int) -> None:
+        """
+        Ставит в очередь увеличение счетчика, если ключ существует.
+
+        :param key: Ключ счетчика.
+        :type key: str
+        :param amount: Величина изменения.
+        :type amount: int
+        """
+        self._pipe.eval(INCR_IF_EXISTS_SCRIPT, 1, key, amount)
+
+    def eval(self, script: str, keys: list[str], args: list[str | int]) -> None:
+        """
+        Ставит в очередь выполнение Lua-скрипта.
+
+        :param script: Текст скрипта.
+        :type script: str
+        :param keys: Ключи скрипта (KEYS).
+        :type keys: list[str]
+        :param args: Аргументы скрипта (ARGV).
+        :type args: list[str | int]
+        """
+        self._pipe.eval(script, len(keys), *keys, *args)
+
+
+class RedisCache:
+    """
+    Клиент для работы с Redis.
+
+    Если передан :class:`LocalCache`, ключи с префиксом ``LOCAL_CACHE_PREFIX`` дополнительно
+    кэшируются в памяти процесса. Удаление таких ключей рассылается всем воркерам через
+    pub/sub (:meth:`start_listener`), а TTL записей ограничивает устаревание при потере сообщений.
+    """
+
+    def __init__(
+        self,
+        local: LocalCache | None = None,
+        codec: CacheCodec | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        """
+        Инициализирует RedisCache без немедленного подключения.
+
+        :param local: Кэш процесса перед Redis.
+        :type local: LocalCache | None
+        :param codec: Кодек значений (по умолчанию JSON со сжатием zlib).
+        :type codec: CacheCodec | None
+        :param breaker: Автомат отключения Redis (по умолчанию из настроек ``REDIS_BREAKER_*``).
+        :type breaker: CircuitBreaker | None
+        """
         self._client: redis.Redis | None = None
+        self._raw_client: redis.Redis | None = None
+        self.local = local
+        self.codec = codec or CacheCodec()
+        self.breaker = breaker or CircuitBreaker(settings.REDIS_BREAKER_THRESHOLD, settings.REDIS_BREAKER_COOLDOWN)
+        self._listener: asyncio.Task | None = None
+        self._flights = SingleFlight()
+        self._refreshing: dict[str, asyncio.Task] = {}
 
     @property
     def client(self) -> redis.Redis:
         """Лениво создает и возвращает клиент Redis."""
         if self._client is None:
-            self._client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+            self._client = self._connect(decode_responses=True)
         return self._client
 
+    @property
+    def raw_client(self) -> redis.Redis:
+        """Лениво создает и возвращает клиент Redis, возвращающий значения в байтах без декодирования."""
+        if self._raw_client is None:
+            self._raw_client = self._connect(decode_responses=False)
+        return self._raw_client
+
+    @staticmethod
+    def _connect(decode_responses: bool) -> redis.Redis:
+        """
+        Создает клиент Redis с таймаутами подключения и операций из настроек.
+
+        :param decode_responses: Декодировать ли ответы в строки.
+        :type decode_responses: bool
+        :returns: Клиент Redis.
+        :rtype: redis.Redis
+        """
+        return redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=decode_responses,
+            socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+
+    async def execute(self, operation: str, call: Callable[[], Awaitable[T]], default: T) -> T:
+        """
+        Выполняет обращение к Redis через :class:`CircuitBreaker`.
+
+        Ошибка логируется и заменяется значением ``default``. Пока цепь разомкнута,
+        обращение не выполняется и сразу возвращается ``default``, поэтому вызывающий
+        код без ожидания таймаутов переходит к загрузке из БД.
+
+        :param operation: Название операции для лога.
+        :type operation: str
+        :param call: Обращение к Redis.
+        :type call: Callable[[], Awaitable[T]]
+        :param default: Результат при ошибке или разомкнутой цепи.
+        :type default: T
+        :returns: Результат обращения или ``default``.
+        :rtype: T
+        """
+        if not self.breaker.allow():
+            return default
+        try:
+            result = await call()
+        except Exception as e:
+            self.breaker.record_failure()
+            logger.error(f"Redis {operation} error: {e}")
+            return default
+        finally:
+            self.breaker.release()
+        self.breaker.record_success()
+        return result
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = False) -> AsyncIterator[CachePipeline]:
+        """
+        Группирует команды в один проход по сети.
+
+        Команды, поставленные в :class:`CachePipeline` внутри блока ``async with``,
+        отправляются при выходе из него. С ``transaction=True`` они выполняются
+        атомарно в ``MULTI/EXEC``. Ошибки Redis логируются и не пробрасываются,
+        при разомкнутой цепи команды отбрасываются.
+
+        :param transaction: Выполнить команды в транзакции.
+        :type transaction: bool
+        :returns: Накопитель команд.
+        :rtype: AsyncIterator[CachePipeline]
+        """
+        async with self.client.pipeline(transaction=transaction) as pipe:
+            yield CachePipeline(pipe, self.codec, self.local)
+            await self.execute("pipeline", pipe.execute, None)
+
     async def get(self, key: str) -> JsonType | None:
         """
         Получает значение из кэша по ключу.
@@ -32,12 +794,14 @@ class RedisCache:
         :returns: Значение из кэша или None.
         :rtype: Optional[Any]
         """
-        try:
-            value = await self.client.get(key)
-            return json.loads(value) if value else None
-        except Exception as e:
-            logger.error(f"Redis get error: {e}")
-            return None
+        local = self._local_for(key)
+        if local is not None and (value := local.get(key)) is not None:
+            return value
+
+        decoded = self._decode(key, await self.execute("get", lambda: self.raw_client.get(key), None))
+        if local is not None and decoded is not None:
+            local.set(key, decoded)
+        return decoded
 
     async def set(self, key: str, value: JsonType, ttl: int = 60) -> None:
         """
@@ -51,10 +815,131 @@ class RedisCache:
         :type ttl: int
         :returns: None
         """
-        try:
-            await self.client.setex(key, ttl, json.dumps(value, default=str))
-        except Exception as e:
-            logger.error(f"Redis set error: {e}")
+        if not await self.execute("set", lambda: self.raw_client.setex(key, ttl, self.codec.encode(value)), False):
+            return
+        if (local := self._local_for(key)) is not None:
+            local.set(key, value)
+
+    async def get_many(self, keys: list[str]) -> list[JsonType | None]:
+        """
+        Получает значения нескольких ключей одним ``MGET``.
+
+        :param keys: Ключи кэша.
+        :type keys: list[str]
+        :returns: Значения в порядке ключей, None для отсутствующих.
+        :rtype: list[JsonType | None]
+        """
+        results: dict[str, JsonType | None] = {}
+        for key in keys:
+            if (local := self._local_for(key)) is not None and (value := local.get(key)) is not None:
+                results[key] = value
+
+        remote = [key for key in keys if key not in results]
+        if remote:
+            values = await self.execute("mget", lambda: self.raw_client.mget(remote), [None] * len(remote))
+            for key, value in zip(remote, values, strict=True):
+                results[key] = self._decode(key, value)
+                if results[key] is not None and (local := self._local_for(key)) is not None:
+                    local.set(key, results[key])
+
+        return [results[key] for key in keys]
+
+    async def set_many(self, mapping: dict[str, JsonType], ttl: int = 60) -> None:
+        """
+        Устанавливает несколько значений с общим TTL за один проход по сети.
+
+        :param mapping: Ключи и значения для кэширования.
+        :type mapping: dict[str, JsonType]
+        :param ttl: Время жизни кэша в секундах.
+        :type ttl: int
+        :returns: None
+        """
+        async with self.pipeline() as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, ttl)
+
+    async def get_versions(self, keys: list[str]) -> dict[str, str] | None:
+        """
+        Читает текущие версии значений перед их загрузкой из БД.
+
+        :param keys: Ключи значений.
+        :type keys: list[str]
+        :returns: Версии по ключам или None, если Redis недоступен.
+        :rtype: dict[str, str] | None
+        """
+        versions = await self.execute("mget", lambda: self.client.mget([version_key(key) for key in keys]), None)
+        if versions is None:
+            return None
+        return {key: version or "0" for key, version in zip(keys, versions, strict=True)}
+
+    async def set_many_if_unchanged(
+        self, mapping: dict[str, JsonType], versions: dict[str, str], ttl: int = 60
+    ) -> None:
+        """
+        Устанавливает значения, версии которых не изменились с момента :meth:`get_versions`.
+
+        Проверка и запись выполняются одним Lua-скриптом, поэтому значение, прочитанное
+        из БД до конкурентного обновления, не перезапишет записанное им новое.
+
+        :param mapping: Ключи и значения для кэширования.
+        :type mapping: dict[str, JsonType]
+        :param versions: Версии, прочитанные до загрузки значений.
+        :type versions: dict[str, str]
+        :param ttl: Время жизни кэша в секундах.
+        :type ttl: int
+        :returns: None
+        """
+        keys = list(mapping)
+        args = [ttl, *(versions[key] for key in keys), *(self.codec.encode(mapping[key]) for key in keys)]
+        written = await self.execute(
+            "eval",
+            lambda: self.raw_client.eval(SET_IF_VERSION_SCRIPT, 2 * len(keys), *keys, *map(version_key, keys), *args),
+            [],
+        )
+        if self.local is None:
+            return
+        for key, ok in zip(keys, written, strict=False):
+            if ok and key.startswith(LOCAL_CACHE_PREFIX):
+                self.local.set(key, mapping[key])
+
+    async def hmget_bytes(self, key: str, fields: list[str]) -> list[bytes | None]:
+        """
+        Получает поля хеша без декодирования, например готовое тело ответа.
+
+        :param key: Ключ хеша.
+        :type key: str
+        :param fields: Поля хеша.
+        :type fields: list[str]
+        :returns: Значения полей (None для отсутствующих).
+        :rtype: list[bytes | None]
+        """
+        return await self.execute("hmget", lambda: self.raw_client.hmget(key, fields), [None] * len(fields))
+
+    async def get_versioned(
+        self, version_key: str, key_prefix: str, fields: list[str]
+    ) -> tuple[int, list[bytes | None]]:
+        """
+        Читает поля хеша ``{key_prefix}{версия}`` вместе с текущей версией за один проход по сети.
+
+        Версией служит счетчик ``version_key``: его увеличение делает все прежние хеши
+        недостижимыми. Возвращенную версию следует использовать в ключе при записи
+        значения, загруженного после промаха.
+
+        :param version_key: Ключ счетчика версии.
+        :type version_key: str
+        :param key_prefix: Префикс ключа хеша.
+        :type key_prefix: str
+        :param fields: Поля хеша.
+        :type fields: list[str]
+        :returns: Версия (0, если счетчика нет) и значения полей без декодирования (None для отсутствующих).
+        :rtype: tuple[int, list[bytes | None]]
+        """
+        version, *values = await self.execute(
+            "eval",
+            lambda: self.raw_client.eval(VERSIONED_HMGET_SCRIPT, 1, version_key, key_prefix, *fields),
+            [0] + [None] * len(fields),
+        )
+        return int(version), values
 
     async def delete(self, key: str | tuple) -> None:
         """
@@ -64,13 +949,18 @@ class RedisCache:
         :type key: str
         :returns: None
         """
-        try:
-            if isinstance(key, tuple):
-                await self.client.delete(*key)
-            else:
-                await self.client.delete(key)
-        except Exception as e:
-            logger.error(f"Redis delete error: {e}")
+        await self.delete_many(list(key) if isinstance(key, tuple) else [key])
+
+    async def delete_many(self, keys: list[str]) -> None:
+        """
+        Удаляет несколько ключей одной командой ``DEL``.
+
+        :param keys: Ключи кэша.
+        :type keys: list[str]
+        :returns: None
+        """
+        async with self.pipeline() as pipe:
+            pipe.delete(*keys)
 
     async def sadd(self, key: str, member: str) -> None:
         """
@@ -82,10 +972,7 @@ class RedisCache:
         :type member: str
         :returns: None
         """
-        try:
-            await self.client.sadd(key, member)
-        except Exception as e:
-            logger.error(f"Redis sadd error: {e}")
+        await self.execute("sadd", lambda: self.client.sadd(key, member), None)
 
     async def smembers(self, key: str) -> builtins.set[str]:
         """
@@ -96,11 +983,66 @@ class RedisCache:
         :returns: Множество элементов.
         :rtype: Set[str]
         """
-        try:
-            return await self.client.smembers(key)
-        except Exception as e:
-            logger.error(f"Redis smembers error: {e}")
-            return set()
+        return await self.execute("smembers", lambda: self.client.smembers(key), set())
+
+    async def hset(self, key: str, mapping: dict[str, str | bytes | int | float], ttl: int | None = None) -> bool:
+        """
+        Записывает поля хеша Redis и, при необходимости, обновляет его TTL.
+
+        :param key: Ключ хеша.
+        :type key: str
+        :param mapping: Поля и значения для записи.
+        :type mapping: dict[str, str | bytes | int | float]
+        :param ttl: Время жизни хеша в секундах.
+        :type ttl: int | None
+        :returns: True, если поля записаны; False, если Redis недоступен или цепь разомкнута.
+        :rtype: bool
+        """
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping=mapping)
+            if ttl:
+                pipe.expire(key, ttl)
+            return await self.execute("hset", pipe.execute, None) is not None
+
+    async def getbits(self, key: str, offsets: list[int]) -> list[int] | None:
+        """
+        Читает биты строки одной командой ``BITFIELD``.
+
+        :param key: Ключ строки.
+        :type key: str
+        :param offsets: Номера битов.
+        :type offsets: list[int]
+        :returns: Значения битов (0 за пределами строки) или None, если Redis недоступен.
+        :rtype: list[int] | None
+        """
+        bitfield = self.client.bitfield(key)
+        for offset in offsets:
+            bitfield.get("u1", offset)
+        return await self.execute("bitfield", bitfield.execute, None)
+
+    async def hgetall(self, key: str) -> dict[str, str]:
+        """
+        Получает все поля хеша Redis.
+
+        :param key: Ключ хеша.
+        :type key: str
+        :returns: Поля и значения хеша, пустой словарь если ключа нет.
+        :rtype: dict[str, str]
+        """
+        return await self.execute("hgetall", lambda: self.client.hgetall(key), {})
+
+    async def incr_if_exists(self, key: str, amount: int) -> int | None:
+        """
+        Атомарно увеличивает числовое значение ключа, если ключ существует.
+
+        :param key: Ключ счетчика.
+        :type key: str
+        :param amount: Величина изменения (может быть отрицательной).
+        :type amount: int
+        :returns: Новое значение или None, если ключа нет.
+        :rtype: int | None
+        """
+        return await self.execute("incr", lambda: self.client.eval(INCR_IF_EXISTS_SCRIPT, 1, key, amount), None)
 
     async def clear_set(self, key: str) -> None:
         """
@@ -115,23 +1057,209 @@ class RedisCache:
         :returns: None
         :raises: Логирует ошибку в случае сбоя операции Redis, не выбрасывая исключение.
         """
+        members = await self.smembers(key)
+        if members:
+            await self.execute("srem", lambda: self.client.srem(key, *members), None)
+
+    async def single_flight(self, key: str, load: Callable[[], Awaitable[T]]) -> T:
+        """
+        Загружает отсутствующее в кэше значение так, чтобы одновременные промахи не дублировали загрузку.
+
+        Внутри процесса вызовы с одним ключом объединяются через :class:`SingleFlight`.
+        Если ``SINGLE_FLIGHT_LOCK_TTL`` больше нуля, загрузку дополнительно выполняет только
+        воркер, взявший блокировку ``lock:{key}`` в Redis, а остальные ждут ее снятия
+        (не дольше TTL блокировки) и затем вызывают ``load`` сами. Поэтому ``load`` должна
+        сначала перечитывать кэш, который к этому моменту уже заполнил другой воркер.
+
+        :param key: Ключ кэша.
+        :type key: str
+        :param load: Функция, читающая значение из кэша или загружающая и кэширующая его.
+        :type load: Callable[[], Awaitable[T]]
+        :returns: Результат загрузки.
+        :rtype: T
+        """
+        if not settings.SINGLE_FLIGHT_LOCK_TTL:
+            return await self._flights.do(key, load)
+        return await self._flights.do(key, lambda: self._load_locked(key, load))
+
+    async def _load_locked(self, key: str, load: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет загрузку под блокировкой Redis.
+
+        :param key: Ключ кэша.
+        :type key: str
+        :param load: Функция загрузки.
+        :type load: Callable[[], Awaitable[T]]
+        :returns: Результат загрузки.
+        :rtype: T
+        """
+        lock_key, token = f"lock:{key}", uuid4().hex
+        if not await self._acquire_or_wait(lock_key, token, settings.SINGLE_FLIGHT_LOCK_TTL):
+            return await load()
+        try:
+            return await load()
+        finally:
+            await self.execute("unlock", lambda: self.client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token), None)
+
+    async def _acquire_or_wait(self, lock_key: str, token: str, ttl: float) -> bool:
+        """
+        Берет блокировку или ждет, пока ее снимет другой воркер.
+
+        :param lock_key: Ключ блокировки.
+        :type lock_key: str
+        :param token: Значение, по которому блокировка снимается только владельцем.
+        :type token: str
+        :param ttl: Время жизни блокировки в секундах.
+        :type ttl: float
+        :returns: True, если блокировка взята; False, если ее держал другой воркер или Redis недоступен.
+        :rtype: bool
+        """
+        if not self.breaker.allow():
+            return False
+        try:
+            if await self.client.set(lock_key, token, nx=True, px=int(ttl * 1000)):
+                self.breaker.record_success()
+                return True
+            deadline = time.monotonic() + ttl
+            while time.monotonic() < deadline and await self.client.exists(lock_key):
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+        except Exception as e:
+            self.breaker.record_failure()
+            logger.error(f"Redis lock error: {e}")
+            return False
+        finally:
+            self.breaker.release()
+        self.breaker.record_success()
+        return False
+
+    def refresh_in_background(self, keys: list[str], refresh: Callable[[list[str]], Awaitable[None]]) -> None:
+        """
+        Запускает фоновое обновление устаревших ключей и сразу возвращает управление.
+
+        Ключи, которые уже обновляются в этом процессе, пропускаются. Остальные помечаются
+        в Redis ключами ``refresh:{key}`` на ``REFRESH_LOCK_TTL`` секунд, и ``refresh``
+        получает только те из них, которые не обновляет другой воркер. Ошибки обновления
+        логируются: до жесткого истечения из кэша продолжает отдаваться старое значение.
+
+        :param keys: Ключи кэша.
+        :type keys: list[str]
+        :param refresh: Функция, загружающая и записывающая в кэш значения переданных ключей.
+        :type refresh: Callable[[list[str]], Awaitable[None]]
+        """
+        keys = [key for key in dict.fromkeys(keys) if key not in self._refreshing]
+        if not keys:
+            return
+        task = asyncio.create_task(self._refresh(keys, refresh))
+        for key in keys:
+            self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._forget_refresh(keys))
+
+    def _forget_refresh(self, keys: list[str]) -> None:
+        """
+        Снимает с ключей отметку об обновлении в этом процессе.
+
+        :param keys: Ключи кэша.
+        :type keys: list[str]
+        """
+        for key in keys:
+            self._refreshing.pop(key, None)
+
+    async def _refresh(self, keys: list[str], refresh: Callable[[list[str]], Awaitable[None]]) -> None:
+        """
+        Обновляет ключи, не обновляемые другими воркерами.
+
+        :param keys: Ключи кэша.
+        :type keys: list[str]
+        :param refresh: Функция обновления.
+        :type refresh: Callable[[list[str]], Awaitable[None]]
+        """
         try:
-            members = await self.smembers(key)
-            if members:
-                await self.client.srem(key, *members)
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.set(f"refresh:{key}", 1, nx=True, ex=REFRESH_LOCK_TTL)
+                # Без Redis не обновляем: иначе каждый запрос пойдет в БД
+                locks = await self.execute("refresh lock", pipe.execute, [None] * len(keys))
+            acquired = [key for key, ok in zip(keys, locks, strict=True) if ok]
+            if acquired:
+                await refresh(acquired)
         except Exception as e:
-            logger.error(f"Redis clear set error: {e}")
+            logger.error(f"Cache refresh error: {e}")
+
+    def _decode(self, key: str, value: bytes | None) -> JsonType | None:
+        """
+        Декодирует значение ключа, считая поврежденное значение промахом.
+
+        :param key: Ключ кэша.
+        :type key: str
+        :param value: Закодированное значение.
+        :type value: bytes | None
+        :returns: Значение или None.
+        :rtype: JsonType | None
+        """
+        if not value:
+            return None
+        try:
+            return self.codec.decode(value)
+        except Exception as e:
+            logger.error(f"Cache decode error for {key}: {e}")
+            return None
+
+    def _local_for(self, key: str) -> LocalCache | None:
+        """
+        Возвращает кэш процесса, если ключ в нем кэшируется.
+
+        :param key: Ключ кэша.
+        :type key: str
+        :returns: Кэш процесса или None.
+        :rtype: LocalCache | None
+        """
+        return self.local if self.local is not None and key.startswith(LOCAL_CACHE_PREFIX) else None
+
+    async def start_listener(self) -> None:
+        """Запускает прием сообщений об удаленных ключах от других воркеров."""
+        if self.local is not None and (self._listener is None or self._listener.done()):
+            self._listener = asyncio.create_task(self._listen_invalidations())
+
+    async def _listen_invalidations(self) -> None:
+        """Удаляет из кэша процесса ключи, полученные через pub/sub, переподключаясь при ошибках."""
+        while True:
+            try:
+                async with self.client.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    # Пока подписки не было, сообщения могли быть пропущены
+                    self.local.clear()
+                    # listen() упирается в таймаут операций, поэтому ждем сообщения с таймаутом
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is not None and message["type"] == "message":
+                            self.local.delete(message["data"])
+            except Exception as e:
+                logger.error(f"Redis pubsub error: {e}")
+                await asyncio.sleep(1)
 
     async def close(self) -> None:
         """
-        Закрывает соединение с Redis.
+        Останавливает прием сообщений и фоновые обновления и закрывает соединение с Redis.
 
         :returns: None
         """
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        refreshing = set(self._refreshing.values())
+        for task in refreshing:
+            task.cancel()
+        await asyncio.gather(*refreshing, return_exceptions=True)
         await self.client.close()
+        if self._raw_client is not None:
+            await self._raw_client.close()
 
 
-cache = RedisCache()
+cache = RedisCache(
+    LocalCache(settings.LOCAL_CACHE_SIZE, settings.LOCAL_CACHE_TTL) if settings.LOCAL_CACHE_SIZE else None,
+    CacheCodec(settings.CACHE_SERIALIZER, settings.CACHE_COMPRESSION, settings.CACHE_COMPRESS_THRESHOLD),
+)
 
 
 async def get_cache() -> RedisCache:
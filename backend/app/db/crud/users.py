@@ -1,9 +1,18 @@
-from sqlalchemy import delete, insert, update
+from collections.abc import Iterable
+import random
+
+from sqlalchemy import Integer, any_, bindparam, delete, func, insert, or_, text, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from app.db.models.user import User
-from app.schemas.user import UserCreate, UserOut, UserUpdate
+from app.schemas.user import UserCreate, UserOut, UserSkipped, UserUpdate
+
+COPY_COLUMNS: tuple[str, ...] = tuple(UserCreate.model_fields)
+
+RANDOM_SAMPLE_ROUNDS = 5
+RANDOM_OVERSAMPLE = 4
 
 
 async def create_user(db: AsyncSession, user: UserCreate) -> UserOut:
@@ -26,9 +35,123 @@ async def create_user(db: AsyncSession, user: UserCreate) -> UserOut:
     return user_out
 
 
+async def bulk_create_users(
+    db: AsyncSession, users: list[UserCreate], chunk_size: int = 500
+) -> tuple[list[UserOut], list[UserSkipped]]:
+    """
+    Массово создает пользователей, пропуская дубликаты.
+
+    Каждый чанк записывается одним запросом ``INSERT ... ON CONFLICT DO NOTHING RETURNING``
+    и фиксируется одним коммитом. Для пропущенных строк отдельным запросом определяется,
+    с какой уникальной записью они конфликтуют.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param users: Провалидированные данные пользователей.
+    :type users: list[UserCreate]
+    :param chunk_size: Количество строк в одном INSERT.
+    :type chunk_size: int
+    :returns: Созданные пользователи в порядке входных данных и отчет о пропущенных записях.
+    :rtype: tuple[list[UserOut], list[UserSkipped]]
+    """
+    created: list[UserOut] = []
+    skipped: list[UserSkipped] = []
+
+    for start in range(0, len(users), chunk_size):
+        chunk = users[start : start + chunk_size]
+        stmt = pg_insert(User).values([user.model_dump() for user in chunk]).on_conflict_do_nothing().returning(User)
+        result = await db.execute(stmt)
+        inserted = {(row.email, row.uuid): UserOut.model_validate(row) for row in result.scalars().all()}
+        await db.commit()
+
+        rejected: list[UserCreate] = []
+        for user in chunk:
+            user_out = inserted.pop((user.email, user.uuid), None)
+            if user_out is not None:
+                created.append(user_out)
+            else:
+                rejected.append(user)
+
+        if rejected:
+            skipped.extend(await _explain_conflicts(db, rejected))
+
+    return created, skipped
+
+
+async def _explain_conflicts(db: AsyncSession, users: list[UserCreate]) -> list[UserSkipped]:
+    """
+    Определяет, по какому уникальному полю каждая запись конфликтует с уже сохраненными.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param users: Записи, не вставленные из-за конфликта.
+    :type users: list[UserCreate]
+    :returns: Отчет о пропущенных записях.
+    :rtype: list[UserSkipped]
+    """
+    emails = [user.email for user in users]
+    uuids = [user.uuid for user in users if user.uuid]
+    result = await db.execute(select(User.email, User.uuid).where(or_(User.email.in_(emails), User.uuid.in_(uuids))))
+    rows = result.all()
+    existing_emails = {row.email for row in rows}
+    existing_uuids = {row.uuid for row in rows}
+
+    skipped = []
+    for user in users:
+        if user.email in existing_emails:
+            reason = "email"
+        elif user.uuid in existing_uuids:
+            reason = "uuid"
+        else:
+            reason = "unknown"
+        skipped.append(UserSkipped(email=user.email, username=user.username, uuid=user.uuid, reason=reason))
+    return skipped
+
+
+async def copy_users(db: AsyncSession, users: Iterable[UserCreate]) -> list[int]:
+    """
+    Загружает пользователей через PostgreSQL COPY.
+
+    Записи копируются во временную staging-таблицу через сырое asyncpg-соединение,
+    затем переносятся в ``users`` одним ``INSERT ... SELECT ... ON CONFLICT DO NOTHING``,
+    поэтому уникальность email и uuid сохраняется. Staging-таблица удаляется при коммите.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param users: Данные пользователей.
+    :type users: Iterable[UserCreate]
+    :returns: ID вставленных пользователей.
+    :rtype: list[int]
+    """
+    columns = ", ".join(COPY_COLUMNS)
+    # Первый запрос через сессию открывает транзакцию, в которой живет staging-таблица
+    await db.execute(
+        text(f"CREATE TEMP TABLE users_staging ON COMMIT DROP AS SELECT {columns} FROM users WITH NO DATA")
+    )
+
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        "users_staging",
+        records=(tuple(getattr(user, column) for column in COPY_COLUMNS) for user in users),
+        columns=COPY_COLUMNS,
+    )
+
+    result = await db.execute(
+        text(
+            f"INSERT INTO users ({columns}, created_at) SELECT {columns}, now() FROM users_staging "
+            "ON CONFLICT DO NOTHING RETURNING id"
+        )
+    )
+    user_ids = list(result.scalars().all())
+    await db.commit()
+
+    return user_ids
+
+
 async def get_users(db: AsyncSession, limit: int, offset: int) -> list[UserOut]:
     """
-    Получает список пользователей с пагинацией.
+    Получает список пользователей с пагинацией через OFFSET.
 
     :param db: Асинхронная сессия SQLAlchemy.
     :type db: AsyncSession
@@ -36,15 +159,149 @@ async def get_users(db: AsyncSession, limit: int, offset: int) -> list[UserOut]:
     :type limit: int
     :param offset: Смещение для пагинации.
     :type offset: int
-    :returns: Список пользователей.
+    :returns: Список пользователей, упорядоченный по ID.
     :rtype: list[UserOut]
     """
-    result = await db.execute(select(User).offset(offset).limit(limit))
+    result = await db.execute(select(User).order_by(User.id).offset(offset).limit(limit))
     users = result.scalars().all()
 
     return [UserOut.model_validate(user) for user in users]
 
 
+async def get_users_after(db: AsyncSession, limit: int, after_id: int) -> list[UserOut]:
+    """
+    Получает страницу пользователей с ID больше ``after_id`` (keyset-пагинация).
+
+    Запрос идет по индексу первичного ключа, поэтому стоимость страницы
+    не зависит от ее глубины, в отличие от OFFSET.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param limit: Количество записей на страницу.
+    :type limit: int
+    :param after_id: ID последнего пользователя предыдущей страницы.
+    :type after_id: int
+    :returns: Список пользователей, упорядоченный по ID.
+    :rtype: list[UserOut]
+    """
+    result = await db.execute(select(User).where(User.id > after_id).order_by(User.id).limit(limit))
+    users = result.scalars().all()
+
+    return [UserOut.model_validate(user) for user in users]
+
+
+async def get_user_ids_after(db: AsyncSession, limit: int, after_id: int) -> list[int]:
+    """
+    Получает ID пользователей больше ``after_id`` без чтения остальных колонок.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param limit: Количество ID.
+    :type limit: int
+    :param after_id: Последний ID предыдущей пачки.
+    :type after_id: int
+    :returns: ID пользователей по возрастанию.
+    :rtype: list[int]
+    """
+    result = await db.execute(select(User.id).where(User.id > after_id).order_by(User.id).limit(limit))
+    return list(result.scalars().all())
+
+
+async def count_users(db: AsyncSession) -> int:
+    """
+    Считает пользователей точно через ``count(*)``.
+
+    На больших таблицах требует полного сканирования.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :returns: Количество пользователей.
+    :rtype: int
+    """
+    result = await db.execute(select(func.count()).select_from(User))
+    return result.scalar_one()
+
+
+async def estimate_users_count(db: AsyncSession) -> int | None:
+    """
+    Оценивает количество пользователей по статистике планировщика (``pg_class.reltuples``).
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :returns: Оценка количества или None, если статистика еще не собрана.
+    :rtype: int | None
+    """
+    result = await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"), {"table": User.__tablename__}
+    )
+    estimate = result.scalar_one_or_none()
+    # До первого ANALYZE/VACUUM reltuples равен -1
+    return estimate if estimate is not None and estimate >= 0 else None
+
+
+async def get_random_users(db: AsyncSession, n: int, rng: random.Random | None = None) -> list[UserOut]:
+    """
+    Выбирает ``n`` различных случайных пользователей без сортировки всей таблицы.
+
+    Из диапазона ``[min(id), max(id)]`` выбираются случайные ID-кандидаты и одним запросом
+    по первичному ключу проверяется, какие из них существуют. Кандидаты принимаются в порядке
+    выбора, а отсутствующие (удаленные) отбрасываются, поэтому каждый существующий пользователь
+    выбирается с одинаковой вероятностью независимо от пропусков в ID. Если после
+    ``RANDOM_SAMPLE_ROUNDS`` раундов пользователей не хватает (очень разреженная таблица),
+    оставшиеся выбираются через ``ORDER BY random()``.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param n: Количество пользователей.
+    :type n: int
+    :param rng: Генератор случайных чисел (по умолчанию модуль :mod:`random`).
+    :type rng: random.Random | None
+    :returns: Случайные пользователи, не больше ``n``.
+    :rtype: list[UserOut]
+    """
+    low, high = (await db.execute(select(func.min(User.id), func.max(User.id)))).one()
+    if low is None or n <= 0:
+        return []
+    sample = rng.sample if rng else random.sample
+
+    ids_param = bindparam("ids", type_=ARRAY(Integer))
+    stmt = select(User).where(User.id == any_(ids_param))
+    found: dict[int, UserOut] = {}
+    for _ in range(RANDOM_SAMPLE_ROUNDS):
+        candidates = [
+            user_id
+            for user_id in sample(range(low, high + 1), min(high - low + 1, (n - len(found)) * RANDOM_OVERSAMPLE))
+            if user_id not in found
+        ]
+        result = await db.execute(stmt, {"ids": candidates})
+        existing = {user.id: user for user in result.scalars().all()}
+        for user_id in candidates:
+            if user_id in existing and len(found) < n:
+                found[user_id] = UserOut.model_validate(existing[user_id])
+        if len(found) == n:
+            return list(found.values())
+
+    result = await db.execute(select(User).where(User.id.not_in(found)).order_by(func.random()).limit(n - len(found)))
+    return [*found.values(), *(UserOut.model_validate(user) for user in result.scalars().all())]
+
+
+async def get_users_by_ids(db: AsyncSession, user_ids: list[int]) -> list[UserOut]:
+    """
+    Получает пользователей по списку ID одним запросом ``WHERE id = ANY(:ids)``.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param user_ids: ID пользователей.
+    :type user_ids: list[int]
+    :returns: Найденные пользователи в произвольном порядке.
+    :rtype: list[UserOut]
+    """
+    if not user_ids:
+        return []
+    result = await db.execute(select(User).where(User.id == any_(bindparam("ids", user_ids, type_=ARRAY(Integer)))))
+    return [UserOut.model_validate(user) for user in result.scalars().all()]
+
+
 async def get_user(db: AsyncSession, user_id: int) -> UserOut | None:
     """
     Получает пользователя по ID.
@@ -1,6 +1,8 @@
-from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager
+from collections.abc import AsyncGenerator, Awaitable, Callable, Iterable, Iterator
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from itertools import islice
 
+from pydantic import ValidationError
 import sqlalchemy
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
@@ -8,7 +10,11 @@ from sqlalchemy.pool import NullPool
 
 from app.core.config import settings
 from app.core.logging import logger
+from app.db.crud.users import copy_users
 from app.db.models import Base
+from app.schemas.user import UserCreate
+
+SessionFactory = Callable[[], AbstractAsyncContextManager[AsyncSession]]
 
 
 class DatabaseManager:
@@ -80,6 +86,39 @@ class DatabaseManager:
                 await session.close()
                 logger.debug("Session closed")
 
+    async def load_users(
+        self,
+        users: Iterable[UserCreate],
+        chunk_size: int = 50_000,
+        on_inserted: Callable[[list[int]], Awaitable[None]] | None = None,
+    ) -> int:
+        """
+        Загружает большой поток пользователей через COPY.
+
+        Поток читается чанками по ``chunk_size`` записей, каждый чанк загружается
+        в отдельной транзакции, поэтому память ограничена размером чанка,
+        а уже загруженные чанки сохраняются при сбое.
+
+        :param users: Данные пользователей.
+        :type users: Iterable[UserCreate]
+        :param chunk_size: Количество записей в одной транзакции.
+        :type chunk_size: int
+        :param on_inserted: Вызывается с ID пользователей каждого зафиксированного чанка.
+        :type on_inserted: Callable[[list[int]], Awaitable[None]] | None
+        :returns: Количество вставленных пользователей.
+        :rtype: int
+        """
+        iterator = iter(users)
+        inserted = 0
+        while chunk := list(islice(iterator, chunk_size)):
+            async with self.session() as session:
+                user_ids = await copy_users(session, chunk)
+            inserted += len(user_ids)
+            if on_inserted and user_ids:
+                await on_inserted(user_ids)
+            logger.info(f"COPY chunk loaded: {len(chunk)} records, {inserted} users inserted so far")
+        return inserted
+
 
 # Глобальный экземпляр DatabaseManager
 db_manager = DatabaseManager()
@@ -96,11 +135,61 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+def read_users_file(path: str) -> Iterator[UserCreate]:
+    """
+    Построчно читает пользователей из JSON Lines файла.
+
+    Каждая строка - объект с полями :class:`UserCreate`. Невалидные строки пропускаются.
+
+    :param path: Путь к файлу.
+    :type path: str
+    :returns: Итератор провалидированных пользователей.
+    :rtype: Iterator[UserCreate]
+    """
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield UserCreate.model_validate_json(line)
+            except ValidationError as e:
+                logger.warning(f"Skipping invalid record at line {line_number}: {e}")
+
+
 if __name__ == "__main__":
+    import argparse
     import asyncio
 
+    from app.core.cache import cache
+    from app.services.counters import users_changed
+    from app.services.user_existence import existence_filter
+
+    parser = argparse.ArgumentParser(description="Инициализация и загрузка данных в базу.")
+    subparsers = parser.add_subparsers(dest="command")
+    load_parser = subparsers.add_parser("load-users", help="Загрузить пользователей из JSON Lines файла через COPY.")
+    load_parser.add_argument("path", help="Путь к файлу, по одному пользователю на строку.")
+    load_parser.add_argument("--chunk-size", type=int, default=50_000, help="Записей в одной транзакции.")
+    args = parser.parse_args()
+
     async def initialize() -> None:
         """Инициализация базы данных."""
         await db_manager.connect()
 
-    asyncio.run(initialize())
+    async def load() -> None:
+        """Загрузка пользователей из файла."""
+        await db_manager.connect()
+
+        async def mark_created(user_ids: list[int]) -> None:
+            async with cache.pipeline() as pipe:
+                existence_filter.queue_created(pipe, user_ids)
+
+        inserted = await db_manager.load_users(
+            read_users_file(args.path), chunk_size=args.chunk_size, on_inserted=mark_created
+        )
+        if inserted:
+            await users_changed(cache, inserted)
+        await cache.close()
+        await db_manager.close()
+        logger.info(f"Users loaded: {inserted}")
+
+    asyncio.run(load() if args.command == "load-users" else initialize())
@@ -6,6 +6,9 @@ from fastapi import FastAPI
 from app.core.cache import cache
 from app.core.logging import logger
 from app.db.session import db_manager
+from app.services.import_jobs import import_jobs
+from app.services.random_pool import random_pool
+from app.services.user_existence import existence_filter
 from app.services.user_service import fetch_and_save_users
 
 
@@ -23,15 +26,21 @@ async def app_lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """
     logger.info("Application startup...")
     await db_manager.connect()
+    await cache.start_listener()
 
     logger.info("Fetching initial users...")
     async with db_manager.session() as session:
         await fetch_and_save_users(session, 1000)
     logger.info("Initial users fetched and saved.")
+    await random_pool.start()
+    await existence_filter.start()
 
     yield
 
     logger.info("Application shutdown...")
+    await random_pool.stop()
+    await existence_filter.stop()
+    await import_jobs.shutdown()
     await db_manager.close()
     await cache.close()
     logger.info("Application shutdown complete.")
@@ -52,6 +52,7 @@ def configure_middleware(app: FastAPI) -> None:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"],
     )
 
     app.middleware("http")(track_inprogress_requests_middleware)
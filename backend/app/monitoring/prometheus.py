@@ -1,9 +1,12 @@
 from fastapi import FastAPI
-from prometheus_client import Gauge
+from prometheus_client import Counter, Gauge
 from prometheus_fastapi_instrumentator import Instrumentator
 
 instrumentator = Instrumentator()
 inprogress_requests = Gauge("fastapi_http_requests_in_progress", "Number of in-progress HTTP requests")
+local_cache_events = Counter("local_cache_events_total", "In-process cache hits, misses and evictions", ["event"])
+redis_circuit_state = Gauge("redis_circuit_state", "Redis circuit breaker state: 0 closed, 1 half-open, 2 open")
+local_cache_entries = Gauge("local_cache_entries", "Number of entries in the in-process cache")
 
 
 def configure_prometheus(app: FastAPI) -> None:
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal
 
 from pydantic import BaseModel, EmailStr, Field
 
@@ -187,3 +188,96 @@ class UserOut(UserBase):
     created_at: datetime
 
     model_config = {"from_attributes": True}
+
+
+class UserSkipped(BaseModel):
+    """
+    Запись, пропущенная при массовой вставке из-за нарушения уникальности.
+
+    :param email: Email пропущенного пользователя.
+    :type email: str
+    :param username: Имя пользователя для входа.
+    :type username: str | None
+    :param uuid: UUID пропущенного пользователя.
+    :type uuid: str | None
+    :param reason: Поле, по которому обнаружен дубликат (``email`` или ``uuid``);
+        ``unknown``, если конфликтующая запись уже не найдена.
+    :type reason: str
+    """
+
+    email: str
+    username: str | None = None
+    uuid: str | None = None
+    reason: Literal["email", "uuid", "unknown"]
+
+
+class UserIds(BaseModel):
+    """
+    Список ID пользователей для пакетного запроса.
+
+    :param ids: ID пользователей.
+    :type ids: list[int]
+    """
+
+    ids: list[int]
+
+
+class UserBatch(BaseModel):
+    """
+    Результат пакетного получения пользователей.
+
+    :param users: Пользователи в порядке запрошенных ID, None для ненайденных.
+    :type users: list[UserOut | None]
+    :param missing: ID, для которых пользователь не найден.
+    :type missing: list[int]
+    """
+
+    users: list[UserOut | None]
+    missing: list[int]
+
+
+class UserImportStats(BaseModel):
+    """
+    Счетчики прогресса загрузки пользователей.
+
+    :param fetched: Получено записей из внешнего API.
+    :type fetched: int
+    :param inserted: Вставлено новых пользователей.
+    :type inserted: int
+    :param duplicates: Пропущено дубликатов.
+    :type duplicates: int
+    :param failed: Отброшено записей, не прошедших валидацию.
+    :type failed: int
+    :param processed: Записей, обработка которых зафиксирована в БД (вставлены или отброшены).
+    :type processed: int
+    """
+
+    fetched: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    processed: int = 0
+
+
+class UserImportJob(UserImportStats):
+    """
+    Состояние фоновой задачи загрузки пользователей.
+
+    :param job_id: Идентификатор задачи.
+    :type job_id: str
+    :param status: Статус задачи: ``queued``, ``running``, ``completed``, ``failed``
+        или ``interrupted`` (прервана при остановке приложения).
+    :type status: str
+    :param count: Запрошенное количество пользователей.
+    :type count: int
+    :param error: Текст ошибки, если задача завершилась неудачно.
+    :type error: str | None
+    :param updated_at: Время последнего сохранения состояния.
+    :type updated_at: datetime | None
+    """
+
+    job_id: str
+    status: Literal["queued", "running", "completed", "failed", "interrupted"]
+    count: int
+    error: str | None = None
+    updated_at: datetime | None = None
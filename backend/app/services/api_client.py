@@ -1,35 +1,93 @@
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
 from typing import Any
 
 from httpx import AsyncClient
-from tenacity import retry, stop_after_attempt
+from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.core.config import settings
 
 
-@retry(stop=stop_after_attempt(3))
-async def fetch_random_users(count: int) -> dict[str, Any]:
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=0.5, max=5), reraise=True)
+async def _fetch_batch(client: AsyncClient, batch_count: int) -> list[dict[str, Any]]:
+    """
+    Получает одну страницу пользователей из randomuser.me.
+
+    Повторяется независимо от остальных страниц, поэтому сбой одной страницы
+    не приводит к повторной загрузке уже полученных.
+
+    :param client: HTTP-клиент.
+    :type client: AsyncClient
+    :param batch_count: Количество пользователей на странице.
+    :type batch_count: int
+    :returns: Список пользователей страницы.
+    :rtype: list[dict[str, Any]]
+    :raises httpx.HTTPError: Если запрос не удался после 3 попыток.
+    """
+    response = await client.get(f"{settings.RANDOMUSER_API_URL}?results={batch_count}")
+    response.raise_for_status()
+    return response.json()["results"]
+
+
+async def iter_random_users(count: int, concurrency: int | None = None) -> AsyncIterator[list[dict[str, Any]]]:
+    """
+    Постранично отдает пользователей из randomuser.me по мере загрузки.
+
+    Одновременно загружается не более ``concurrency`` страниц по ``RANDOMUSER_BATCH_SIZE``
+    пользователей, следующая страница запрашивается, когда потребитель забирает готовую.
+    Поэтому в памяти держится не больше ``concurrency`` страниц, а порядок страниц
+    совпадает с порядком запросов.
+
+    :param count: Количество пользователей для загрузки.
+    :type count: int
+    :param concurrency: Максимальное число одновременных запросов
+        (по умолчанию ``RANDOMUSER_CONCURRENCY``).
+    :type concurrency: int | None
+    :returns: Асинхронный итератор страниц пользователей.
+    :rtype: AsyncIterator[list[dict[str, Any]]]
+    :raises httpx.HTTPError: Если запрос страницы не удался после 3 попыток.
+    """
+    limit = concurrency or settings.RANDOMUSER_CONCURRENCY
+    batch_size = settings.RANDOMUSER_BATCH_SIZE
+    batch_counts = deque(min(batch_size, count - i) for i in range(0, count, batch_size))
+
+    async with AsyncClient(timeout=30.0) as client:
+        pending: deque[asyncio.Task[list[dict[str, Any]]]] = deque()
+        try:
+            while batch_counts or pending:
+                while batch_counts and len(pending) < limit:
+                    pending.append(asyncio.create_task(_fetch_batch(client, batch_counts.popleft())))
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def fetch_random_users(count: int, concurrency: int | None = None) -> dict[str, Any]:
     """
     Получает данные пользователей из randomuser.me.
 
+    Страницы загружаются параллельно через :func:`iter_random_users`
+    и собираются в один ответ в порядке запросов.
+
     :param count: Количество пользователей для загрузки.
     :type count: int
+    :param concurrency: Максимальное число одновременных запросов
+        (по умолчанию ``RANDOMUSER_CONCURRENCY``).
+    :type concurrency: int | None
     :returns: Данные пользователей в формате JSON.
     :rtype: Dict[str, Any]
-    :raises HTTPException: Если запрос к API не удался после 3 попыток.
+    :raises httpx.HTTPError: Если запрос страницы не удался после 3 попыток.
     """
-    async with AsyncClient(timeout=30.0) as client:
-        results = []
-        batch_size = 100
-        for i in range(0, count, batch_size):
-            batch_count = min(batch_size, count - i)
-            response = await client.get(f"{settings.RANDOMUSER_API_URL}?results={batch_count}")
-            response.raise_for_status()
-            results.extend(response.json()["results"])
-        return {"results": results}
+    results = []
+    async for page in iter_random_users(count, concurrency):
+        results.extend(page)
+    return {"results": results}
 
 
 if __name__ == "__main__":
-    import asyncio
 
     async def ten_fetch() -> None:  # noqa: D103
         users = await fetch_random_users(10)
@@ -0,0 +1,143 @@
+from typing import Literal
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import CachePipeline, RedisCache
+from app.core.config import settings
+from app.db.crud.users import count_users, estimate_users_count
+
+USERS_COUNT_KEY = "users:count"
+USERS_GENERATION_KEY = "users:generation"
+USERS_REVISION_KEY = "users:revision"
+
+CountMode = Literal["exact", "estimate", "auto"]
+
+
+async def get_exact_users_count(db: AsyncSession, cache: RedisCache) -> int:
+    """
+    Возвращает точное количество пользователей из кэша или из БД.
+
+    Счетчик в кэше корректируется при вставке и удалении пользователей
+    (:func:`users_changed`), а TTL ``USERS_COUNT_TTL`` ограничивает
+    время жизни возможного расхождения с таблицей.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :returns: Количество пользователей.
+    :rtype: int
+    """
+    cached_count = await cache.get(USERS_COUNT_KEY)
+    if isinstance(cached_count, int):
+        return cached_count
+
+    total = await count_users(db)
+    await cache.set(USERS_COUNT_KEY, total, ttl=settings.USERS_COUNT_TTL)
+    return total
+
+
+async def count_users_service(db: AsyncSession, cache: RedisCache, mode: CountMode = "auto") -> int:
+    """
+    Считает пользователей в выбранном режиме.
+
+    - ``exact`` — точное значение (кэшированный счетчик или ``count(*)``);
+    - ``estimate`` — оценка планировщика из ``pg_class.reltuples``, без сканирования таблицы;
+    - ``auto`` — оценка для больших таблиц и точное значение, если оценка меньше
+      ``USERS_COUNT_EXACT_THRESHOLD``.
+
+    Если статистика таблицы еще не собрана, вместо оценки возвращается точное значение.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param mode: Режим подсчета.
+    :type mode: CountMode
+    :returns: Количество пользователей.
+    :rtype: int
+    """
+    if mode != "exact":
+        estimate = await estimate_users_count(db)
+        if estimate is not None and (mode == "estimate" or estimate >= settings.USERS_COUNT_EXACT_THRESHOLD):
+            return estimate
+    return await get_exact_users_count(db, cache)
+
+
+async def get_users_generation(cache: RedisCache) -> int:
+    """
+    Возвращает текущее поколение кэша страниц пользователей.
+
+    Поколение входит в ключи закэшированных страниц, поэтому его увеличение
+    делает все прежние страницы недостижимыми, и они истекают по TTL.
+
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :returns: Номер поколения, 0 если счетчика еще нет.
+    :rtype: int
+    """
+    generation = await cache.get(USERS_GENERATION_KEY)
+    return generation if isinstance(generation, int) else 0
+
+
+async def get_users_revision(cache: RedisCache) -> int:
+    """
+    Возвращает текущую ревизию пользователей.
+
+    Ревизия увеличивается при любом изменении пользователей, поэтому ее значение,
+    прочитанное до запроса к БД, позволяет не записать в кэш устаревшие данные.
+
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :returns: Номер ревизии, 0 если счетчика еще нет.
+    :rtype: int
+    """
+    revision = await cache.get(USERS_REVISION_KEY)
+    return revision if isinstance(revision, int) else 0
+
+
+def queue_users_changed(pipe: CachePipeline, count_delta: int = 0) -> None:
+    """
+    Ставит в конвейер инвалидацию страниц и сдвиг счетчика пользователей.
+
+    Страницы инвалидируются одним ``INCR`` поколения, независимо от количества
+    закэшированных страниц, а готовые тела ответов — ``INCR`` ревизии
+    (:func:`queue_users_updated`). Отсутствующий счетчик пользователей не создается:
+    он будет посчитан при следующем запросе.
+
+    :param pipe: Конвейер команд Redis.
+    :type pipe: CachePipeline
+    :param count_delta: Изменение количества пользователей.
+    :type count_delta: int
+    """
+    pipe.incr(USERS_GENERATION_KEY)
+    queue_users_updated(pipe)
+    if count_delta:
+        pipe.incr_if_exists(USERS_COUNT_KEY, count_delta)
+
+
+def queue_users_updated(pipe: CachePipeline) -> None:
+    """
+    Ставит в конвейер инвалидацию закэшированных тел ответов со списками пользователей.
+
+    Ревизия меняется при любом изменении пользователей, в том числе при обновлении,
+    которое не меняет состав страниц и поэтому не затрагивает поколение.
+
+    :param pipe: Конвейер команд Redis.
+    :type pipe: CachePipeline
+    """
+    pipe.incr(USERS_REVISION_KEY)
+
+
+async def users_changed(cache: RedisCache, count_delta: int = 0) -> None:
+    """
+    Инвалидирует страницы и сдвигает счетчик пользователей одним проходом по сети.
+
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param count_delta: Изменение количества пользователей.
+    :type count_delta: int
+    :returns: None
+    """
+    async with cache.pipeline() as pipe:
+        queue_users_changed(pipe, count_delta)
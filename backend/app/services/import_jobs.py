@@ -0,0 +1,357 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+import contextlib
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+from app.core.cache import RedisCache, cache
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.session import SessionFactory, db_manager
+from app.schemas.user import UserImportJob, UserImportStats
+from app.services.ingestion import ingest_random_users
+
+# Ставит задачу в очередь, только если ее статус и время обновления не изменились с момента чтения,
+# поэтому два одновременных вызова resume не поставят одну задачу дважды.
+# KEYS: состояние задачи; ARGV: прочитанные статус и updated_at, новое updated_at, TTL
+RESUME_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'status') ~= ARGV[1]
+    or (redis.call('HGET', KEYS[1], 'updated_at') or '') ~= ARGV[2] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', 'queued', 'updated_at', ARGV[3])
+redis.call('HDEL', KEYS[1], 'error')
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+
+class ImportQueueFullError(Exception):
+    """Очередь фоновых задач загрузки переполнена."""
+
+
+class ImportJobStoreError(Exception):
+    """Состояние фоновой задачи загрузки не удалось сохранить в Redis."""
+
+
+class ImportJobManager:
+    """
+    Ограниченный исполнитель фоновых задач загрузки пользователей.
+
+    Задачи выполняются в текущем процессе не более чем ``workers`` одновременно,
+    очередь ограничена ``queue_size`` задачами. Состояние задач хранится в Redis,
+    поэтому статус может вернуть любой воркер приложения.
+    """
+
+    def __init__(
+        self,
+        cache: RedisCache,
+        session_factory: SessionFactory,
+        workers: int = settings.IMPORT_JOB_WORKERS,
+        queue_size: int = settings.IMPORT_JOB_QUEUE_SIZE,
+    ) -> None:
+        """
+        Инициализирует менеджер без запуска воркеров.
+
+        :param cache: Клиент Redis для хранения состояния задач.
+        :type cache: RedisCache
+        :param session_factory: Фабрика сессий БД для задач.
+        :type session_factory: SessionFactory
+        :param workers: Количество одновременно выполняемых задач.
+        :type workers: int
+        :param queue_size: Максимальное количество задач в очереди.
+        :type queue_size: int
+        """
+        self.cache = cache
+        self.session_factory = session_factory
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: asyncio.Queue[UserImportJob] | None = None
+        # Места в очереди, занятые задачами, состояние которых еще сохраняется
+        self._reserved = 0
+        self._tasks: list[asyncio.Task] = []
+
+    @staticmethod
+    def job_key(job_id: str) -> str:
+        """
+        Возвращает ключ Redis для состояния задачи.
+
+        :param job_id: Идентификатор задачи.
+        :type job_id: str
+        :returns: Ключ Redis.
+        :rtype: str
+        """
+        return f"import_job:{job_id}"
+
+    async def submit(self, count: int) -> UserImportJob:
+        """
+        Ставит задачу загрузки в очередь и сразу возвращает ее состояние.
+
+        Воркеры запускаются при первой задаче.
+
+        :param count: Количество пользователей для загрузки.
+        :type count: int
+        :returns: Состояние поставленной задачи.
+        :rtype: UserImportJob
+        :raises ValueError: Если count больше ``IMPORT_MAX_COUNT``.
+        :raises ImportQueueFullError: Если очередь задач заполнена.
+        :raises ImportJobStoreError: Если состояние задачи не удалось сохранить.
+        """
+        if count > settings.IMPORT_MAX_COUNT:
+            raise ValueError(f"Too many users requested, max - {settings.IMPORT_MAX_COUNT}")
+
+        job = UserImportJob(job_id=uuid4().hex, status="queued", count=count)
+        await self._enqueue(job, lambda: self._save(job))
+        return job
+
+    async def resume(self, job_id: str) -> UserImportJob | None:
+        """
+        Возобновляет прерванную задачу с последней сохраненной точки.
+
+        Возобновить можно задачу со статусом ``failed`` или ``interrupted``, а также
+        выполняющуюся задачу, состояние которой не обновлялось дольше ``IMPORT_JOB_STALE_AFTER``
+        секунд (воркер, выполнявший ее, завершился аварийно). Если задачу не удалось
+        поставить в очередь, ее сохраненное состояние не меняется.
+
+        :param job_id: Идентификатор задачи.
+        :type job_id: str
+        :returns: Состояние поставленной в очередь задачи или None, если задача не найдена.
+        :rtype: UserImportJob | None
+        :raises ValueError: Если задача ждет в очереди, выполняется, завершена или уже возобновлена.
+        :raises ImportQueueFullError: Если очередь задач заполнена.
+        :raises ImportJobStoreError: Если состояние задачи не удалось сохранить.
+        """
+        job = await self.get(job_id)
+        if job is None:
+            return None
+        if not self._is_resumable(job):
+            raise ValueError(f"Job {job_id} is {job.status} and cannot be resumed")
+
+        read = job.model_dump(mode="json")
+        job.status = "queued"
+        job.error = None
+        await self._enqueue(job, lambda: self._claim(job, read["status"], read["updated_at"] or ""))
+        return job
+
+    async def get(self, job_id: str) -> UserImportJob | None:
+        """
+        Получает состояние задачи из Redis.
+
+        :param job_id: Идентификатор задачи.
+        :type job_id: str
+        :returns: Состояние задачи или None, если задача не найдена.
+        :rtype: UserImportJob | None
+        """
+        data = await self.cache.hgetall(self.job_key(job_id))
+        return UserImportJob.model_validate(data) if data else None
+
+    async def shutdown(self) -> None:
+        """
+        Останавливает воркеры, прерывая выполняемые задачи.
+
+        Задачи, которые еще ждали в очереди, тоже получают статус ``interrupted``,
+        чтобы их можно было возобновить.
+
+        :returns: None
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        while self._queue is not None and not self._queue.empty():
+            job = self._queue.get_nowait()
+            job.status = "interrupted"
+            await self._save(job)
+        self._queue = None
+
+    @staticmethod
+    def _is_resumable(job: UserImportJob) -> bool:
+        """
+        Проверяет, можно ли возобновить задачу.
+
+        :param job: Состояние задачи.
+        :type job: UserImportJob
+        :returns: True, если задачу можно поставить в очередь повторно.
+        :rtype: bool
+        """
+        if job.status in ("failed", "interrupted"):
+            return True
+        # Задачу в очереди или с живым воркером повторная постановка выполнила бы дважды
+        if job.status != "running" or job.updated_at is None:
+            return False
+        return datetime.now(UTC) - job.updated_at > timedelta(seconds=settings.IMPORT_JOB_STALE_AFTER)
+
+    async def _enqueue(self, job: UserImportJob, store: Callable[[], Awaitable[bool]]) -> None:
+        """
+        Сохраняет состояние задачи, кладет ее в очередь и запускает воркеры.
+
+        Состояние сохраняется до постановки в очередь, иначе воркер может успеть
+        сохранить статус ``running``, а запоздавшее сохранение вернет ``queued``.
+        Задача, состояние которой не сохранилось, не ставится: ее статус некому было бы вернуть.
+        Место в очереди занимается до сохранения, поэтому после него задача всегда помещается.
+
+        :param job: Состояние задачи.
+        :type job: UserImportJob
+        :param store: Запись состояния в Redis; возвращает False, если Redis недоступен.
+        :type store: Callable[[], Awaitable[bool]]
+        :raises ImportQueueFullError: Если очередь задач заполнена.
+        :raises ImportJobStoreError: Если состояние задачи не удалось сохранить.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._queue.qsize() + self._reserved >= self.queue_size:
+            raise ImportQueueFullError("Too many import jobs in queue, try again later")
+
+        self._reserved += 1
+        try:
+            stored = await store()
+        finally:
+            self._reserved -= 1
+        if not stored:
+            raise ImportJobStoreError("Import job state could not be stored, try again later")
+        self._queue.put_nowait(job)
+        self._start_workers()
+
+    async def _claim(self, job: UserImportJob, status: str, updated_at: str) -> bool:
+        """
+        Атомарно переводит возобновляемую задачу из прочитанного состояния в ``queued``.
+
+        Счетчики задачи не меняются, поле ``error`` удаляется.
+
+        :param job: Состояние задачи со статусом ``queued``.
+        :type job: UserImportJob
+        :param status: Статус, прочитанный перед возобновлением.
+        :type status: str
+        :param updated_at: Время обновления, прочитанное перед возобновлением, в формате JSON.
+        :type updated_at: str
+        :returns: True, если задача переведена; False, если Redis недоступен.
+        :rtype: bool
+        :raises ValueError: Если состояние задачи изменилось после чтения.
+        """
+        job.updated_at = datetime.now(UTC)
+        args = [status, updated_at, job.model_dump(mode="json")["updated_at"], settings.IMPORT_JOB_TTL]
+        claimed = await self.cache.execute(
+            "eval", lambda: self.cache.client.eval(RESUME_SCRIPT, 1, self.job_key(job.job_id), *args), None
+        )
+        if claimed is None:
+            return False
+        if not claimed:
+            raise ValueError(f"Job {job.job_id} changed while resuming and cannot be resumed")
+        return True
+
+    def _start_workers(self) -> None:
+        """Запускает воркеры, если они еще не запущены."""
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self) -> None:
+        """Последовательно выполняет задачи из очереди."""
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: UserImportJob) -> None:
+        """
+        Выполняет задачу чанками по ``IMPORT_CHUNK_SIZE`` пользователей.
+
+        Каждый чанк загружается в отдельной сессии БД, прогресс сохраняется в Redis
+        после каждой зафиксированной пачки. Счетчик ``processed`` служит точкой,
+        с которой задача продолжится после :meth:`resume`.
+
+        :param job: Состояние задачи.
+        :type job: UserImportJob
+        """
+        job.status = "running"
+        await self._save(job)
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            while job.processed < job.count:
+                processed = job.processed
+                await self._run_chunk(job, min(settings.IMPORT_CHUNK_SIZE, job.count - job.processed))
+                if job.processed == processed:
+                    raise RuntimeError("Import chunk made no progress")
+            job.status = "completed"
+        except asyncio.CancelledError:
+            await self._stop_heartbeat(heartbeat)
+            job.status = "interrupted"
+            await self._save(job)
+            raise
+        except Exception as e:
+            logger.error(f"Import job {job.job_id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        await self._stop_heartbeat(heartbeat)
+        await self._save(job)
+
+    async def _heartbeat(self, job: UserImportJob) -> None:
+        """
+        Обновляет ``updated_at`` выполняющейся задачи раз в ``IMPORT_JOB_HEARTBEAT`` секунд.
+
+        Без этого задача, один чанк которой загружается дольше ``IMPORT_JOB_STALE_AFTER``,
+        считалась бы брошенной, и :meth:`resume` запустил бы ее второй раз.
+
+        :param job: Состояние задачи.
+        :type job: UserImportJob
+        """
+        while True:
+            await asyncio.sleep(settings.IMPORT_JOB_HEARTBEAT)
+            await self._save(job)
+
+    @staticmethod
+    async def _stop_heartbeat(heartbeat: asyncio.Task) -> None:
+        """
+        Останавливает обновление ``updated_at`` и ждет его завершения.
+
+        Незавершенная запись со статусом ``running`` могла бы попасть в Redis после итогового статуса.
+
+        :param heartbeat: Задача обновления.
+        :type heartbeat: asyncio.Task
+        """
+        heartbeat.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await heartbeat
+
+    async def _run_chunk(self, job: UserImportJob, count: int) -> None:
+        """
+        Загружает один чанк, добавляя его счетчики к счетчикам задачи.
+
+        :param job: Состояние задачи.
+        :type job: UserImportJob
+        :param count: Количество пользователей в чанке.
+        :type count: int
+        """
+        base = UserImportStats.model_validate(job.model_dump(include=set(UserImportStats.model_fields)))
+
+        async def checkpoint(stats: UserImportStats) -> None:
+            for field, value in stats:
+                setattr(job, field, getattr(base, field) + value)
+            await self._save(job)
+
+        async with self.session_factory() as session:
+            await ingest_random_users(session, count, on_progress=checkpoint)
+
+    async def _save(self, job: UserImportJob) -> bool:
+        """
+        Сохраняет состояние задачи в Redis.
+
+        :param job: Состояние задачи.
+        :type job: UserImportJob
+        :returns: True, если состояние сохранено; False, если Redis недоступен.
+        :rtype: bool
+        """
+        job.updated_at = datetime.now(UTC)
+        return await self.cache.hset(
+            self.job_key(job.job_id), job.model_dump(mode="json", exclude_none=True), ttl=settings.IMPORT_JOB_TTL
+        )
+
+
+import_jobs = ImportJobManager(cache, db_manager.session)
+
+
+async def get_import_jobs() -> ImportJobManager:
+    """Предоставляет менеджер фоновых задач загрузки для зависимостей FastAPI."""
+    return import_jobs
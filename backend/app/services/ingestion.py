@@ -0,0 +1,208 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.crud.users import bulk_create_users
+from app.schemas.user import UserCreate, UserImportStats, UserOut, UserSkipped
+from app.services.api_client import iter_random_users
+from app.services.counters import queue_users_changed
+from app.services.user_existence import existence_filter
+
+InsertedCallback = Callable[[list[UserOut]], Awaitable[None]]
+ProgressCallback = Callable[[UserImportStats], Awaitable[None]]
+
+
+def parse_random_user(user_data: dict) -> UserCreate:
+    """
+    Преобразует запись randomuser.me в схему создания пользователя.
+
+    :param user_data: Запись пользователя в формате randomuser.me.
+    :type user_data: dict
+    :returns: Данные для создания пользователя.
+    :rtype: UserCreate
+    :raises ValidationError: Если данные не проходят валидацию.
+    """
+    return UserCreate(
+        gender=user_data["gender"],
+        title=user_data["name"]["title"],
+        first_name=user_data["name"]["first"],
+        last_name=user_data["name"]["last"],
+        street_number=user_data["location"]["street"]["number"],
+        street_name=user_data["location"]["street"]["name"],
+        city=user_data["location"]["city"],
+        state=user_data["location"]["state"],
+        country=user_data["location"]["country"],
+        postcode=str(user_data["location"]["postcode"]),
+        latitude=float(user_data["location"]["coordinates"]["latitude"]),
+        longitude=float(user_data["location"]["coordinates"]["longitude"]),
+        timezone_offset=user_data["location"]["timezone"]["offset"],
+        phone=user_data["phone"],
+        cell=user_data["cell"],
+        email=user_data["email"],
+        external_id=user_data["id"]["value"],
+        username=user_data["login"]["username"],
+        uuid=user_data["login"]["uuid"],
+        picture=user_data["picture"]["thumbnail"],
+        dob=user_data["dob"]["date"],
+        registered_at=user_data["registered"]["date"],
+        nat=user_data["nat"],
+    )
+
+
+def log_skipped_users(skipped: list[UserSkipped]) -> None:
+    """
+    Логирует записи, пропущенные при массовой вставке.
+
+    :param skipped: Отчет о пропущенных записях.
+    :type skipped: list[UserSkipped]
+    :returns: None
+    """
+    for user in skipped:
+        if user.reason == "email":
+            logger.warning(f"Duplicate email detected: {user.email}")
+        elif user.reason == "uuid":
+            logger.warning(f"Duplicate UUID detected: {user.uuid}")
+        else:
+            logger.error(f"Database integrity error for user {user.email}")
+
+
+class UserIngestionPipeline:
+    """
+    Конвейер загрузки пользователей из randomuser.me: fetch → validate → insert.
+
+    Стадии работают параллельно и связаны очередями емкостью ``INGEST_QUEUE_SIZE``:
+    пока одна пачка пишется в БД, следующие страницы уже валидируются и загружаются.
+    Пиковое потребление памяти не зависит от количества загружаемых пользователей.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        on_inserted: InsertedCallback | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> None:
+        """
+        Инициализирует конвейер.
+
+        :param db: Асинхронная сессия SQLAlchemy.
+        :type db: AsyncSession
+        :param on_inserted: Вызывается с каждой вставленной пачкой пользователей.
+        :type on_inserted: InsertedCallback | None
+        :param on_progress: Вызывается с накопленными счетчиками после каждой пачки.
+        :type on_progress: ProgressCallback | None
+        """
+        self.db = db
+        self.on_inserted = on_inserted
+        self.on_progress = on_progress
+        self.stats = UserImportStats()
+        self._pages: asyncio.Queue[list[dict] | None] = asyncio.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+        self._batches: asyncio.Queue[tuple[list[UserCreate], int] | None] = asyncio.Queue(
+            maxsize=settings.INGEST_QUEUE_SIZE
+        )
+
+    async def run(self, count: int) -> UserImportStats:
+        """
+        Запускает все стадии и ждет их завершения.
+
+        При ошибке любой стадии остальные отменяются, а ошибка пробрасывается.
+
+        :param count: Количество пользователей для загрузки.
+        :type count: int
+        :returns: Итоговые счетчики загрузки.
+        :rtype: UserImportStats
+        :raises httpx.HTTPError: Если страницу не удалось загрузить после повторов.
+        """
+        stages = [
+            asyncio.create_task(self._fetch(count)),
+            asyncio.create_task(self._validate()),
+            asyncio.create_task(self._insert()),
+        ]
+        try:
+            await asyncio.gather(*stages)
+        except BaseException:
+            for stage in stages:
+                stage.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            raise
+
+        return self.stats
+
+    async def _fetch(self, count: int) -> None:
+        """Загружает страницы из API в очередь страниц."""
+        async for page in iter_random_users(count):
+            self.stats.fetched += len(page)
+            await self._pages.put(page)
+        await self._pages.put(None)
+
+    async def _validate(self) -> None:
+        """Валидирует страницы и собирает пачки по ``INGEST_BATCH_SIZE`` записей."""
+        batch: list[UserCreate] = []
+        rejected = 0
+        while (page := await self._pages.get()) is not None:
+            for user_data in page:
+                try:
+                    batch.append(parse_random_user(user_data))
+                except ValidationError as e:
+                    rejected += 1
+                    logger.warning(f"Value is not a valid email address {user_data.get('email')}: {e}")
+            if len(batch) >= settings.INGEST_BATCH_SIZE:
+                await self._batches.put((batch, rejected))
+                batch, rejected = [], 0
+        if batch or rejected:
+            await self._batches.put((batch, rejected))
+        await self._batches.put(None)
+
+    async def _insert(self) -> None:
+        """
+        Вставляет пачки в БД и сообщает о прогрессе.
+
+        Счетчики ``processed`` и ``failed`` растут только после коммита пачки,
+        поэтому ``processed`` можно использовать как точку возобновления загрузки.
+        После вставки новых пользователей кэш страниц инвалидируется, кэшированный
+        счетчик пользователей сдвигается на количество вставленных записей, а новые ID
+        отмечаются в :data:`~app.services.user_existence.existence_filter`.
+        """
+        while (item := await self._batches.get()) is not None:
+            batch, rejected = item
+            created, skipped = await bulk_create_users(self.db, batch)
+            self.stats.inserted += len(created)
+            self.stats.duplicates += len(skipped)
+            self.stats.failed += rejected
+            self.stats.processed += len(batch) + rejected
+            log_skipped_users(skipped)
+            if created:
+                async with cache.pipeline() as pipe:
+                    queue_users_changed(pipe, len(created))
+                    existence_filter.queue_created(pipe, [user.id for user in created])
+            if self.on_inserted:
+                await self.on_inserted(created)
+            if self.on_progress:
+                await self.on_progress(self.stats)
+
+
+async def ingest_random_users(
+    db: AsyncSession,
+    count: int,
+    on_inserted: InsertedCallback | None = None,
+    on_progress: ProgressCallback | None = None,
+) -> UserImportStats:
+    """
+    Загружает пользователей из randomuser.me через :class:`UserIngestionPipeline`.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param count: Количество пользователей для загрузки.
+    :type count: int
+    :param on_inserted: Вызывается с каждой вставленной пачкой пользователей.
+    :type on_inserted: InsertedCallback | None
+    :param on_progress: Вызывается с накопленными счетчиками после каждой пачки.
+    :type on_progress: ProgressCallback | None
+    :returns: Итоговые счетчики загрузки.
+    :rtype: UserImportStats
+    """
+    return await UserIngestionPipeline(db, on_inserted, on_progress).run(count)
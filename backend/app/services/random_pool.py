@@ -0,0 +1,176 @@
+import asyncio
+import contextlib
+
+from app.core.cache import CachePipeline, RedisCache, cache
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.crud.users import get_random_users
+from app.db.session import SessionFactory, db_manager
+from app.schemas.user import UserOut
+
+POOL_KEY = "random_users:pool"
+POOL_INDEX_KEY = "random_users:index"
+POOL_EVICTED_KEY = "random_users:evicted"
+POOL_LOCK_KEY = "random_users:refresh_lock"
+
+# Атомарно пересобирает пул, пропуская пользователей, вытесненных во время выборки из БД.
+# KEYS: пул, индекс id -> элемент, вытесненные id; ARGV: пары id, сериализованный пользователь
+REBUILD_SCRIPT = """
+redis.call('DEL', KEYS[1], KEYS[2])
+for i = 1, #ARGV, 2 do
+    if redis.call('SISMEMBER', KEYS[3], ARGV[i]) == 0 then
+        redis.call('SADD', KEYS[1], ARGV[i + 1])
+        redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1])
+    end
+end
+redis.call('DEL', KEYS[3])
+return redis.call('SCARD', KEYS[1])
+"""
+
+# Удаляет пользователя из пула и запоминает его id до следующей пересборки.
+# KEYS: пул, индекс, вытесненные id; ARGV: id, TTL списка вытесненных
+EVICT_SCRIPT = """
+local member = redis.call('HGET', KEYS[2], ARGV[1])
+if member then
+    redis.call('SREM', KEYS[1], member)
+    redis.call('HDEL', KEYS[2], ARGV[1])
+end
+redis.call('SADD', KEYS[3], ARGV[1])
+redis.call('EXPIRE', KEYS[3], ARGV[2])
+return member and 1 or 0
+"""
+
+
+class RandomUserPool:
+    """
+    Пул случайных пользователей, заранее сериализованных в множество Redis.
+
+    Фоновая задача раз в ``RANDOM_POOL_REFRESH_INTERVAL`` секунд заменяет пул новой
+    случайной выборкой из ``RANDOM_POOL_SIZE`` пользователей, а эндпоинт ``/random``
+    получает пользователя одним ``SRANDMEMBER`` без обращения к БД. Обновленные
+    и удаленные пользователи вытесняются из пула через :meth:`evict`.
+    """
+
+    def __init__(
+        self,
+        cache: RedisCache,
+        session_factory: SessionFactory,
+        size: int = settings.RANDOM_POOL_SIZE,
+        interval: int = settings.RANDOM_POOL_REFRESH_INTERVAL,
+    ) -> None:
+        """
+        Инициализирует пул без запуска фоновой задачи.
+
+        :param cache: Клиент Redis для хранения пула.
+        :type cache: RedisCache
+        :param session_factory: Фабрика сессий БД для выборки пользователей.
+        :type session_factory: SessionFactory
+        :param size: Количество пользователей в пуле.
+        :type size: int
+        :param interval: Интервал обновления пула в секундах.
+        :type interval: int
+        """
+        self.cache = cache
+        self.session_factory = session_factory
+        self.size = size
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Запускает фоновое обновление пула."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Останавливает фоновое обновление пула."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def pick(self) -> UserOut | None:
+        """
+        Возвращает случайного пользователя из пула.
+
+        :returns: Пользователь или None, если пул пуст или Redis недоступен.
+        :rtype: UserOut | None
+        """
+        member = await self.cache.execute("srandmember", lambda: self.cache.client.srandmember(POOL_KEY), None)
+        return UserOut.model_validate_json(member) if member else None
+
+    async def pick_many(self, n: int) -> list[UserOut]:
+        """
+        Возвращает до ``n`` различных случайных пользователей из пула одним ``SRANDMEMBER``.
+
+        :param n: Количество пользователей.
+        :type n: int
+        :returns: Пользователи; меньше ``n``, если пул меньше или Redis недоступен.
+        :rtype: list[UserOut]
+        """
+        members = await self.cache.execute("srandmember", lambda: self.cache.client.srandmember(POOL_KEY, n), [])
+        return [UserOut.model_validate_json(member) for member in members]
+
+    async def evict(self, user_id: int) -> None:
+        """
+        Удаляет пользователя из пула.
+
+        ID запоминается до следующей пересборки, чтобы выборка, прочитанная из БД
+        до изменения пользователя, не вернула его устаревшую версию в пул.
+
+        :param user_id: ID пользователя.
+        :type user_id: int
+        :returns: None
+        """
+        async with self.cache.pipeline() as pipe:
+            self.queue_evict(pipe, user_id)
+
+    def queue_evict(self, pipe: CachePipeline, user_id: int) -> None:
+        """
+        Ставит вытеснение пользователя в конвейер вызывающего кода.
+
+        :param pipe: Конвейер команд Redis.
+        :type pipe: CachePipeline
+        :param user_id: ID пользователя.
+        :type user_id: int
+        """
+        pipe.eval(EVICT_SCRIPT, [POOL_KEY, POOL_INDEX_KEY, POOL_EVICTED_KEY], [user_id, self.interval * 2])
+
+    async def refresh(self) -> int:
+        """
+        Заменяет пул новой случайной выборкой пользователей.
+
+        Если пул уже обновил другой экземпляр приложения в текущем интервале, ничего не делает.
+
+        :returns: Количество пользователей в пуле или 0, если обновление пропущено.
+        :rtype: int
+        """
+        if not await self.cache.execute(
+            "pool lock", lambda: self.cache.client.set(POOL_LOCK_KEY, 1, nx=True, ex=self.interval), False
+        ):
+            return 0
+
+        async with self.session_factory() as session:
+            users = await get_random_users(session, self.size)
+
+        args = [value for user in users for value in (user.id, user.model_dump_json())]
+        return await self.cache.client.eval(REBUILD_SCRIPT, 3, POOL_KEY, POOL_INDEX_KEY, POOL_EVICTED_KEY, *args)
+
+    async def _refresh_loop(self) -> None:
+        """Обновляет пул с интервалом ``interval``, не прерываясь на ошибках."""
+        while True:
+            try:
+                size = await self.refresh()
+                if size:
+                    logger.info(f"Random user pool refreshed: {size} users")
+            except Exception as e:
+                logger.error(f"Random user pool refresh error: {e}")
+            await asyncio.sleep(self.interval)
+
+
+random_pool = RandomUserPool(cache, db_manager.session)
+
+
+async def get_random_pool() -> RandomUserPool:
+    """Предоставляет пул случайных пользователей для зависимостей FastAPI."""
+    return random_pool
@@ -0,0 +1,168 @@
+import asyncio
+import contextlib
+
+from app.core.cache import CachePipeline, RedisCache, cache
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.crud.users import get_user_ids_after
+from app.db.session import SessionFactory, db_manager
+
+EXISTS_KEY = "users:exists"
+EXISTS_BUILD_KEY = "users:exists:build"
+EXISTS_LOCK_KEY = "users:exists:build_lock"
+# Пользователя с ID 0 не бывает, поэтому бит 0 отмечает карту, построенную по всей таблице.
+# Биты, выставленные вставками до построения, без него не считаются полной картой
+READY_BIT = 0
+BUILD_BATCH_SIZE = 50_000
+
+# Объединяет построенную карту с текущей, не теряя биты, выставленные вставками во время построения.
+# KEYS: карта, временный ключ; ARGV: построенная карта
+MERGE_SCRIPT = """
+redis.call('SET', KEYS[2], ARGV[1])
+redis.call('BITOP', 'OR', KEYS[1], KEYS[1], KEYS[2])
+redis.call('DEL', KEYS[2])
+return 1
+"""
+
+
+class UserExistenceFilter:
+    """
+    Битовая карта ID существующих пользователей в Redis.
+
+    Бит пользователя выставляется при вставке и сбрасывается при удалении, а карта
+    целиком перестраивается по таблице раз в ``interval`` секунд одним воркером.
+    Пока карта не построена или Redis недоступен, все ID считаются возможно существующими.
+    Ложноположительный ответ стоит одного запроса к БД; ложноотрицательный возможен,
+    только если Redis не принял бит вставленного пользователя, и исправляется
+    следующим построением.
+    """
+
+    def __init__(
+        self,
+        cache: RedisCache,
+        session_factory: SessionFactory,
+        enabled: bool = settings.USER_EXISTENCE_FILTER,
+        interval: int = settings.USER_EXISTENCE_FILTER_INTERVAL,
+    ) -> None:
+        """
+        Инициализирует фильтр без построения карты.
+
+        :param cache: Клиент Redis.
+        :type cache: RedisCache
+        :param session_factory: Фабрика сессий БД для построения карты.
+        :type session_factory: SessionFactory
+        :param enabled: Проверять ли ID по карте.
+        :type enabled: bool
+        :param interval: Интервал перестроения карты, в секундах.
+        :type interval: int
+        """
+        self.cache = cache
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Запускает фоновое построение карты, если фильтр включен."""
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._build_loop())
+
+    async def stop(self) -> None:
+        """Останавливает фоновое построение карты."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def might_exist(self, user_ids: list[int]) -> list[int]:
+        """
+        Отбирает ID, которые могут принадлежать существующим пользователям, одной командой Redis.
+
+        :param user_ids: ID пользователей.
+        :type user_ids: list[int]
+        :returns: ID, которые есть в карте; все ID, если фильтр выключен или карта недоступна.
+        :rtype: list[int]
+        """
+        if not self.enabled or not user_ids:
+            return user_ids
+        bits = await self.cache.getbits(EXISTS_KEY, [READY_BIT, *user_ids])
+        if not bits or not bits[0]:
+            return user_ids
+        return [user_id for user_id, bit in zip(user_ids, bits[1:], strict=True) if bit]
+
+    def queue_created(self, pipe: CachePipeline, user_ids: list[int]) -> None:
+        """
+        Ставит в конвейер отметку новых пользователей.
+
+        Биты выставляются и при выключенном фильтре, чтобы карта оставалась верной
+        для воркеров, которые его используют. Отрицательные записи кэша удаляются,
+        а версии записей увеличиваются, чтобы промах, прочитанный до вставки, не записал их снова.
+
+        :param pipe: Конвейер команд Redis.
+        :type pipe: CachePipeline
+        :param user_ids: ID вставленных пользователей.
+        :type user_ids: list[int]
+        """
+        for user_id in user_ids:
+            pipe.bump_version(f"user:{user_id}")
+            pipe.setbit(EXISTS_KEY, user_id, 1)
+        pipe.delete(*(f"user:{user_id}" for user_id in user_ids))
+
+    def queue_deleted(self, pipe: CachePipeline, user_id: int) -> None:
+        """
+        Ставит в конвейер снятие отметки удаленного пользователя.
+
+        :param pipe: Конвейер команд Redis.
+        :type pipe: CachePipeline
+        :param user_id: ID пользователя.
+        :type user_id: int
+        """
+        pipe.setbit(EXISTS_KEY, user_id, 0)
+
+    async def build(self) -> int:
+        """
+        Строит карту по таблице пользователей и объединяет ее с текущей.
+
+        Если карту в текущем интервале уже строит другой экземпляр приложения, ничего не делает.
+
+        :returns: Количество пользователей в карте или 0, если построение пропущено.
+        :rtype: int
+        """
+        if not await self.cache.execute(
+            "exists lock", lambda: self.cache.client.set(EXISTS_LOCK_KEY, 1, nx=True, ex=self.interval), False
+        ):
+            return 0
+
+        bitmap = bytearray(1)
+        count, after_id = 0, 0
+        async with self.session_factory() as session:
+            while user_ids := await get_user_ids_after(session, BUILD_BATCH_SIZE, after_id):
+                # Как в SETBIT: бит N — это бит 7 - N % 8 байта N // 8
+                bitmap.extend(bytes(user_ids[-1] // 8 + 1 - len(bitmap)))
+                for user_id in user_ids:
+                    bitmap[user_id >> 3] |= 0x80 >> (user_id & 7)
+                count += len(user_ids)
+                after_id = user_ids[-1]
+        bitmap[0] |= 0x80 >> READY_BIT
+
+        await self.cache.execute(
+            "bitop",
+            lambda: self.cache.raw_client.eval(MERGE_SCRIPT, 2, EXISTS_KEY, EXISTS_BUILD_KEY, bytes(bitmap)),
+            None,
+        )
+        return count
+
+    async def _build_loop(self) -> None:
+        """Перестраивает карту с интервалом ``interval``, не прерываясь на ошибках."""
+        while True:
+            try:
+                count = await self.build()
+                if count:
+                    logger.info(f"User existence filter built: {count} users")
+            except Exception as e:
+                logger.error(f"User existence filter build error: {e}")
+            await asyncio.sleep(self.interval)
+
+
+existence_filter = UserExistenceFilter(cache, db_manager.session)
@@ -1,93 +1,119 @@
-from pydantic import ValidationError
-from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
+import base64
+import binascii
+from collections.abc import Awaitable, Callable
+import hashlib
+import random
+import time
+from typing import TypeVar
+
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql import func
 
-from app.core.cache import RedisCache
-from app.core.logging import logger
-from app.db.crud.users import create_user, delete_user, get_user, get_users, update_user
-from app.db.models.user import User
-from app.schemas.user import UserCreate, UserOut, UserUpdate
-from app.services.api_client import fetch_random_users
+from app.core.cache import CachePipeline, CachePolicy, RedisCache, version_key
+from app.core.config import settings
+from app.db.crud.users import (
+    delete_user,
+    get_random_users,
+    get_users,
+    get_users_after,
+    get_users_by_ids,
+    update_user,
+)
+from app.db.session import db_manager
+from app.schemas.user import UserBatch, UserOut, UserUpdate
+from app.services.counters import (
+    USERS_REVISION_KEY,
+    get_users_generation,
+    get_users_revision,
+    queue_users_changed,
+    queue_users_updated,
+)
+from app.services.ingestion import ingest_random_users
+from app.services.random_pool import RandomUserPool, random_pool
+from app.services.user_existence import existence_filter
+
+USERS_CACHE = CachePolicy(settings.USERS_CACHE_TTL, settings.USERS_CACHE_STALE_TTL, settings.USERS_CACHE_XFETCH_BETA)
+USER_CACHE = CachePolicy(settings.USER_CACHE_TTL, settings.USER_CACHE_STALE_TTL, settings.USER_CACHE_XFETCH_BETA)
+USER_ADAPTER = TypeAdapter(UserOut)
+USERS_ADAPTER = TypeAdapter(list[UserOut])
+T = TypeVar("T")
+# Значение ``user:{id}`` для ID, которого нет в БД
+MISSING_USER = "missing"
 
 
 async def fetch_and_save_users(db: AsyncSession, count: int) -> list[UserOut]:
     """
     Загружает и сохраняет указанное количество пользователей из randomuser.me.
 
+    Загрузка, валидация и вставка выполняются конвейером :func:`ingest_random_users`,
+    дубликаты пропускаются и логируются.
+
     :param db: Асинхронная сессия SQLAlchemy.
     :type db: AsyncSession
     :param count: Количество пользователей для загрузки.
     :type count: int
     :returns: Список созданных пользователей.
     :rtype: List[UserOut]
-    :raises ValueError: Если count > 10000.
+    :raises ValueError: Если count > 5000.
     """
     if count > 5000:
-        raise ValueError("Too many users requested, max - 5000")
-
-    users_data_response: dict = await fetch_random_users(count)  # Получаем данные пользователей из randomuser.me.
-    if not users_data_response or "results" not in users_data_response:
-        logger.error("Failed to fetch users or response format is incorrect.")
-        return []
+        raise ValueError("Too many users requested, max - 5000, use background=true for larger imports")
 
     users: list[UserOut] = []
-    for user_data in users_data_response["results"]:
-        try:
-            user = UserCreate(
-                gender=user_data["gender"],
-                title=user_data["name"]["title"],
-                first_name=user_data["name"]["first"],
-                last_name=user_data["name"]["last"],
-                street_number=user_data["location"]["street"]["number"],
-                street_name=user_data["location"]["street"]["name"],
-                city=user_data["location"]["city"],
-                state=user_data["location"]["state"],
-                country=user_data["location"]["country"],
-                postcode=str(user_data["location"]["postcode"]),
-                latitude=float(user_data["location"]["coordinates"]["latitude"]),
-                longitude=float(user_data["location"]["coordinates"]["longitude"]),
-                timezone_offset=user_data["location"]["timezone"]["offset"],
-                phone=user_data["phone"],
-                cell=user_data["cell"],
-                email=user_data["email"],
-                external_id=user_data["id"]["value"],
-                username=user_data["login"]["username"],
-                uuid=user_data["login"]["uuid"],
-                picture=user_data["picture"]["thumbnail"],
-                dob=user_data["dob"]["date"],
-                registered_at=user_data["registered"]["date"],
-                nat=user_data["nat"],
-            )
-            user_out: UserOut = await create_user(db, user)
-            users.append(user_out)
-        except ValidationError as e:
-            await db.rollback()
-
-            logger.warning(f"Value is not a valid email address {user_data['email']}: {e}")
-            continue
-        except IntegrityError as e:
-            await db.rollback()
-
-            error_msg = str(e.orig)
-            if "email" in error_msg:
-                logger.warning(f"Duplicate email detected: {user_data['email']}")
-            elif "username" in error_msg:
-                logger.warning(f"Duplicate username detected: {user_data['username']}")
-            elif "uuid" in error_msg:
-                logger.warning(f"Duplicate UUID detected: {user_data['uuid']}")
-            else:
-                logger.error(f"Database integrity error: {e}")
-            continue
 
+    async def collect(created: list[UserOut]) -> None:
+        users.extend(created)
+
+    await ingest_random_users(db, count, on_inserted=collect)
     return users
 
 
-async def get_users_service(db: AsyncSession, cache: RedisCache, limit: int, offset: int) -> list[UserOut]:
+def encode_cursor(user_id: int) -> str:
+    """
+    Кодирует ID последнего пользователя страницы в непрозрачный курсор.
+
+    :param user_id: ID пользователя.
+    :type user_id: int
+    :returns: Курсор в base64url.
+    :rtype: str
+    """
+    return base64.urlsafe_b64encode(f"id:{user_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Декодирует курсор, полученный из :func:`encode_cursor`.
+
+    :param cursor: Курсор в base64url.
+    :type cursor: str
+    :returns: ID пользователя, после которого начинается страница.
+    :rtype: int
+    :raises ValueError: Если курсор поврежден.
+    """
+    try:
+        prefix, _, user_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().partition(":")
+        if prefix != "id" or not user_id.isdigit():
+            raise ValueError
+        return int(user_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor") from None
+
+
+async def get_users_service(
+    db: AsyncSession, cache: RedisCache, limit: int, offset: int = 0, after: str | None = None
+) -> tuple[list[UserOut], str | None]:
     """
     Получает список пользователей с пагинацией.
 
+    Если передан курсор ``after``, страница выбирается по индексу первичного ключа
+    (keyset-пагинация), иначе используется OFFSET. В обоих режимах пользователи
+    упорядочены по ID, а для полной страницы возвращается курсор следующей.
+    В кэше страницы хранятся списками ID, а сами пользователи — в общих ключах
+    ``user:{id}``, поэтому перекрывающиеся страницы не дублируют данные, а обновление
+    пользователя затрагивает только его запись. Ключи страниц содержат поколение
+    (:func:`get_users_generation`): вставка и удаление, меняющие состав страниц,
+    инвалидируют все страницы одним ``INCR``.
+
     :param db: Асинхронная сессия SQLAlchemy.
     :type db: AsyncSession
     :param cache: Класс для работы с Redis кэшем.
@@ -96,22 +122,418 @@ async def get_users_service(db: AsyncSession, cache: RedisCache, limit: int, off
     :type limit: int
     :param offset: Смещение для пагинации.
     :type offset: int
+    :param after: Курсор следующей страницы из предыдущего ответа.
+    :type after: str | None
+    :returns: Список пользователей и курсор следующей страницы (None, если страница последняя).
+    :rtype: tuple[list[UserOut], str | None]
+    :raises ValueError: Если курсор поврежден.
+    """
+    if limit <= 0:
+        return [], None
+
+    generation = await get_users_generation(cache)
+    if after is not None:
+        users = await _get_users_page_after(db, cache, generation, limit, decode_cursor(after))
+    else:
+        users = await _get_users_window(db, cache, generation, limit, offset)
+
+    next_cursor = encode_cursor(users[-1].id) if users and len(users) == limit else None
+    return users, next_cursor
+
+
+def make_etag(body: bytes) -> str:
+    """
+    Вычисляет сильный ETag тела ответа.
+
+    :param body: Тело ответа.
+    :type body: bytes
+    :returns: ETag в кавычках.
+    :rtype: str
+    """
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+async def get_users_page_body(
+    db: AsyncSession, cache: RedisCache, limit: int, offset: int = 0, after: str | None = None
+) -> tuple[bytes, str | None, str]:
+    """
+    Получает страницу пользователей в виде готового JSON-тела ответа.
+
+    Тело страницы кэшируется целиком вместе с курсором и ETag в хеше, ключ которого
+    содержит ревизию пользователей (:func:`queue_users_updated`), поэтому попадание
+    стоит одного скрипта Redis и не требует декодирования и повторной сериализации
+    пользователей. При промахе страница собирается через :func:`get_users_service`.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param limit: Количество записей на страницу.
+    :type limit: int
+    :param offset: Смещение для пагинации.
+    :type offset: int
+    :param after: Курсор следующей страницы из предыдущего ответа.
+    :type after: str | None
+    :returns: JSON-массив пользователей, курсор следующей страницы (None, если страница последняя) и ETag.
+    :rtype: tuple[bytes, str | None, str]
+    :raises ValueError: Если курсор поврежден.
+    """
+    key_prefix = f"body:users:limit={limit}:offset={offset}:after={after}:"
+    revision, (body, cursor, etag) = await cache.get_versioned(
+        USERS_REVISION_KEY, key_prefix, ["body", "cursor", "etag"]
+    )
+    if body is not None and etag is not None:
+        return body, cursor.decode() if cursor else None, etag.decode()
+
+    users, next_cursor = await get_users_service(db, cache, limit, offset, after)
+    body = USERS_ADAPTER.dump_json(users)
+    etag = make_etag(body)
+    # Ревизия прочитана до запроса к БД: если пользователи изменились за это время, ключ уже недостижим
+    await cache.hset(
+        f"{key_prefix}{revision}",
+        {"body": body, "cursor": next_cursor or "", "etag": etag},
+        ttl=settings.USERS_CACHE_TTL,
+    )
+    return body, next_cursor, etag
+
+
+async def _get_users_page_after(
+    db: AsyncSession, cache: RedisCache, generation: int, limit: int, after_id: int
+) -> list[UserOut]:
+    """
+    Получает страницу по курсору, кэшируя ее списком ID.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param generation: Поколение кэша страниц.
+    :type generation: int
+    :param limit: Количество записей на страницу.
+    :type limit: int
+    :param after_id: ID последнего пользователя предыдущей страницы.
+    :type after_id: int
     :returns: Список пользователей.
-    :rtype: List[UserOut]
+    :rtype: list[UserOut]
+    """
+    cache_key = f"users:{generation}:limit={limit}:after={after_id}"
+    users = await _read_page(db, cache, cache_key, limit, after_id)
+    if users is not None:
+        return users
+    return await _single_flight(
+        cache, cache_key, lambda session: _load_page_after(session, cache, cache_key, limit, after_id)
+    )
+
+
+async def _read_page(
+    db: AsyncSession, cache: RedisCache, cache_key: str, limit: int, after_id: int
+) -> list[UserOut] | None:
+    """
+    Читает страницу, закэшированную списком ID, и обновляет ее в фоне, если она устарела.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param cache_key: Ключ страницы.
+    :type cache_key: str
+    :param limit: Количество записей на страницу.
+    :type limit: int
+    :param after_id: ID последнего пользователя предыдущей страницы.
+    :type after_id: int
+    :returns: Список пользователей или None, если страницы нет в кэше или она ссылается на удаленных.
+    :rtype: list[UserOut] | None
+    """
+    cached_ids, stale = USERS_CACHE.unwrap(await cache.get(cache_key))
+    if not cached_ids:
+        return None
+    found = await resolve_users(db, cache, cached_ids)
+    # Пользователь удален после кэширования страницы: страница устарела
+    if len(found) < len(cached_ids):
+        return None
+    if stale:
+        _refresh_in_background(
+            cache, [cache_key], lambda session, _: _store_page_after(session, cache, cache_key, limit, after_id)
+        )
+    return [found[user_id] for user_id in cached_ids]
+
+
+async def _load_page_after(
+    db: AsyncSession, cache: RedisCache, cache_key: str, limit: int, after_id: int
+) -> list[UserOut]:
+    """
+    Загружает страницу по курсору, если ее еще нет в кэше.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param cache_key: Ключ страницы.
+    :type cache_key: str
+    :param limit: Количество записей на страницу.
+    :type limit: int
+    :param after_id: ID последнего пользователя предыдущей страницы.
+    :type after_id: int
+    :returns: Список пользователей.
+    :rtype: list[UserOut]
     """
-    cache_key = f"users:limit={limit}:offset={offset}"
-    cached_users = await cache.get(cache_key)
-    if cached_users:
-        return [UserOut(**user) for user in cached_users]
+    # Пока ждали блокировку загрузки, страницу мог закэшировать другой воркер
+    users = await _read_page(db, cache, cache_key, limit, after_id)
+    if users is not None:
+        return users
+    return await _store_page_after(db, cache, cache_key, limit, after_id)
 
-    users: list[UserOut] = await get_users(db, limit, offset)
+
+async def _store_page_after(
+    db: AsyncSession, cache: RedisCache, cache_key: str, limit: int, after_id: int
+) -> list[UserOut]:
+    """
+    Загружает страницу по курсору из БД и кэширует ее.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param cache_key: Ключ страницы.
+    :type cache_key: str
+    :param limit: Количество записей на страницу.
+    :type limit: int
+    :param after_id: ID последнего пользователя предыдущей страницы.
+    :type after_id: int
+    :returns: Список пользователей.
+    :rtype: list[UserOut]
+    """
+    revision = await get_users_revision(cache)
+    started = time.perf_counter()
+    users = await get_users_after(db, limit, after_id)
+    delta = time.perf_counter() - started
     if users:
-        await cache.set(cache_key, [user.model_dump() for user in users], ttl=300)
-        # Добавляем ключ страницы в множество user_pages
-        await cache.sadd("user_pages", cache_key)
+        async with cache.pipeline() as pipe:
+            pipe.set(cache_key, USERS_CACHE.wrap([user.id for user in users], delta), ttl=USERS_CACHE.hard_ttl)
+            _queue_users(pipe, users, delta, revision)
     return users
 
 
+async def _get_users_window(
+    db: AsyncSession, cache: RedisCache, generation: int, limit: int, offset: int
+) -> list[UserOut]:
+    """
+    Получает окно ``[offset, offset + limit)`` из выровненных блоков.
+
+    Список пользователей делится на блоки по ``USERS_CACHE_BLOCK_SIZE`` строк, и в кэше
+    хранятся списки ID блоков, а не отдельных страниц. Любое окно собирается из одного
+    или нескольких блоков, поэтому страницы разного размера с разными смещениями
+    используют одни и те же ключи. Отсутствующие блоки загружаются одним запросом,
+    одновременные запросы тех же блоков ждут его результата. Устаревшие блоки
+    отдаются сразу и обновляются в фоне.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param generation: Поколение кэша страниц.
+    :type generation: int
+    :param limit: Количество записей на страницу.
+    :type limit: int
+    :param offset: Смещение для пагинации.
+    :type offset: int
+    :returns: Список пользователей.
+    :rtype: list[UserOut]
+    """
+    block_size = settings.USERS_CACHE_BLOCK_SIZE
+    blocks = range(offset // block_size, (offset + limit - 1) // block_size + 1)
+    block_ids, stale = await _read_blocks(cache, generation, blocks)
+    if stale:
+        _refresh_in_background(
+            cache,
+            [_block_key(generation, block) for block in stale],
+            lambda session, _: _store_blocks(session, cache, generation, range(stale[0], stale[-1] + 1)),
+        )
+
+    loaded: dict[int, UserOut] = {}
+    missing = [index for index, ids in enumerate(block_ids) if ids is None]
+    if missing:
+        # Один запрос на весь диапазон от первого до последнего отсутствующего блока
+        span = blocks[missing[0] : missing[-1] + 1]
+        block_ids[missing[0] : missing[-1] + 1], loaded = await _single_flight(
+            cache,
+            f"users:{generation}:blocks={span[0]}-{span[-1]}",
+            lambda session: _load_blocks(session, cache, generation, span),
+        )
+
+    start = offset - blocks[0] * block_size
+    window = [user_id for ids in block_ids for user_id in ids][start : start + limit]
+    found = loaded | await resolve_users(db, cache, [user_id for user_id in window if user_id not in loaded])
+    # Пользователь удален после кэширования блока: блок устарел
+    if len(found) < len(window):
+        return await get_users(db, limit, offset)
+    return [found[user_id] for user_id in window]
+
+
+def _block_key(generation: int, block: int) -> str:
+    """
+    Возвращает ключ блока списка пользователей.
+
+    :param generation: Поколение кэша страниц.
+    :type generation: int
+    :param block: Номер блока.
+    :type block: int
+    :returns: Ключ Redis.
+    :rtype: str
+    """
+    return f"users:{generation}:block={block}"
+
+
+async def _read_blocks(cache: RedisCache, generation: int, blocks: range) -> tuple[list[list[int] | None], list[int]]:
+    """
+    Читает блоки списка пользователей из кэша.
+
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param generation: Поколение кэша страниц.
+    :type generation: int
+    :param blocks: Номера блоков.
+    :type blocks: range
+    :returns: Списки ID блоков (None для отсутствующих) и номера блоков, которые пора обновить.
+    :rtype: tuple[list[list[int] | None], list[int]]
+    """
+    entries = await cache.get_many([_block_key(generation, block) for block in blocks])
+    block_ids, stale = [], []
+    for block, entry in zip(blocks, entries, strict=True):
+        ids, refresh = USERS_CACHE.unwrap(entry)
+        block_ids.append(ids)
+        if refresh:
+            stale.append(block)
+    return block_ids, stale
+
+
+async def _load_blocks(
+    db: AsyncSession, cache: RedisCache, generation: int, blocks: range
+) -> tuple[list[list[int]], dict[int, UserOut]]:
+    """
+    Загружает идущие подряд блоки, если их еще нет в кэше.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param generation: Поколение кэша страниц.
+    :type generation: int
+    :param blocks: Номера блоков.
+    :type blocks: range
+    :returns: Списки ID блоков и загруженные из БД пользователи по ID.
+    :rtype: tuple[list[list[int]], dict[int, UserOut]]
+    """
+    # Пока ждали блокировку загрузки, блоки мог закэшировать другой воркер
+    cached, _ = await _read_blocks(cache, generation, blocks)
+    if all(ids is not None for ids in cached):
+        return cached, {}
+    return await _store_blocks(db, cache, generation, blocks)
+
+
+async def _store_blocks(
+    db: AsyncSession, cache: RedisCache, generation: int, blocks: range
+) -> tuple[list[list[int]], dict[int, UserOut]]:
+    """
+    Загружает идущие подряд блоки списка пользователей из БД одним запросом и кэширует их.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param generation: Поколение кэша страниц.
+    :type generation: int
+    :param blocks: Номера блоков.
+    :type blocks: range
+    :returns: Списки ID блоков и загруженные из БД пользователи по ID.
+    :rtype: tuple[list[list[int]], dict[int, UserOut]]
+    """
+    block_size = settings.USERS_CACHE_BLOCK_SIZE
+    revision = await get_users_revision(cache)
+    started = time.perf_counter()
+    users = await get_users(db, len(blocks) * block_size, blocks[0] * block_size)
+    delta = time.perf_counter() - started
+    block_ids = [[user.id for user in users[i * block_size : (i + 1) * block_size]] for i in range(len(blocks))]
+    async with cache.pipeline() as pipe:
+        for block, ids in zip(blocks, block_ids, strict=True):
+            pipe.set(_block_key(generation, block), USERS_CACHE.wrap(ids, delta), ttl=USERS_CACHE.hard_ttl)
+        _queue_users(pipe, users, delta, revision)
+    return block_ids, {user.id: user for user in users}
+
+
+def _queue_users(pipe: CachePipeline, users: list[UserOut], delta: float, revision: int) -> None:
+    """
+    Ставит в конвейер запись пользователей в ключи ``user:{id}``.
+
+    ID пользователей страницы неизвестны до запроса к БД, поэтому их версии нельзя
+    прочитать заранее. Вместо них проверяется ревизия пользователей: если за время
+    запроса кого-то обновили или удалили, записи не пишутся, чтобы не перезаписать
+    новые данные, записанные при обновлении.
+
+    :param pipe: Конвейер команд Redis.
+    :type pipe: CachePipeline
+    :param users: Пользователи.
+    :type users: list[UserOut]
+    :param delta: Время загрузки пользователей в секундах.
+    :type delta: float
+    :param revision: Ревизия пользователей, прочитанная до запроса к БД.
+    :type revision: int
+    """
+    pipe.set_many_if_version(
+        {f"user:{user.id}": USER_CACHE.wrap(user.model_dump(), delta) for user in users},
+        USERS_REVISION_KEY,
+        revision,
+        ttl=USER_CACHE.hard_ttl,
+    )
+
+
+def _refresh_in_background(
+    cache: RedisCache, keys: list[str], store: Callable[[AsyncSession, list[str]], Awaitable[object]]
+) -> None:
+    """
+    Обновляет устаревшие ключи в фоне в отдельной сессии БД.
+
+    Сессия запроса закрывается вместе с ним, поэтому фоновое обновление открывает свою.
+
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param keys: Устаревшие ключи.
+    :type keys: list[str]
+    :param store: Загружает значения ключей из БД и записывает их в кэш.
+    :type store: Callable[[AsyncSession, list[str]], Awaitable[object]]
+    """
+
+    async def refresh(acquired: list[str]) -> None:
+        async with db_manager.session() as session:
+            await store(session, acquired)
+
+    cache.refresh_in_background(keys, refresh)
+
+
+async def _single_flight(cache: RedisCache, key: str, load: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    """
+    Загружает отсутствующий в кэше ключ через :meth:`RedisCache.single_flight` в отдельной сессии БД.
+
+    Загрузку разделяют все одновременные запросы ключа, и она продолжается после отмены
+    запроса, который ее начал. Его сессия закрывается вместе с ним, поэтому загрузка открывает свою.
+
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param key: Ключ кэша.
+    :type key: str
+    :param load: Читает значение из кэша или загружает его из БД и кэширует.
+    :type load: Callable[[AsyncSession], Awaitable[T]]
+    :returns: Результат загрузки.
+    :rtype: T
+    """
+
+    async def run() -> T:
+        async with db_manager.session() as session:
+            return await load(session)
+
+    return await cache.single_flight(key, run)
+
+
 async def get_user_service(db: AsyncSession, cache: RedisCache, user_id: int) -> UserOut | None:
     """
     Получает пользователя по ID.
@@ -126,14 +548,202 @@ async def get_user_service(db: AsyncSession, cache: RedisCache, user_id: int) ->
     :rtype: Optional[UserOut]
     """
     cache_key = f"user:{user_id}"
-    cached_user = await cache.get(cache_key)
-    if cached_user:
-        return UserOut(**cached_user)
+    cached, user = await _read_user(cache, cache_key, user_id)
+    if cached:
+        return user
+    if not await existence_filter.might_exist([user_id]):
+        return None
+    return await _single_flight(cache, cache_key, lambda session: _load_user(session, cache, cache_key, user_id))
 
-    user: UserOut = await get_user(db, user_id)
-    if user:
-        await cache.set(cache_key, user.model_dump(), ttl=300)
-    return user
+
+async def get_user_body(db: AsyncSession, cache: RedisCache, user_id: int) -> tuple[bytes, str] | None:
+    """
+    Получает пользователя по ID в виде готового JSON-тела ответа.
+
+    Тело и его ETag кэшируются в хеше ``body:user:{id}:{версия}``, где версия — счетчик
+    ``user:{id}``, который увеличивается при обновлении и удалении пользователя. Поэтому
+    тело, собранное из данных, прочитанных до изменения, попадает в уже недостижимый ключ.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param user_id: ID пользователя.
+    :type user_id: int
+    :returns: JSON пользователя и ETag или None, если пользователь не найден.
+    :rtype: tuple[bytes, str] | None
+    """
+    key_prefix = f"body:user:{user_id}:"
+    version, (body, etag) = await cache.get_versioned(version_key(f"user:{user_id}"), key_prefix, ["body", "etag"])
+    if body is not None and etag is not None:
+        return body, etag.decode()
+
+    user = await get_user_service(db, cache, user_id)
+    if user is None:
+        return None
+    body = USER_ADAPTER.dump_json(user)
+    etag = make_etag(body)
+    # Версия прочитана до пользователя: если его изменили за это время, ключ уже недостижим
+    await cache.hset(f"{key_prefix}{version}", {"body": body, "etag": etag}, ttl=settings.USER_CACHE_TTL)
+    return body, etag
+
+
+async def _read_user(cache: RedisCache, cache_key: str, user_id: int) -> tuple[bool, UserOut | None]:
+    """
+    Читает пользователя из кэша и обновляет запись в фоне, если она устарела.
+
+    Отсутствие пользователя тоже кэшируется (:data:`MISSING_USER`), и такая запись считается попаданием.
+
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param cache_key: Ключ пользователя.
+    :type cache_key: str
+    :param user_id: ID пользователя.
+    :type user_id: int
+    :returns: Найдена ли запись в кэше и пользователь (None, если закэшировано его отсутствие).
+    :rtype: tuple[bool, UserOut | None]
+    """
+    entry = await cache.get(cache_key)
+    if entry == MISSING_USER:
+        return True, None
+    cached_user, stale = USER_CACHE.unwrap(entry)
+    if not cached_user:
+        return False, None
+    if stale:
+        _refresh_in_background(cache, [cache_key], lambda session, _: _store_users(session, cache, [user_id]))
+    return True, UserOut(**cached_user)
+
+
+async def _load_user(db: AsyncSession, cache: RedisCache, cache_key: str, user_id: int) -> UserOut | None:
+    """
+    Загружает пользователя, если его еще нет в кэше.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param cache_key: Ключ пользователя.
+    :type cache_key: str
+    :param user_id: ID пользователя.
+    :type user_id: int
+    :returns: Пользователь или None, если не найден.
+    :rtype: Optional[UserOut]
+    """
+    # Пока ждали блокировку загрузки, пользователя мог закэшировать другой воркер
+    cached, user = await _read_user(cache, cache_key, user_id)
+    if cached:
+        return user
+    users = await _store_users(db, cache, [user_id])
+    return users[0] if users else None
+
+
+async def _store_users(db: AsyncSession, cache: RedisCache, user_ids: list[int]) -> list[UserOut]:
+    """
+    Загружает пользователей по ID из БД одним запросом и кэширует их.
+
+    Версии записей читаются до запроса к БД: если пользователя за это время обновили,
+    его запись уже содержит новые данные и не перезаписывается прочитанными.
+    Для ненайденных ID на ``USER_NEGATIVE_CACHE_TTL`` секунд кэшируется :data:`MISSING_USER`.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param user_ids: ID пользователей.
+    :type user_ids: list[int]
+    :returns: Найденные пользователи.
+    :rtype: list[UserOut]
+    """
+    versions = await cache.get_versions([f"user:{user_id}" for user_id in user_ids])
+    started = time.perf_counter()
+    users = await get_users_by_ids(db, user_ids)
+    delta = time.perf_counter() - started
+    if versions is None:
+        return users
+    if users:
+        await cache.set_many_if_unchanged(
+            {f"user:{user.id}": USER_CACHE.wrap(user.model_dump(), delta) for user in users},
+            versions,
+            ttl=USER_CACHE.hard_ttl,
+        )
+    missing = set(user_ids).difference(user.id for user in users)
+    if missing and settings.USER_NEGATIVE_CACHE_TTL:
+        await cache.set_many_if_unchanged(
+            {f"user:{user_id}": MISSING_USER for user_id in missing}, versions, ttl=settings.USER_NEGATIVE_CACHE_TTL
+        )
+    return users
+
+
+async def resolve_users(db: AsyncSession, cache: RedisCache, user_ids: list[int]) -> dict[int, UserOut]:
+    """
+    Находит пользователей по ID сначала в кэше, затем в базе данных.
+
+    Закэшированные пользователи читаются одним ``MGET``, промахи загружаются одним
+    запросом к БД и записываются в кэш одним конвейером. Устаревшие записи
+    отдаются сразу и обновляются в фоне. ID с закэшированным отсутствием и ID,
+    которых нет в :data:`~app.services.user_existence.existence_filter`, в БД не запрашиваются.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param user_ids: Уникальные ID пользователей.
+    :type user_ids: list[int]
+    :returns: Найденные пользователи по ID.
+    :rtype: dict[int, UserOut]
+    """
+    if not user_ids:
+        return {}
+    found: dict[int, UserOut] = {}
+    stale: list[int] = []
+    missing: set[int] = set()
+    for user_id, entry in zip(user_ids, await cache.get_many([f"user:{user_id}" for user_id in user_ids]), strict=True):
+        if entry == MISSING_USER:
+            missing.add(user_id)
+            continue
+        value, refresh = USER_CACHE.unwrap(entry)
+        if value:
+            found[user_id] = UserOut(**value)
+        if refresh:
+            stale.append(user_id)
+    if stale:
+        _refresh_in_background(
+            cache,
+            [f"user:{user_id}" for user_id in stale],
+            lambda session, keys: _store_users(session, cache, [int(key.removeprefix("user:")) for key in keys]),
+        )
+
+    misses = [user_id for user_id in user_ids if user_id not in found and user_id not in missing]
+    misses = await existence_filter.might_exist(misses)
+    loaded = await _store_users(db, cache, misses) if misses else []
+    found.update((user.id, user) for user in loaded)
+    return found
+
+
+async def get_users_batch_service(db: AsyncSession, cache: RedisCache, user_ids: list[int]) -> UserBatch:
+    """
+    Получает пользователей по списку ID через :func:`resolve_users`.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param cache: Класс для работы с Redis кэшем.
+    :type cache: RedisCache
+    :param user_ids: ID пользователей; порядок и повторы сохраняются в ответе.
+    :type user_ids: list[int]
+    :returns: Пользователи в порядке запроса и список ненайденных ID.
+    :rtype: UserBatch
+    :raises ValueError: Если ID больше ``USERS_BATCH_MAX_IDS``.
+    """
+    if len(user_ids) > settings.USERS_BATCH_MAX_IDS:
+        raise ValueError(f"Too many ids requested, max - {settings.USERS_BATCH_MAX_IDS}")
+
+    unique_ids = list(dict.fromkeys(user_ids))
+    found = await resolve_users(db, cache, unique_ids)
+
+    return UserBatch(
+        users=[found.get(user_id) for user_id in user_ids],
+        missing=[user_id for user_id in unique_ids if user_id not in found],
+    )
 
 
 async def update_user_service(
@@ -155,10 +765,13 @@ async def update_user_service(
     """
     user: UserOut = await update_user(db, user_id, user_data)
     if user:
-        # Инвалидация кэша
-        await cache.delete(f"user:{user_id}")
-        # Инвалидация кэша всех страниц
-        await cache.delete("user_pages")
+        # В транзакции новая запись пользователя не видна без инвалидации тел ответов со списками
+        async with cache.pipeline(transaction=True) as pipe:
+            # Страницы хранят только ID, поэтому достаточно обновить запись пользователя.
+            # Новая версия записи делает недостижимым и готовое тело ответа с пользователем
+            pipe.set_versioned(f"user:{user_id}", USER_CACHE.wrap(user.model_dump()), ttl=USER_CACHE.hard_ttl)
+            queue_users_updated(pipe)
+            random_pool.queue_evict(pipe, user_id)
     return user
 
 
@@ -177,8 +790,13 @@ async def delete_user_service(db: AsyncSession, cache: RedisCache, user_id: int)
     """
     success = await delete_user(db, user_id)
     if success:
-        await cache.delete(f"user:{user_id}")
-        await cache.delete("user_pages")
+        async with cache.pipeline() as pipe:
+            # Новая версия не даст записать в кэш пользователя, прочитанного до удаления
+            pipe.bump_version(f"user:{user_id}")
+            pipe.delete(f"user:{user_id}")
+            queue_users_changed(pipe, count_delta=-1)
+            random_pool.queue_evict(pipe, user_id)
+            existence_filter.queue_deleted(pipe, user_id)
     return success
 
 
@@ -186,13 +804,45 @@ async def get_random_user_service(db: AsyncSession) -> UserOut | None:
     """
     Получает случайного пользователя из базы данных.
 
+    Выбор выполняется через :func:`get_random_users` и не зависит от размера таблицы.
+
     :param db: Асинхронная сессия SQLAlchemy.
     :type db: AsyncSession
     :returns: Случайный пользователь или None, если база пуста.
     :rtype: Optional[UserOut]
     """
-    stmt = select(User).order_by(func.random()).limit(1)
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
+    users = await get_random_users(db, 1)
+    return users[0] if users else None
+
+
+async def get_random_users_service(
+    db: AsyncSession, pool: RandomUserPool, n: int, seed: int | None = None
+) -> list[UserOut]:
+    """
+    Получает ``n`` различных случайных пользователей за один запрос.
+
+    Без ``seed`` пользователи берутся из пула в Redis, а если его не хватает — выбираются
+    из базы данных. С ``seed`` выборка всегда выполняется в базе данных генератором
+    ``random.Random(seed)``, поэтому на неизменной таблице она воспроизводима.
+
+    :param db: Асинхронная сессия SQLAlchemy.
+    :type db: AsyncSession
+    :param pool: Пул случайных пользователей.
+    :type pool: RandomUserPool
+    :param n: Количество пользователей.
+    :type n: int
+    :param seed: Зерно генератора для воспроизводимой выборки.
+    :type seed: int | None
+    :returns: Список случайных пользователей, не больше ``n``.
+    :rtype: list[UserOut]
+    :raises ValueError: Если n вне диапазона от 1 до ``RANDOM_MAX_BATCH``.
+    """
+    if not 1 <= n <= settings.RANDOM_MAX_BATCH:
+        raise ValueError(f"n must be between 1 and {settings.RANDOM_MAX_BATCH}")
+
+    if seed is None:
+        users = await pool.pick_many(n)
+        if len(users) == n:
+            return users
 
-    return UserOut.model_validate(user) if user else None
+    return await get_random_users(db, n, random.Random(seed) if seed is not None else None)
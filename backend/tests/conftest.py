@@ -1,15 +1,17 @@
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from contextlib import nullcontext
 from typing import Literal
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from fakeredis import FakeAsyncRedis, FakeServer
 from httpx import ASGITransport, AsyncClient
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
-from app.core.cache import get_cache
+from app.core.cache import LocalCache, RedisCache, get_cache
 from app.core.config import settings
 from app.db.models import Base
-from app.db.session import get_db as get_session
+from app.db.session import db_manager, get_db as get_session
 from app.main import app
 
 
@@ -34,7 +36,11 @@ async def async_client(async_session: AsyncSession) -> AsyncGenerator[AsyncClien
     :returns: Асинхронный тестовый клиент FastAPI.
     :rtype: AsyncGenerator[AsyncClient, None]
     """
-    with patch("app.lifecycle.lifespan_events.fetch_and_save_users", new_callable=AsyncMock) as _:
+    with (
+        patch("app.lifecycle.lifespan_events.fetch_and_save_users", new_callable=AsyncMock) as _,
+        # Загрузки, общие для нескольких запросов, открывают свою сессию через db_manager
+        patch.object(db_manager, "session", lambda: nullcontext(async_session)),
+    ):
         app.dependency_overrides[get_session] = lambda: async_session
         _transport = ASGITransport(app=app)
 
@@ -76,20 +82,38 @@ async def mock_cache() -> MagicMock:
     """
     Предоставляет замоканную версию RedisCache для тестов, переопределяя FastAPI зависимость get_cache.
 
-    Все основные методы RedisCache (get, set, delete, sadd, smembers, close)
-    замещены на асинхронные мок-объекты для отслеживания вызовов и предотвращения
-    реального подключения к Redis.
+    Все основные методы RedisCache (get, get_many, set, set_many, get_versions, set_many_if_unchanged,
+    delete, delete_many, sadd, smembers, incr_if_exists, close) замещены на асинхронные мок-объекты,
+    а pipeline — на MagicMock, поддерживающий ``async with``. Это позволяет отслеживать вызовы и предотвращает
+    реальное подключение к Redis.
 
     :returns: Замоканный RedisCache.
     :rtype: MagicMock
     """
     mock = MagicMock()
     mock.get = AsyncMock(return_value=None)
+    mock.get_many = AsyncMock(side_effect=lambda keys: [None] * len(keys))
+    mock.set_many = AsyncMock()
+    mock.get_versions = AsyncMock(side_effect=lambda keys: dict.fromkeys(keys, "0"))
+    mock.set_many_if_unchanged = AsyncMock()
     mock.set = AsyncMock()
     mock.delete = AsyncMock()
     mock.sadd = AsyncMock()
     mock.smembers = AsyncMock()
+    mock.incr_if_exists = AsyncMock()
+    mock.delete_many = AsyncMock()
     mock.close = AsyncMock()
+    mock.hset = AsyncMock()
+    mock.hmget_bytes = AsyncMock(side_effect=lambda key, fields: [None] * len(fields))
+    mock.get_versioned = AsyncMock(side_effect=lambda version_key, key_prefix, fields: (0, [None] * len(fields)))
+
+    async def single_flight(key: str, load: Callable[[], Awaitable[object]]) -> object:
+        return await load()
+
+    mock.single_flight = AsyncMock(side_effect=single_flight)
+    # Команды конвейера только ставятся в очередь, поэтому они синхронные
+    mock.pipeline = MagicMock()
+    mock.pipeline.return_value.__aenter__.return_value = MagicMock()
 
     async def _override_get_cache():  # noqa: ANN202
         return mock
@@ -99,3 +123,20 @@ async def mock_cache() -> MagicMock:
     yield mock
 
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def redis_cache() -> AsyncGenerator[RedisCache, None]:
+    """
+    Предоставляет RedisCache поверх fakeredis, который выполняет Lua-скрипты кэша.
+
+    :returns: Клиент кэша с кэшем процесса.
+    :rtype: AsyncGenerator[RedisCache, None]
+    """
+    server = FakeServer()
+    cache = RedisCache(LocalCache(max_size=10, ttl=60))
+    cache._client = FakeAsyncRedis(server=server, decode_responses=True)
+    cache._raw_client = FakeAsyncRedis(server=server)
+    yield cache
+    await cache._client.aclose()
+    await cache._raw_client.aclose()
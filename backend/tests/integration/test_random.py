@@ -1,11 +1,18 @@
+from collections import Counter
+import random
 from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from httpx import AsyncClient
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
+from tests.utils.mocks import fake_iter_random_users
 
-from app.schemas.user import UserCreate
-from app.services.user_service import create_user
+from app.db.crud.users import create_user, delete_user, get_random_users
+from app.main import app
+from app.schemas.user import UserCreate, UserOut
+from app.services.random_pool import get_random_pool
+from app.services.user_service import fetch_and_save_users
 
 
 @pytest.mark.asyncio
@@ -35,6 +42,37 @@ async def test_get_random_user(async_session: AsyncSession, async_client: AsyncC
     assert user_data["email"] == "tom.wilson@example.com"
 
 
+@pytest.mark.asyncio
+async def test_get_random_user_from_pool(async_session: AsyncSession, async_client: AsyncClient) -> None:
+    """
+    Тестирует, что GET /api/v1/random отдает пользователя из пула, если пул не пуст.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :param async_client: Асинхронный тестовый клиент FastAPI.
+    :type async_client: AsyncClient
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    pooled = UserOut(
+        id=999,
+        created_at="2024-01-01T00:00:00Z",
+        gender="female",
+        first_name="Pool",
+        last_name="User",
+        phone="000",
+        email="pool.user@example.com",
+        picture="http://example.com/pool.jpg",
+    )
+    pool = MagicMock()
+    pool.pick = AsyncMock(return_value=pooled)
+    with patch.dict(app.dependency_overrides, {get_random_pool: lambda: pool}):
+        response = await async_client.get("/api/v1/random")
+        assert response.status_code == 200
+        assert response.json()["email"] == "pool.user@example.com"
+        pool.pick.assert_awaited_once()
+
+
 @pytest.mark.asyncio
 async def test_get_random_user_when_none_exist(async_session: AsyncSession, async_client: AsyncClient) -> None:
     """
@@ -51,3 +89,65 @@ async def test_get_random_user_when_none_exist(async_session: AsyncSession, asyn
     assert response.status_code == 404
     get_user = response.json()
     assert get_user["detail"] == "User not found"
+
+
+@patch("app.services.ingestion.iter_random_users", new=fake_iter_random_users)
+@pytest.mark.asyncio
+async def test_get_random_users_skips_id_gaps(async_session: AsyncSession) -> None:
+    """
+    Тестирует равномерную случайную выборку без повторов из таблицы с пропусками в ID.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    users = await fetch_and_save_users(async_session, 20)
+    for user in users[::2]:
+        await delete_user(async_session, user.id)
+    existing = {user.id for user in users[1::2]}
+
+    rng = random.Random(42)
+    sample = await get_random_users(async_session, 5, rng)
+    assert len({user.id for user in sample}) == 5
+    assert {user.id for user in sample} <= existing
+
+    hits = Counter()
+    for _ in range(300):
+        hits.update(user.id for user in await get_random_users(async_session, 1, rng))
+    assert set(hits) == existing
+    assert max(hits.values()) < 3 * min(hits.values())
+
+    assert len(await get_random_users(async_session, 50, rng)) == len(existing)
+
+
+@patch("app.services.ingestion.iter_random_users", new=fake_iter_random_users)
+@pytest.mark.asyncio
+async def test_get_random_users_batch(async_session: AsyncSession, async_client: AsyncClient) -> None:
+    """
+    Тестирует эндпоинт GET /api/v1/random?n= с воспроизводимым seed.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :param async_client: Асинхронный тестовый клиент FastAPI.
+    :type async_client: AsyncClient
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    await fetch_and_save_users(async_session, 30)
+
+    response = await async_client.get("/api/v1/random?n=5")
+    assert response.status_code == 200
+    assert len({user["id"] for user in response.json()}) == 5
+
+    first = await async_client.get("/api/v1/random?n=5&seed=7")
+    second = await async_client.get("/api/v1/random?n=5&seed=7")
+    assert [user["id"] for user in first.json()] == [user["id"] for user in second.json()]
+
+    response = await async_client.get("/api/v1/random?seed=7")
+    assert response.json()["id"] == (await async_client.get("/api/v1/random?seed=7")).json()["id"]
+
+    response = await async_client.get("/api/v1/random?n=101")
+    assert response.status_code == 400
+    response = await async_client.get("/api/v1/random?n=0")
+    assert response.status_code == 400
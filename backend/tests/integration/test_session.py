@@ -1,10 +1,12 @@
 from asyncpg.exceptions import ConnectionDoesNotExistError, InvalidPasswordError
 import pytest
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.db.models.user import User
 from app.db.session import DatabaseManager
+from app.schemas.user import UserCreate
 
 
 @pytest.mark.anyio
@@ -55,3 +57,40 @@ async def test_session_commit(async_session: AsyncSession) -> None:
     assert result.first_name == "Test"
     assert result.last_name == "User"
     assert result.email == "test@example.com"
+
+
+@pytest.mark.anyio
+async def test_load_users_via_copy(async_session: AsyncSession) -> None:
+    """
+    Тест загрузки пользователей через COPY.
+
+    Записи загружаются несколькими чанками, дубликаты по email и uuid
+    (в том числе внутри одного чанка) пропускаются ограничениями таблицы.
+    """
+    async_session.add(User(gender="male", first_name="Old", last_name="User", email="old@example.com", uuid="u-old"))
+    await async_session.commit()
+
+    users = [
+        UserCreate(gender="male", first_name="A", last_name="A", email="a@example.com", uuid="u-a", latitude=1.5),
+        UserCreate(gender="male", first_name="B", last_name="B", email="old@example.com", uuid="u-b"),
+        UserCreate(gender="male", first_name="C", last_name="C", email="c@example.com", uuid="u-old"),
+        UserCreate(gender="male", first_name="D", last_name="D", email="d@example.com", uuid="u-d"),
+        UserCreate(gender="male", first_name="E", last_name="E", email="d@example.com", uuid="u-e"),
+    ]
+    db = DatabaseManager(settings.SQLALCHEMY_TEST_DATABASE_URL)
+    chunks: list[list[int]] = []
+
+    async def on_inserted(user_ids: list[int]) -> None:
+        chunks.append(user_ids)
+
+    try:
+        inserted = await db.load_users(users, chunk_size=2, on_inserted=on_inserted)
+    finally:
+        await db.close()
+
+    assert inserted == 2
+    result = await async_session.execute(select(User.first_name).order_by(User.id))
+    assert result.scalars().all() == ["Old", "A", "D"]
+    # Каждый зафиксированный чанк сообщает ID своих новых пользователей
+    result = await async_session.execute(select(User.id).where(User.first_name.in_(["A", "D"])).order_by(User.id))
+    assert chunks == [[user_id] for user_id in result.scalars().all()]
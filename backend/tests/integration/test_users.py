@@ -1,18 +1,30 @@
+from collections.abc import AsyncIterator
+from contextlib import nullcontext
+import time
 from typing import Any
-from unittest.mock import MagicMock, patch
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
 
 from httpx import AsyncClient, Response
 import pytest
+from pytest_mock import MockerFixture
 from respx import MockRouter
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
-from tests.utils.mocks import fake_fetch_random_users
+from tests.utils.mocks import fake_fetch_random_users, fake_iter_random_users
 
 from app.core.config import settings
-from app.schemas.user import UserCreate
-from app.services.user_service import create_user, fetch_and_save_users
-
-
-@patch("app.services.user_service.fetch_random_users", new=fake_fetch_random_users)
+from app.db.crud.users import bulk_create_users, create_user
+from app.db.session import db_manager
+from app.main import app
+from app.schemas.user import UserCreate, UserImportJob, UserImportStats, UserUpdate
+from app.services import user_service
+from app.services.counters import USERS_COUNT_KEY, USERS_REVISION_KEY
+from app.services.import_jobs import ImportJobStoreError, get_import_jobs
+from app.services.ingestion import ingest_random_users
+from app.services.user_service import MISSING_USER, USER_CACHE, USERS_CACHE, fetch_and_save_users, make_etag
+
+
+@patch("app.services.ingestion.iter_random_users", new=fake_iter_random_users)
 @pytest.mark.asyncio
 async def test_get_users_paginated(
     async_session: AsyncSession, async_client: AsyncClient, mock_cache: MagicMock
@@ -48,7 +60,75 @@ async def test_get_users_paginated(
     assert users_resp[0]["first_name"] == users[10].first_name
 
 
-@patch("app.services.user_service.fetch_random_users", new=fake_fetch_random_users)
+@patch("app.services.ingestion.iter_random_users", new=fake_iter_random_users)
+@pytest.mark.asyncio
+async def test_get_users_cursor_pagination(
+    async_session: AsyncSession, async_client: AsyncClient, mock_cache: MagicMock
+) -> None:
+    """
+    Тестирует keyset-пагинацию GET /api/v1/users через курсор из заголовка X-Next-Cursor.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :param async_client: Асинхронный тестовый клиент FastAPI.
+    :type async_client: AsyncClient
+    :param mock_cache: Замоканный объект RedisCache, переопределяющий кеш в тестах.
+    :type mock_cache: MagicMock
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    users = await fetch_and_save_users(async_session, 12)
+
+    response = await async_client.get("/api/v1/users?limit=5")
+    cursor = response.headers["X-Next-Cursor"]
+    seen = [user["id"] for user in response.json()]
+    while cursor:
+        response = await async_client.get("/api/v1/users", params={"limit": 5, "after": cursor})
+        assert response.status_code == 200
+        seen.extend(user["id"] for user in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+
+    assert seen == sorted(user.id for user in users)
+
+    response = await async_client.get("/api/v1/users?limit=5&after=not-a-cursor")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@patch("app.services.ingestion.iter_random_users", new=fake_iter_random_users)
+@pytest.mark.asyncio
+async def test_get_users_total_count(
+    async_session: AsyncSession, async_client: AsyncClient, mock_cache: MagicMock
+) -> None:
+    """
+    Тестирует заголовок X-Total-Count в режимах exact и estimate.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :param async_client: Асинхронный тестовый клиент FastAPI.
+    :type async_client: AsyncClient
+    :param mock_cache: Замоканный объект RedisCache, переопределяющий кеш в тестах.
+    :type mock_cache: MagicMock
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    await fetch_and_save_users(async_session, 7)
+
+    response = await async_client.get("/api/v1/users?limit=5&count=estimate")
+    # До ANALYZE статистики нет, поэтому оценка заменяется точным значением
+    assert response.headers["X-Total-Count"] == "7"
+    mock_cache.set.assert_any_await(USERS_COUNT_KEY, 7, ttl=settings.USERS_COUNT_TTL)
+
+    mock_cache.get.side_effect = lambda key: 42 if key == USERS_COUNT_KEY else None
+    response = await async_client.get("/api/v1/users?limit=5&count=exact")
+    assert response.headers["X-Total-Count"] == "42"
+
+    await async_session.execute(text("ANALYZE users"))
+    response = await async_client.get("/api/v1/users?limit=5&count=estimate")
+    assert response.headers["X-Total-Count"] == "7"
+
+
+@patch("app.services.ingestion.iter_random_users", new=fake_iter_random_users)
 @pytest.mark.asyncio
 async def test_get_users(async_session: AsyncSession, async_client: AsyncClient, mock_cache: MagicMock) -> None:
     """
@@ -71,6 +151,266 @@ async def test_get_users(async_session: AsyncSession, async_client: AsyncClient,
     users: list[dict[str, Any]] = response.json()
     assert len(users) == 1
 
+    # Кэшируется весь выровненный блок списком ID с поколением в ключе, пользователи — отдельными ключами
+    mock_cache.get.assert_any_await("users:generation")
+    mock_cache.get_many.assert_any_await(["users:0:block=0"])
+    pipe = mock_cache.pipeline.return_value.__aenter__.return_value
+    block_key, block, ttl = *pipe.set.call_args_list[0].args, pipe.set.call_args_list[0].kwargs["ttl"]
+    assert (block_key, ttl) == ("users:0:block=0", USERS_CACHE.hard_ttl)
+    assert len(block["value"]) == 2
+    assert block["value"][0] == users[0]["id"]
+    assert block["expires"] > time.time()
+    entries, version_key, _ = pipe.set_many_if_version.call_args.args
+    assert f"user:{users[0]['id']}" in entries
+    assert version_key == USERS_REVISION_KEY
+    assert pipe.set_many_if_version.call_args.kwargs["ttl"] == USER_CACHE.hard_ttl
+
+
+@patch("app.services.ingestion.iter_random_users", new=fake_iter_random_users)
+@pytest.mark.asyncio
+async def test_get_users_from_cached_blocks(
+    async_session: AsyncSession, async_client: AsyncClient, mock_cache: MagicMock, mocker: MockerFixture
+) -> None:
+    """
+    Тестирует сборку окна из закэшированных блоков ID и записей user:{id}.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :param async_client: Асинхронный тестовый клиент FastAPI.
+    :type async_client: AsyncClient
+    :param mock_cache: Замоканный объект RedisCache, переопределяющий кеш в тестах.
+    :type mock_cache: MagicMock
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    mocker.patch("app.services.user_service.settings.USERS_CACHE_BLOCK_SIZE", 3)
+    users = await fetch_and_save_users(async_session, 4)
+    ids = [user.id for user in users]
+    cached = users[2].model_copy(update={"first_name": "Cached"})
+    values = {
+        "users:0:block=0": USERS_CACHE.wrap(ids[:3]),
+        "users:0:block=2": USERS_CACHE.wrap([ids[3], 999999]),
+        f"user:{users[2].id}": USER_CACHE.wrap(cached.model_dump(mode="json")),
+    }
+    mock_cache.get_many.side_effect = lambda keys: [values.get(key) for key in keys]
+
+    # Окно [2, 4) пересекает закэшированный блок 0 и отсутствующий блок 1
+    response = await async_client.get("/api/v1/users?limit=2&offset=2")
+    assert [user["first_name"] for user in response.json()] == ["Cached", users[3].first_name]
+    pipe = mock_cache.pipeline.return_value.__aenter__.return_value
+    stored = {call.args[0]: call.args[1]["value"] for call in pipe.set.call_args_list}
+    assert stored["users:0:block=1"] == [ids[3]]
+
+    # Блок ссылается на удаленного пользователя, поэтому окно перечитывается из БД
+    response = await async_client.get("/api/v1/users?limit=2&offset=6")
+    assert response.json() == []
+
+
+@patch("app.services.ingestion.iter_random_users", new=fake_iter_random_users)
+@pytest.mark.asyncio
+async def test_get_users_batch(async_session: AsyncSession, async_client: AsyncClient, mock_cache: MagicMock) -> None:
+    """
+    Тестирует пакетное получение пользователей GET и POST /api/v1/users/batch.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :param async_client: Асинхронный тестовый клиент FastAPI.
+    :type async_client: AsyncClient
+    :param mock_cache: Замоканный объект RedisCache, переопределяющий кеш в тестах.
+    :type mock_cache: MagicMock
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    first, second = await fetch_and_save_users(async_session, 2)
+    cached = first.model_copy(update={"first_name": "Cached"})
+    mock_cache.get_many.side_effect = lambda keys: [
+        USER_CACHE.wrap(cached.model_dump(mode="json")) if key == f"user:{first.id}" else None for key in keys
+    ]
+
+    response = await async_client.get(f"/api/v1/users/batch?ids={second.id},999999,{first.id},{second.id}")
+    assert response.status_code == 200
+    body = response.json()
+    assert [user and user["id"] for user in body["users"]] == [second.id, None, first.id, second.id]
+    assert body["users"][2]["first_name"] == "Cached"
+    assert body["missing"] == [999999]
+    mock_cache.get_many.assert_awaited_once_with([f"user:{second.id}", "user:999999", f"user:{first.id}"])
+    stored, missing = mock_cache.set_many_if_unchanged.await_args_list
+    assert list(stored.args[0]) == [f"user:{second.id}"]
+    assert missing.args[0] == {"user:999999": MISSING_USER}
+    assert missing.kwargs["ttl"] == settings.USER_NEGATIVE_CACHE_TTL
+
+    response = await async_client.post("/api/v1/users/batch", json={"ids": [first.id]})
+    assert response.json()["users"][0]["id"] == first.id
+
+    response = await async_client.get("/api/v1/users/batch?ids=1,abc")
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_users_serves_cached_body(
+    async_session: AsyncSession, async_client: AsyncClient, mock_cache: MagicMock, mocker: MockerFixture
+) -> None:
+    """
+    Тестирует, что закэшированные тела ответов отдаются как есть, без обращения к БД и сериализации.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :param async_client: Асинхронный тестовый клиент FastAPI.
+    :type async_client: AsyncClient
+    :param mock_cache: Замоканный объект RedisCache, переопределяющий кеш в тестах.
+    :type mock_cache: MagicMock
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    user = await create_user(
+        async_session, UserCreate(first_name="Body", last_name="User", email="body@example.com", gender="male")
+    )
+    get_users = mocker.spy(user_service, "get_users_service")
+
+    # Промах: тело страницы записывается под ревизией, прочитанной до запроса к БД
+    mock_cache.get_versioned.side_effect = None
+    mock_cache.get_versioned.return_value = (7, [None, None, None])
+    response = await async_client.get("/api/v1/users?limit=1")
+    key, mapping = mock_cache.hset.await_args.args
+    assert key == "body:users:limit=1:offset=0:after=None:7"
+    assert mapping["body"] == response.content
+    assert mapping["etag"] == response.headers["ETag"] == make_etag(response.content)
+    assert response.json()[0]["id"] == user.id
+
+    # Попадание: тело и курсор берутся из кэша
+    get_users.reset_mock()
+    mock_cache.get_versioned.return_value = (7, [b'[{"id":1}]', b"Y3Vyc29y", b'"page"'])
+    response = await async_client.get("/api/v1/users?limit=1")
+    assert response.content == b'[{"id":1}]'
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["X-Next-Cursor"] == "Y3Vyc29y"
+    assert response.headers["ETag"] == '"page"'
+    get_users.assert_not_called()
+
+    mock_cache.get.reset_mock()
+    mock_cache.get_versioned.reset_mock()
+    mock_cache.get_versioned.return_value = (2, [b'{"id":1}', b'"user"'])
+    response = await async_client.get(f"/api/v1/users/{user.id}")
+    assert response.content == b'{"id":1}'
+    mock_cache.get_versioned.assert_awaited_once_with(
+        f"version:user:{user.id}", f"body:user:{user.id}:", ["body", "etag"]
+    )
+    mock_cache.get.assert_not_awaited()
+
+    # Промах: тело пишется в ключ версии, прочитанной до пользователя, и недостижимо после его изменения
+    mock_cache.get_versioned.return_value = (3, [None, None])
+    response = await async_client.get(f"/api/v1/users/{user.id}")
+    assert response.json()["id"] == user.id
+    key, fields = mock_cache.hset.await_args.args
+    assert key == f"body:user:{user.id}:3"
+    assert fields["body"] == response.content
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_returns_not_modified(
+    async_session: AsyncSession, async_client: AsyncClient, mock_cache: MagicMock
+) -> None:
+    """
+    Тестирует ответ 304 на If-None-Match с текущим ETag и 200 после изменения пользователя.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :param async_client: Асинхронный тестовый клиент FastAPI.
+    :type async_client: AsyncClient
+    :param mock_cache: Замоканный объект RedisCache, переопределяющий кеш в тестах.
+    :type mock_cache: MagicMock
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    user = await create_user(
+        async_session, UserCreate(first_name="Etag", last_name="User", email="etag@example.com", gender="male")
+    )
+    response = await async_client.get(f"/api/v1/users/{user.id}")
+    etag = response.headers["ETag"]
+
+    response = await async_client.get(f"/api/v1/users/{user.id}", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    await async_client.put(f"/api/v1/users/{user.id}", json={"first_name": "Changed"})
+    response = await async_client.get(f"/api/v1/users/{user.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    response = await async_client.get("/api/v1/users?limit=5")
+    page_etag = response.headers["ETag"]
+    response = await async_client.get("/api/v1/users?limit=5", headers={"If-None-Match": page_etag})
+    assert response.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_get_user_serves_stale_entry_and_refreshes(
+    async_session: AsyncSession, async_client: AsyncClient, mock_cache: MagicMock
+) -> None:
+    """
+    Тестирует, что устаревшая запись user:{id} отдается сразу, а обновляется в фоне.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :param async_client: Асинхронный тестовый клиент FastAPI.
+    :type async_client: AsyncClient
+    :param mock_cache: Замоканный объект RedisCache, переопределяющий кеш в тестах.
+    :type mock_cache: MagicMock
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    user = await create_user(
+        async_session, UserCreate(first_name="Fresh", last_name="User", email="fresh@example.com", gender="male")
+    )
+    stale = USER_CACHE.wrap(user.model_copy(update={"first_name": "Stale"}).model_dump(mode="json"))
+    stale["expires"] = time.time() - 1
+    mock_cache.get.return_value = stale
+
+    response = await async_client.get(f"/api/v1/users/{user.id}")
+    assert response.json()["first_name"] == "Stale"
+    keys, _ = mock_cache.refresh_in_background.call_args.args
+    assert keys == [f"user:{user.id}"]
+    mock_cache.single_flight.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_shared_loads_do_not_use_request_session(
+    async_session: AsyncSession, mock_cache: MagicMock, mocker: MockerFixture
+) -> None:
+    """
+    Тестирует, что загрузки, общие для одновременных запросов, открывают свою сессию, а не берут сессию запроса.
+
+    Сессия запроса закрывается при его отмене, а начатая им загрузка продолжается для остальных запросов.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :param mock_cache: Замоканный объект RedisCache, переопределяющий кеш в тестах.
+    :type mock_cache: MagicMock
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    user = await create_user(
+        async_session, UserCreate(gender="female", first_name="Shared", last_name="Load", email="shared@example.com")
+    )
+    session = mocker.patch.object(db_manager, "session", return_value=nullcontext(async_session))
+    request_db = MagicMock()
+
+    assert (await user_service.get_user_service(request_db, mock_cache, user.id)).id == user.id
+    users, _ = await user_service.get_users_service(request_db, mock_cache, 10)
+    assert [found.id for found in users] == [user.id]
+    users, _ = await user_service.get_users_service(request_db, mock_cache, 10, after=user_service.encode_cursor(0))
+    assert [found.id for found in users] == [user.id]
+
+    assert session.call_count == 3
+    assert request_db.mock_calls == []
+
 
 @pytest.mark.asyncio
 async def test_get_user_by_id(async_session: AsyncSession, async_client: AsyncClient) -> None:
@@ -122,6 +462,31 @@ async def test_get_user_by_id_when_none_exist(async_session: AsyncSession, async
     assert get_user["detail"] == "User not found"
 
 
+@pytest.mark.asyncio
+async def test_get_user_serves_cached_absence(async_client: AsyncClient, mock_cache: MagicMock) -> None:
+    """
+    Тестирует, что отсутствие пользователя кэшируется и следующий запрос отвечает 404 без обращения к БД.
+
+    :param async_client: Асинхронный тестовый клиент FastAPI.
+    :type async_client: AsyncClient
+    :param mock_cache: Замоканный объект RedisCache, переопределяющий кеш в тестах.
+    :type mock_cache: MagicMock
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    response = await async_client.get("/api/v1/users/150")
+    assert response.status_code == 404
+    mock_cache.set_many_if_unchanged.assert_awaited_once_with(
+        {"user:150": MISSING_USER}, {"user:150": "0"}, ttl=settings.USER_NEGATIVE_CACHE_TTL
+    )
+
+    mock_cache.get.return_value = MISSING_USER
+    mock_cache.single_flight.reset_mock()
+    response = await async_client.get("/api/v1/users/150")
+    assert response.status_code == 404
+    mock_cache.single_flight.assert_not_awaited()
+
+
 @pytest.mark.asyncio
 async def test_update_user(async_session: AsyncSession, async_client: AsyncClient) -> None:
     """
@@ -154,6 +519,82 @@ async def test_update_user(async_session: AsyncSession, async_client: AsyncClien
     assert updated_user["email"] == "updated@example.com"
 
 
+@pytest.mark.asyncio
+async def test_update_user_writes_through_user_entry(
+    async_session: AsyncSession, async_client: AsyncClient, mock_cache: MagicMock
+) -> None:
+    """
+    Тестирует, что обновление записывает пользователя в кэш и инвалидирует ревизию тел ответов, не затрагивая поколение.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :param async_client: Асинхронный тестовый клиент FastAPI.
+    :type async_client: AsyncClient
+    :param mock_cache: Замоканный объект RedisCache, переопределяющий кеш в тестах.
+    :type mock_cache: MagicMock
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    user = await create_user(
+        async_session,
+        UserCreate(gender="female", first_name="Old", last_name="Name", email="old.name@example.com"),
+    )
+
+    response = await async_client.put(f"/api/v1/users/{user.id}", json={"first_name": "New"})
+    assert response.status_code == 200
+
+    mock_cache.pipeline.assert_called_once_with(transaction=True)
+    pipe = mock_cache.pipeline.return_value.__aenter__.return_value
+    key, entry = pipe.set_versioned.call_args.args
+    assert key == f"user:{user.id}"
+    assert entry["value"]["first_name"] == "New"
+    pipe.delete.assert_not_called()
+    pipe.incr.assert_called_once_with(USERS_REVISION_KEY)
+
+
+@pytest.mark.asyncio
+async def test_block_load_does_not_overwrite_concurrent_update(
+    async_session: AsyncSession, mock_cache: MagicMock, mocker: MockerFixture
+) -> None:
+    """
+    Тестирует, что блок, прочитанный из БД до конкурентного обновления, не перезапишет записанного пользователя.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :param mock_cache: Замоканный объект RedisCache, переопределяющий кеш в тестах.
+    :type mock_cache: MagicMock
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    user = await create_user(
+        async_session,
+        UserCreate(gender="female", first_name="Old", last_name="Name", email="block.race@example.com"),
+    )
+    revision = {USERS_REVISION_KEY: 0}
+    mock_cache.get.side_effect = lambda key: revision.get(key)
+    get_users = user_service.get_users
+
+    async def read_then_update(db: AsyncSession, limit: int, offset: int) -> list:
+        users = await get_users(db, limit, offset)
+        await user_service.update_user_service(db, mock_cache, user.id, UserUpdate(first_name="New"))
+        revision[USERS_REVISION_KEY] += 1
+        return users
+
+    mocker.patch("app.services.user_service.get_users", new=read_then_update)
+    await user_service._store_blocks(async_session, mock_cache, 0, range(1))
+
+    pipe = mock_cache.pipeline.return_value.__aenter__.return_value
+    assert pipe.set_versioned.call_args.args[1]["value"]["first_name"] == "New"
+    pipe.set.assert_any_call("users:0:block=0", ANY, ttl=USERS_CACHE.hard_ttl)
+    stale, version_key, version = pipe.set_many_if_version.call_args.args
+    assert stale[f"user:{user.id}"]["value"]["first_name"] == "Old"
+    # Ревизия прочитана до запроса к БД, поэтому скрипт отклонит устаревшую запись
+    assert version_key == USERS_REVISION_KEY
+    assert version != revision[USERS_REVISION_KEY]
+
+
 @pytest.mark.asyncio
 async def test_update_user_when_none_exist(async_session: AsyncSession, async_client: AsyncClient) -> None:
     """
@@ -327,3 +768,103 @@ async def test_fetch_users_from_api(async_client: AsyncClient, respx_mock: MockR
 
     assert users[1]["first_name"] == "Liam"
     assert users[1]["email"] in "liam.griffin@example.com"
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_users_skips_duplicates(async_session: AsyncSession) -> None:
+    """
+    Тестирует массовую вставку: дубликаты по email и uuid пропускаются и попадают в отчет.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    existing = UserCreate(gender="male", first_name="Old", last_name="User", email="old@example.com", uuid="uuid-old")
+    await create_user(async_session, existing)
+
+    users = [
+        UserCreate(gender="male", first_name="A", last_name="A", email="a@example.com", uuid="uuid-a"),
+        UserCreate(gender="male", first_name="B", last_name="B", email="old@example.com", uuid="uuid-b"),
+        UserCreate(gender="male", first_name="C", last_name="C", email="c@example.com", uuid="uuid-old"),
+        UserCreate(gender="male", first_name="D", last_name="D", email="a@example.com", uuid="uuid-d"),
+        UserCreate(gender="male", first_name="E", last_name="E", email="e@example.com", uuid="uuid-e"),
+    ]
+    created, skipped = await bulk_create_users(async_session, users, chunk_size=2)
+
+    assert [user.first_name for user in created] == ["A", "E"]
+    assert [(user.email, user.reason) for user in skipped] == [
+        ("old@example.com", "email"),
+        ("c@example.com", "uuid"),
+        ("a@example.com", "email"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ingest_random_users_reports_progress(async_session: AsyncSession, mocker: MockerFixture) -> None:
+    """
+    Тестирует конвейер загрузки: невалидные записи и дубликаты учитываются в счетчиках прогресса.
+
+    :param async_session: Асинхронная сессия базы данных.
+    :type async_session: AsyncSession
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    page = (await fake_fetch_random_users(3))["results"]
+    page[1]["email"] = "not-an-email"
+    duplicate = (await fake_fetch_random_users(1))["results"]
+    duplicate[0]["email"] = page[0]["email"]
+
+    async def fake_pages(count: int) -> AsyncIterator[list[dict]]:
+        yield page
+        yield duplicate
+
+    mocker.patch("app.services.ingestion.iter_random_users", new=fake_pages)
+    mocker.patch.object(settings, "INGEST_BATCH_SIZE", 1)
+    progress: list[UserImportStats] = []
+
+    async def on_progress(stats: UserImportStats) -> None:
+        progress.append(stats.model_copy())
+
+    stats = await ingest_random_users(async_session, 4, on_progress=on_progress)
+
+    assert stats == UserImportStats(fetched=4, inserted=2, duplicates=1, failed=1, processed=4)
+    assert progress[-1] == stats
+    assert len(progress) == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_users_in_background(async_client: AsyncClient) -> None:
+    """
+    Тестирует POST /api/v1/users/fetch?background=true и GET /api/v1/users/fetch/{job_id}.
+
+    :param async_client: Асинхронный тестовый клиент FastAPI.
+    :type async_client: AsyncClient
+    :returns: Ничего не возвращает.
+    :rtype: None
+    """
+    job = UserImportJob(job_id="abc", status="queued", count=50)
+    jobs = MagicMock()
+    jobs.submit = AsyncMock(return_value=job)
+    jobs.get = AsyncMock(side_effect=[job.model_copy(update={"status": "running", "fetched": 20}), None])
+    with patch.dict(app.dependency_overrides, {get_import_jobs: lambda: jobs}):
+        response = await async_client.post("/api/v1/users/fetch?count=50&background=true")
+        assert response.status_code == 202
+        assert response.json()["job_id"] == "abc"
+        jobs.submit.assert_awaited_once_with(50)
+
+        response = await async_client.get("/api/v1/users/fetch/abc")
+        assert response.status_code == 200
+        assert response.json()["status"] == "running"
+        assert response.json()["fetched"] == 20
+
+        response = await async_client.get("/api/v1/users/fetch/missing")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Job not found"
+
+        # Задачу, состояние которой не сохранилось, нельзя было бы отследить
+        jobs.submit.side_effect = ImportJobStoreError("Import job state could not be stored, try again later")
+        response = await async_client.post("/api/v1/users/fetch?count=50&background=true")
+        assert response.status_code == 503
@@ -0,0 +1,75 @@
+import asyncio
+
+import httpx
+from httpx import Request, Response
+import pytest
+from pytest_mock import MockerFixture
+from respx import MockRouter
+from tenacity import wait_none
+
+from app.core.config import settings
+from app.services.api_client import _fetch_batch, fetch_random_users
+
+
+@pytest.fixture(autouse=True)
+def no_retry_wait(mocker: MockerFixture) -> None:
+    """Убирает задержку между повторными попытками, чтобы тесты не ждали backoff."""
+    mocker.patch.object(_fetch_batch.retry, "wait", wait_none())
+
+
+async def test_fetch_random_users_keeps_batch_order(respx_mock: MockRouter) -> None:
+    """
+    Проверяет, что страницы возвращаются в порядке запросов, даже если ответы приходят в другом порядке.
+
+    :param respx_mock: Фикстура для мокирования HTTP-запросов с помощью respx.
+    :type respx_mock: MockRouter
+    :returns: None
+    """
+    calls = 0
+
+    async def side_effect(request: Request) -> Response:
+        nonlocal calls
+        batch = calls
+        calls += 1
+        # Первая страница отвечает последней
+        await asyncio.sleep(0.05 if batch == 0 else 0)
+        size = int(request.url.params["results"])
+        return Response(200, json={"results": [{"batch": batch, "n": n} for n in range(size)]})
+
+    respx_mock.get(settings.RANDOMUSER_API_URL).mock(side_effect=side_effect)
+
+    data = await fetch_random_users(250)
+
+    assert len(data["results"]) == 250
+    assert [user["batch"] for user in data["results"]] == [0] * 100 + [1] * 100 + [2] * 50
+
+
+async def test_fetch_random_users_retries_only_failed_batch(respx_mock: MockRouter) -> None:
+    """
+    Проверяет, что при сбое повторяется только упавшая страница, а не вся загрузка.
+
+    :param respx_mock: Фикстура для мокирования HTTP-запросов с помощью respx.
+    :type respx_mock: MockRouter
+    :returns: None
+    """
+    page = Response(200, json={"results": [{"gender": "male"}] * 100})
+    route = respx_mock.get(settings.RANDOMUSER_API_URL).mock(side_effect=[page, Response(500), page, page])
+
+    data = await fetch_random_users(300, concurrency=1)
+
+    assert len(data["results"]) == 300
+    assert route.call_count == 4
+
+
+async def test_fetch_random_users_raises_after_retries(respx_mock: MockRouter) -> None:
+    """
+    Проверяет, что после исчерпания попыток ошибка страницы пробрасывается наружу.
+
+    :param respx_mock: Фикстура для мокирования HTTP-запросов с помощью respx.
+    :type respx_mock: MockRouter
+    :returns: None
+    """
+    respx_mock.get(settings.RANDOMUSER_API_URL).mock(return_value=Response(503))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await fetch_random_users(100)
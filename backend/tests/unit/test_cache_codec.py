@@ -0,0 +1,55 @@
+from datetime import UTC, datetime
+import json
+
+import pytest
+
+from app.core.cache import CODEC_JSON, CODEC_ZLIB, CacheCodec
+
+
+def test_cache_codec_round_trip_and_compression() -> None:
+    """
+    Проверяет кодирование с тегом формата и сжатие значений больше порога.
+
+    :returns: None
+    """
+    codec = CacheCodec(compress_threshold=100)
+    small = {"id": 1, "created_at": datetime(2025, 1, 1, tzinfo=UTC)}
+    large = {"ids": list(range(200))}
+
+    encoded_small, encoded_large = codec.encode(small), codec.encode(large)
+    assert encoded_small[0] == CODEC_JSON
+    assert encoded_large[0] == CODEC_JSON | CODEC_ZLIB
+    assert len(encoded_large) < len(json.dumps(large))
+    assert codec.decode(encoded_small) == {"id": 1, "created_at": "2025-01-01T00:00:00Z"}
+    assert codec.decode(encoded_large) == large
+    assert CacheCodec(compression="none", compress_threshold=100).encode(large)[0] == CODEC_JSON
+
+
+def test_cache_codec_reads_untagged_values() -> None:
+    """
+    Проверяет, что целые числа пишутся без тега для INCR, а значения без тега читаются как JSON.
+
+    :returns: None
+    """
+    codec = CacheCodec()
+    assert codec.encode(42) == b"42"
+    assert codec.decode(b"42") == 42
+    assert codec.decode(json.dumps({"id": 1}).encode()) == {"id": 1}
+    assert codec.decode(b'"text"') == "text"
+
+
+def test_cache_codec_falls_back_without_optional_packages() -> None:
+    """
+    Проверяет выбор JSON и zlib, если msgpack и zstandard не установлены, и отказ на неизвестный кодек.
+
+    :returns: None
+    """
+    codec = CacheCodec("msgpack", "zstd")
+    if codec._msgpack is None:
+        assert codec.serializer == CODEC_JSON
+    if codec._zstd is None:
+        assert codec.compression == CODEC_ZLIB
+    assert codec.decode(codec.encode([1, "a"])) == [1, "a"]
+
+    with pytest.raises(ValueError, match="Unknown cache codec"):
+        CacheCodec("pickle")
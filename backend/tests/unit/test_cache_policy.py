@@ -0,0 +1,51 @@
+from unittest.mock import AsyncMock, MagicMock
+
+from pytest_mock import MockerFixture
+
+from app.core.cache import CachePolicy, RedisCache
+
+
+def test_cache_policy_soft_expiry(mocker: MockerFixture) -> None:
+    """
+    Проверяет мягкое истечение записи и досрочное обновление XFetch.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    now = mocker.patch("app.core.cache.time.time", return_value=1000.0)
+    policy = CachePolicy(ttl=300, stale_ttl=60)
+    entry = policy.wrap([1, 2], delta=2.0)
+
+    assert policy.hard_ttl == 360
+    assert policy.unwrap(entry) == ([1, 2], False)
+    assert policy.unwrap([1, 2]) == (None, False)
+    now.return_value = 1300.0
+    assert policy.unwrap(entry) == ([1, 2], True)
+
+    # -log(1 - 0.99) * delta * beta ≈ 9.2 секунды до истечения
+    mocker.patch("app.core.cache.random.random", return_value=0.99)
+    now.return_value = 1291.0
+    assert CachePolicy(ttl=300, beta=1.0).unwrap(entry) == ([1, 2], True)
+    assert CachePolicy(ttl=300, beta=0.5).unwrap(entry) == ([1, 2], False)
+
+
+async def test_refresh_in_background_skips_keys_refreshed_elsewhere() -> None:
+    """
+    Проверяет, что фоновое обновление получает только ключи, не обновляемые этим или другим воркером.
+
+    :returns: None
+    """
+    cache = RedisCache()
+    cache._client = client = MagicMock()
+    client.pipeline.return_value.__aenter__.return_value = pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[True, None])
+    refresh = AsyncMock()
+
+    cache.refresh_in_background(["user:1", "user:2"], refresh)
+    cache.refresh_in_background(["user:1"], refresh)
+    await next(iter(cache._refreshing.values()))
+
+    refresh.assert_awaited_once_with(["user:1"])
+    assert pipe.set.call_count == 2
+    assert cache._refreshing == {}
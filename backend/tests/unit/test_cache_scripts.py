@@ -0,0 +1,113 @@
+from pytest_mock import MockerFixture
+
+from app.core.cache import RELEASE_LOCK_SCRIPT, RedisCache
+
+
+async def test_set_if_version_script_skips_keys_updated_after_read(redis_cache: RedisCache) -> None:
+    """
+    Проверяет, что SET_IF_VERSION_SCRIPT пишет только значения, версии которых не изменились.
+
+    :param redis_cache: Клиент кэша поверх fakeredis.
+    :type redis_cache: RedisCache
+    :returns: None
+    """
+    versions = await redis_cache.get_versions(["user:1", "user:2"])
+    assert versions == {"user:1": "0", "user:2": "0"}
+
+    # Конкурентное обновление user:1 после чтения из БД
+    async with redis_cache.pipeline(transaction=True) as pipe:
+        pipe.set_versioned("user:1", {"id": 1, "first_name": "New"}, ttl=60)
+
+    await redis_cache.set_many_if_unchanged(
+        {"user:1": {"id": 1, "first_name": "Old"}, "user:2": {"id": 2, "first_name": "B"}}, versions, ttl=60
+    )
+
+    redis_cache.local.clear()
+    assert await redis_cache.get("user:1") == {"id": 1, "first_name": "New"}
+    assert await redis_cache.get("user:2") == {"id": 2, "first_name": "B"}
+    assert 0 < await redis_cache.client.ttl("user:2") <= 60
+
+
+async def test_set_many_if_version_script_skips_all_keys_after_revision_change(redis_cache: RedisCache) -> None:
+    """
+    Проверяет, что SET_MANY_IF_VERSION_SCRIPT пишет значения, только пока общий счетчик не изменился.
+
+    :param redis_cache: Клиент кэша поверх fakeredis.
+    :type redis_cache: RedisCache
+    :returns: None
+    """
+    async with redis_cache.pipeline() as pipe:
+        pipe.set_many_if_version({"user:1": {"id": 1}, "user:2": {"id": 2}}, "users:revision", 0, ttl=60)
+    assert await redis_cache.get_many(["user:1", "user:2"]) == [{"id": 1}, {"id": 2}]
+
+    await redis_cache.client.incr("users:revision")
+    async with redis_cache.pipeline() as pipe:
+        pipe.set_many_if_version({"user:3": {"id": 3}}, "users:revision", 0, ttl=60)
+    assert await redis_cache.get("user:3") is None
+
+    async with redis_cache.pipeline() as pipe:
+        pipe.set_many_if_version({"user:3": {"id": 3}}, "users:revision", 1, ttl=60)
+    assert await redis_cache.get("user:3") == {"id": 3}
+
+
+async def test_versioned_hmget_script_reads_hash_of_current_version(redis_cache: RedisCache) -> None:
+    """
+    Проверяет, что VERSIONED_HMGET_SCRIPT возвращает версию и поля хеша именно этой версии.
+
+    :param redis_cache: Клиент кэша поверх fakeredis.
+    :type redis_cache: RedisCache
+    :returns: None
+    """
+    assert await redis_cache.get_versioned("version:user:1", "body:user:1:", ["body", "etag"]) == (0, [None, None])
+
+    await redis_cache.hset("body:user:1:0", {"body": b"old", "etag": "a"})
+    await redis_cache.client.incr("version:user:1")
+    await redis_cache.hset("body:user:1:1", {"body": b"new", "etag": "b"})
+
+    assert await redis_cache.get_versioned("version:user:1", "body:user:1:", ["body", "etag"]) == (1, [b"new", b"b"])
+
+
+async def test_incr_if_exists_script_does_not_create_counter(redis_cache: RedisCache) -> None:
+    """
+    Проверяет, что INCR_IF_EXISTS_SCRIPT меняет только существующий счетчик, напрямую и через конвейер.
+
+    :param redis_cache: Клиент кэша поверх fakeredis.
+    :type redis_cache: RedisCache
+    :returns: None
+    """
+    assert await redis_cache.incr_if_exists("users:count", 1) is None
+    assert await redis_cache.client.exists("users:count") == 0
+
+    await redis_cache.client.set("users:count", 10)
+    assert await redis_cache.incr_if_exists("users:count", -3) == 7
+    async with redis_cache.pipeline() as pipe:
+        pipe.incr_if_exists("users:count", 2)
+        pipe.incr_if_exists("users:missing", 2)
+    assert await redis_cache.client.get("users:count") == "9"
+    assert await redis_cache.client.exists("users:missing") == 0
+
+
+async def test_release_lock_script_deletes_only_own_lock(redis_cache: RedisCache, mocker: MockerFixture) -> None:
+    """
+    Проверяет, что RELEASE_LOCK_SCRIPT снимает блокировку загрузки только по токену владельца.
+
+    :param redis_cache: Клиент кэша поверх fakeredis.
+    :type redis_cache: RedisCache
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    mocker.patch("app.core.cache.settings.SINGLE_FLIGHT_LOCK_TTL", 5)
+    held = []
+
+    async def load() -> int:
+        held.append(await redis_cache.client.get("lock:users:page"))
+        return 1
+
+    assert await redis_cache.single_flight("users:page", load) == 1
+    assert held[0] is not None
+    assert await redis_cache.client.exists("lock:users:page") == 0
+
+    await redis_cache.client.set("lock:users:page", "other")
+    assert await redis_cache.client.eval(RELEASE_LOCK_SCRIPT, 1, "lock:users:page", held[0]) == 0
+    assert await redis_cache.client.get("lock:users:page") == "other"
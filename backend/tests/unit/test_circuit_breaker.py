@@ -0,0 +1,97 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.core.cache import CircuitBreaker, RedisCache
+
+
+async def test_circuit_breaker_short_circuits_redis(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что после серии ошибок кэш перестает обращаться к Redis до истечения паузы.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    now = mocker.patch("app.core.cache.time.monotonic", return_value=100.0)
+    cache = RedisCache(breaker=CircuitBreaker(threshold=2, cooldown=10))
+    cache._raw_client = client = MagicMock()
+    client.get = AsyncMock(side_effect=ConnectionError("down"))
+
+    assert await cache.get("user:1") is None
+    assert cache.breaker.state == CircuitBreaker.CLOSED
+    assert await cache.get("user:1") is None
+    assert cache.breaker.state == CircuitBreaker.OPEN
+
+    assert await cache.get("user:1") is None
+    assert await cache.get_many(["user:1", "user:2"]) == [None, None]
+    assert client.get.await_count == 2
+    client.mget.assert_not_called()
+    assert not await cache.hset("import_job:abc", {"status": "queued"})
+
+    now.return_value = 109.0
+    assert await cache.get("user:1") is None
+    assert client.get.await_count == 2
+
+
+async def test_circuit_breaker_probe_closes_or_reopens(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что после паузы пропускается одно пробное обращение, и его результат определяет состояние цепи.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    now = mocker.patch("app.core.cache.time.monotonic", return_value=100.0)
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now.return_value = 110.0
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    now.return_value = 120.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+async def test_circuit_breaker_cancelled_probe_allows_next_probe(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что отмененное пробное обращение не оставляет цепь полуоткрытой навсегда.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    now = mocker.patch("app.core.cache.time.monotonic", return_value=100.0)
+    cache = RedisCache(breaker=CircuitBreaker(threshold=1, cooldown=10))
+    cache.breaker.record_failure()
+    now.return_value = 110.0
+
+    started = asyncio.Event()
+
+    async def hang() -> str:
+        started.set()
+        await asyncio.Event().wait()
+        return "never"
+
+    probe = asyncio.create_task(cache.execute("get", hang, "default"))
+    await started.wait()
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    async def ok() -> str:
+        return "value"
+
+    assert await cache.execute("get", ok, "default") == "value"
+    assert cache.breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,419 @@
+import asyncio
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.core.cache import RedisCache
+from app.core.config import settings
+from app.schemas.user import UserImportJob, UserImportStats
+from app.services.import_jobs import ImportJobManager, ImportJobStoreError, ImportQueueFullError
+
+
+@asynccontextmanager
+async def fake_session() -> AsyncGenerator[MagicMock, None]:
+    """Фабрика сессий, не подключающаяся к БД."""
+    yield MagicMock()
+
+
+def make_manager(**kwargs: int) -> tuple[ImportJobManager, MagicMock]:
+    """
+    Создает менеджер задач с замоканным Redis.
+
+    :returns: Менеджер задач и мок кэша.
+    :rtype: tuple[ImportJobManager, MagicMock]
+    """
+    cache = MagicMock()
+    cache.hset = AsyncMock(return_value=True)
+    cache.hgetall = AsyncMock(return_value={})
+    cache.delete = AsyncMock()
+    return ImportJobManager(cache, fake_session, **kwargs), cache
+
+
+async def wait_for_status(cache: MagicMock, status: str) -> dict:
+    """
+    Ждет, пока последнее сохраненное состояние задачи получит нужный статус.
+
+    :returns: Последнее сохраненное состояние.
+    :rtype: dict
+    """
+    for _ in range(100):
+        if cache.hset.call_args and cache.hset.call_args.args[1]["status"] == status:
+            return cache.hset.call_args.args[1]
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job did not reach status {status}")
+
+
+async def test_import_job_saves_progress_and_completes(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что задача сохраняет прогресс в Redis после каждой пачки и завершается со статусом completed.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+
+    async def fake_ingest(db: MagicMock, count: int, on_progress: AsyncMock) -> UserImportStats:
+        await on_progress(UserImportStats(fetched=100, inserted=90, duplicates=10, processed=100))
+        stats = UserImportStats(fetched=count, inserted=180, duplicates=15, failed=5, processed=count)
+        await on_progress(stats)
+        return stats
+
+    mocker.patch("app.services.import_jobs.ingest_random_users", new=fake_ingest)
+    manager, cache = make_manager()
+
+    job = await manager.submit(200)
+    assert job.status == "queued"
+
+    state = await wait_for_status(cache, "completed")
+    await manager.shutdown()
+
+    assert state.pop("updated_at")
+    assert state == {
+        "job_id": job.job_id,
+        "status": "completed",
+        "count": 200,
+        "fetched": 200,
+        "inserted": 180,
+        "duplicates": 15,
+        "failed": 5,
+        "processed": 200,
+    }
+    statuses = [call.args[1]["status"] for call in cache.hset.call_args_list]
+    assert statuses == ["queued", "running", "running", "running", "completed"]
+    assert cache.hset.call_args.args[0] == f"import_job:{job.job_id}"
+
+
+async def test_import_job_records_failure(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что ошибка загрузки сохраняется в состоянии задачи.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    mocker.patch("app.services.import_jobs.ingest_random_users", new=AsyncMock(side_effect=RuntimeError("API down")))
+    manager, cache = make_manager()
+
+    await manager.submit(10)
+    state = await wait_for_status(cache, "failed")
+    await manager.shutdown()
+
+    assert state["error"] == "API down"
+
+
+async def test_import_job_queue_is_bounded(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что при заполненной очереди новая задача отклоняется.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    release = asyncio.Event()
+
+    async def blocked_ingest(*args: object, **kwargs: object) -> UserImportStats:
+        await release.wait()
+        return UserImportStats()
+
+    mocker.patch("app.services.import_jobs.ingest_random_users", new=blocked_ingest)
+    manager, cache = make_manager(workers=1, queue_size=1)
+
+    await manager.submit(10)
+    await wait_for_status(cache, "running")
+    await manager.submit(10)
+    with pytest.raises(ImportQueueFullError):
+        await manager.submit(10)
+
+    release.set()
+    await manager.shutdown()
+
+
+async def test_import_job_queued_state_does_not_overwrite_running(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что медленное сохранение статуса queued не перезаписывает статус задачи, уже взятой воркером.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    mocker.patch("app.services.import_jobs.ingest_random_users", new=AsyncMock(return_value=UserImportStats()))
+    manager, cache = make_manager(workers=1)
+    stored = {}
+
+    async def slow_hset(key: str, mapping: dict, ttl: int) -> bool:
+        # Запись queued доходит до Redis позже, чем свободный воркер успевает выполнить задачу
+        if mapping["status"] == "queued":
+            await asyncio.sleep(0.05)
+        stored[key] = mapping
+        return True
+
+    cache.hset.side_effect = slow_hset
+    await manager.submit(0)
+    await wait_for_status(cache, "completed")
+
+    job = await manager.submit(0)
+    await asyncio.sleep(0.1)
+    await manager.shutdown()
+
+    assert stored[f"import_job:{job.job_id}"]["status"] == "completed"
+
+
+async def test_import_job_is_rejected_when_state_is_not_stored(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что задача, состояние которой не удалось сохранить в Redis, не ставится в очередь.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    ingest = mocker.patch("app.services.import_jobs.ingest_random_users", new=AsyncMock())
+    manager, cache = make_manager()
+    cache.hset.return_value = False
+
+    with pytest.raises(ImportJobStoreError):
+        await manager.submit(10)
+    await asyncio.sleep(0)
+
+    assert manager._queue.empty()
+    assert not manager._tasks
+    ingest.assert_not_awaited()
+
+
+async def test_import_job_runs_in_chunks(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что задача разбивается на чанки, а счетчики чанков суммируются.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    counts = []
+
+    async def fake_ingest(db: MagicMock, count: int, on_progress: AsyncMock) -> UserImportStats:
+        counts.append(count)
+        stats = UserImportStats(fetched=count, inserted=count - 1, duplicates=1, processed=count)
+        await on_progress(stats)
+        return stats
+
+    mocker.patch("app.services.import_jobs.ingest_random_users", new=fake_ingest)
+    mocker.patch("app.services.import_jobs.settings.IMPORT_CHUNK_SIZE", 40)
+    manager, cache = make_manager()
+
+    await manager.submit(100)
+    state = await wait_for_status(cache, "completed")
+    await manager.shutdown()
+
+    assert counts == [40, 40, 20]
+    assert state["processed"] == 100
+    assert state["inserted"] == 97
+    assert state["duplicates"] == 3
+
+
+async def wait_for_job(manager: ImportJobManager, job_id: str, status: str) -> UserImportJob:
+    """
+    Ждет, пока сохраненное в Redis состояние задачи получит нужный статус.
+
+    :returns: Сохраненное состояние задачи.
+    :rtype: UserImportJob
+    """
+    for _ in range(100):
+        if (job := await manager.get(job_id)) is not None and job.status == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job did not reach status {status}")
+
+
+async def store_job(cache: RedisCache, job: UserImportJob) -> None:
+    """
+    Записывает состояние задачи в Redis так же, как менеджер задач.
+
+    :returns: None
+    """
+    await cache.hset(ImportJobManager.job_key(job.job_id), job.model_dump(mode="json", exclude_none=True))
+
+
+async def test_import_job_resumes_from_checkpoint(redis_cache: RedisCache, mocker: MockerFixture) -> None:
+    """
+    Проверяет, что прерванная задача продолжается с сохраненного счетчика processed без прежней ошибки.
+
+    :param redis_cache: Клиент кэша поверх fakeredis.
+    :type redis_cache: RedisCache
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    release = asyncio.Event()
+    counts = []
+
+    async def blocked_ingest(db: MagicMock, count: int, on_progress: AsyncMock) -> UserImportStats:
+        counts.append(count)
+        await release.wait()
+        return UserImportStats()
+
+    mocker.patch("app.services.import_jobs.ingest_random_users", new=blocked_ingest)
+    manager = ImportJobManager(redis_cache, fake_session)
+    job = UserImportJob(
+        job_id="abc", status="failed", count=100, fetched=60, inserted=60, processed=60, error="API down"
+    )
+    await store_job(redis_cache, job)
+
+    assert (await manager.resume("abc")).status == "queued"
+    state = await wait_for_job(manager, "abc", "running")
+    assert state.error is None
+    assert state.processed == 60
+
+    release.set()
+    state = await wait_for_job(manager, "abc", "failed")
+    await manager.shutdown()
+
+    assert counts == [40]
+    assert state.error == "Import chunk made no progress"
+    assert 0 < await redis_cache.client.ttl("import_job:abc") <= settings.IMPORT_JOB_TTL
+
+
+async def test_import_job_resume_rejects_active_job(redis_cache: RedisCache) -> None:
+    """
+    Проверяет, что возобновить нельзя задачу в очереди и выполняющуюся задачу с живым воркером.
+
+    :param redis_cache: Клиент кэша поверх fakeredis.
+    :type redis_cache: RedisCache
+    :returns: None
+    """
+    manager = ImportJobManager(redis_cache, fake_session)
+    hour_ago = datetime.now(UTC) - timedelta(hours=1)
+
+    for job in (
+        UserImportJob(job_id="abc", status="running", count=100, updated_at=datetime.now(UTC)),
+        UserImportJob(job_id="abc", status="queued", count=100, updated_at=hour_ago),
+        UserImportJob(job_id="abc", status="completed", count=100, updated_at=hour_ago),
+    ):
+        await store_job(redis_cache, job)
+        with pytest.raises(ValueError, match="cannot be resumed"):
+            await manager.resume("abc")
+
+    await store_job(redis_cache, UserImportJob(job_id="abc", status="running", count=0, updated_at=hour_ago))
+    assert (await manager.resume("abc")).status == "queued"
+    await wait_for_job(manager, "abc", "completed")
+    await manager.shutdown()
+
+    assert await manager.resume("missing") is None
+
+
+async def test_import_job_resume_claims_job_once(redis_cache: RedisCache, mocker: MockerFixture) -> None:
+    """
+    Проверяет, что из двух вызовов resume, прочитавших одно состояние, задачу ставит в очередь только один.
+
+    :param redis_cache: Клиент кэша поверх fakeredis.
+    :type redis_cache: RedisCache
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    ingest = mocker.patch("app.services.import_jobs.ingest_random_users", new=AsyncMock(return_value=UserImportStats()))
+    manager = ImportJobManager(redis_cache, fake_session)
+    job = UserImportJob(job_id="abc", status="interrupted", count=10, updated_at=datetime.now(UTC))
+    await store_job(redis_cache, job)
+    read = await manager.get("abc")
+
+    # Оба вызова читают состояние до того, как любой из них поставит задачу
+    with patch.object(manager, "get", AsyncMock(side_effect=lambda job_id: read.model_copy())):
+        await manager.resume("abc")
+        with pytest.raises(ValueError, match="cannot be resumed"):
+            await manager.resume("abc")
+    await wait_for_job(manager, "abc", "failed")
+    await manager.shutdown()
+
+    ingest.assert_awaited_once()
+
+
+async def test_import_job_resume_keeps_state_when_queue_is_full(redis_cache: RedisCache, mocker: MockerFixture) -> None:
+    """
+    Проверяет, что при заполненной очереди состояние возобновляемой задачи не меняется.
+
+    :param redis_cache: Клиент кэша поверх fakeredis.
+    :type redis_cache: RedisCache
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    release = asyncio.Event()
+
+    async def blocked_ingest(*args: object, **kwargs: object) -> UserImportStats:
+        await release.wait()
+        return UserImportStats()
+
+    mocker.patch("app.services.import_jobs.ingest_random_users", new=blocked_ingest)
+    manager = ImportJobManager(redis_cache, fake_session, workers=1, queue_size=1)
+    running = await manager.submit(10)
+    await wait_for_job(manager, running.job_id, "running")
+    await manager.submit(10)
+    job = UserImportJob(job_id="abc", status="failed", count=100, processed=60, error="API down")
+    await store_job(redis_cache, job)
+
+    with pytest.raises(ImportQueueFullError):
+        await manager.resume("abc")
+    assert await manager.get("abc") == job
+
+    release.set()
+    await manager.shutdown()
+
+
+async def test_import_job_heartbeat_refreshes_running_job(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что выполняющаяся задача обновляет updated_at, даже пока чанк не загружен.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    release = asyncio.Event()
+
+    async def blocked_ingest(*args: object, **kwargs: object) -> UserImportStats:
+        await release.wait()
+        return UserImportStats()
+
+    mocker.patch("app.services.import_jobs.ingest_random_users", new=blocked_ingest)
+    mocker.patch("app.services.import_jobs.settings.IMPORT_JOB_HEARTBEAT", 0.01)
+    manager, cache = make_manager()
+
+    await manager.submit(10)
+    await asyncio.sleep(0.1)
+    updates = [call.args[1]["updated_at"] for call in cache.hset.call_args_list if call.args[1]["status"] == "running"]
+    assert len(set(updates)) > 2
+
+    release.set()
+    await wait_for_status(cache, "failed")
+    calls = cache.hset.await_count
+    await asyncio.sleep(0.05)
+    await manager.shutdown()
+
+    assert cache.hset.await_count == calls
+
+
+async def test_import_job_shutdown_interrupts_queued_jobs(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что при остановке задачи, ждавшие в очереди, получают статус interrupted.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+
+    async def blocked_ingest(*args: object, **kwargs: object) -> UserImportStats:
+        await asyncio.Event().wait()
+        return UserImportStats()
+
+    mocker.patch("app.services.import_jobs.ingest_random_users", new=blocked_ingest)
+    manager, cache = make_manager(workers=1)
+
+    first = await manager.submit(10)
+    await wait_for_status(cache, "running")
+    second = await manager.submit(10)
+    await manager.shutdown()
+
+    states = {call.args[0]: call.args[1]["status"] for call in cache.hset.call_args_list}
+    assert states == {f"import_job:{first.job_id}": "interrupted", f"import_job:{second.job_id}": "interrupted"}
@@ -29,6 +29,15 @@ async def test_app_lifespan_success(mocker: MockerFixture) -> None:
 
     # Мокаем cache.close
     mock_cache_close = mocker.patch("app.core.cache.cache.close", new=AsyncMock())
+    mock_start_listener = mocker.patch("app.core.cache.cache.start_listener", new=AsyncMock())
+
+    # Мокаем пул случайных пользователей
+    mock_random_pool = mocker.patch("app.lifecycle.lifespan_events.random_pool")
+    mock_random_pool.start = AsyncMock()
+    mock_random_pool.stop = AsyncMock()
+    mock_existence_filter = mocker.patch("app.lifecycle.lifespan_events.existence_filter")
+    mock_existence_filter.start = AsyncMock()
+    mock_existence_filter.stop = AsyncMock()
 
     # Создаём тестовое FastAPI приложение
     app = FastAPI()
@@ -40,6 +49,10 @@ async def test_app_lifespan_success(mocker: MockerFixture) -> None:
         mock_fetch_and_save_users.assert_called_once_with(ANY, 1000)
         mock_close.assert_not_called()
         mock_cache_close.assert_not_called()
+        mock_random_pool.start.assert_awaited_once()
+        mock_existence_filter.start.assert_awaited_once()
+        mock_start_listener.assert_awaited_once()
+        mock_random_pool.stop.assert_not_called()
         assert mock_logger_info.call_count == 3
         mock_logger_info.assert_any_call("Application startup...")
         mock_logger_info.assert_any_call("Fetching initial users...")
@@ -48,6 +61,8 @@ async def test_app_lifespan_success(mocker: MockerFixture) -> None:
     # Проверяем вызовы после выхода из контекста
     mock_close.assert_called_once()
     mock_cache_close.assert_called_once()
+    mock_random_pool.stop.assert_awaited_once()
+    mock_existence_filter.stop.assert_awaited_once()
     assert mock_logger_info.call_count == 5
     mock_logger_info.assert_any_call("Application shutdown...")
     mock_logger_info.assert_any_call("Application shutdown complete.")
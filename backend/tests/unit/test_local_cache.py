@@ -0,0 +1,95 @@
+from unittest.mock import AsyncMock, MagicMock
+
+from pytest_mock import MockerFixture
+
+from app.core.cache import INVALIDATION_CHANNEL, LocalCache, RedisCache
+
+
+def make_cache(local: LocalCache) -> tuple[RedisCache, MagicMock]:
+    """
+    Создает RedisCache с кэшем процесса и замоканным клиентом Redis.
+
+    :returns: Кэш и мок клиента Redis.
+    :rtype: tuple[RedisCache, MagicMock]
+    """
+    client = MagicMock()
+    client.get = AsyncMock(return_value=None)
+    client.mget = AsyncMock(side_effect=lambda keys: [None] * len(keys))
+    client.setex = AsyncMock()
+    cache = RedisCache(local)
+    cache._client = cache._raw_client = client
+    return cache, client
+
+
+def test_local_cache_evicts_least_recently_used() -> None:
+    """
+    Проверяет вытеснение давно использованных записей и подсчет статистики.
+
+    :returns: None
+    """
+    local = LocalCache(max_size=2, ttl=60)
+    local.set("a", 1)
+    local.set("b", 2)
+    assert local.get("a") == 1
+    local.set("c", 3)
+
+    assert local.get("b") is None
+    assert local.get("a") == 1
+    assert local.get("c") == 3
+    assert local.stats() == {"hits": 3, "misses": 1, "evictions": 1, "size": 2}
+
+
+def test_local_cache_expires_entries(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что записи истекают через TTL.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    now = mocker.patch("app.core.cache.time.monotonic", return_value=100.0)
+    local = LocalCache(max_size=10, ttl=30)
+    local.set("a", 1)
+
+    now.return_value = 129.0
+    assert local.get("a") == 1
+    now.return_value = 131.0
+    assert local.get("a") is None
+    assert local.stats()["size"] == 0
+
+
+async def test_redis_cache_serves_user_keys_from_local_cache() -> None:
+    """
+    Проверяет, что ключи пользователей читаются из памяти процесса без обращения к Redis.
+
+    :returns: None
+    """
+    cache, client = make_cache(LocalCache(max_size=10, ttl=60))
+    await cache.set("user:1", {"id": 1})
+    await cache.set("users:0:block=0", [1])
+
+    assert await cache.get("user:1") == {"id": 1}
+    client.get.assert_not_awaited()
+    assert await cache.get_many(["user:1", "user:2", "users:0:block=0"]) == [{"id": 1}, None, None]
+    client.mget.assert_awaited_once_with(["user:2", "users:0:block=0"])
+
+
+async def test_redis_cache_delete_publishes_invalidation() -> None:
+    """
+    Проверяет, что удаление ключа пользователя сбрасывает кэш процесса и рассылается остальным воркерам.
+
+    :returns: None
+    """
+    local = LocalCache(max_size=10, ttl=60)
+    cache, client = make_cache(local)
+    pipe = MagicMock()
+    client.pipeline.return_value.__aenter__.return_value = pipe
+    pipe.execute = AsyncMock()
+    local.set("user:1", {"id": 1})
+
+    await cache.delete_many(["user:1", "users:generation"])
+
+    assert local.get("user:1") is None
+    pipe.delete.assert_called_once_with("user:1", "users:generation")
+    pipe.publish.assert_called_once_with(INVALIDATION_CHANNEL, "user:1")
+    pipe.execute.assert_awaited_once()
@@ -0,0 +1,118 @@
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from pytest_mock import MockerFixture
+
+from app.core.cache import RedisCache
+from app.schemas.user import UserOut
+from app.services.random_pool import (
+    EVICT_SCRIPT,
+    POOL_EVICTED_KEY,
+    POOL_INDEX_KEY,
+    POOL_KEY,
+    REBUILD_SCRIPT,
+    RandomUserPool,
+)
+
+
+@asynccontextmanager
+async def fake_session() -> AsyncGenerator[MagicMock, None]:
+    """Фабрика сессий, не подключающаяся к БД."""
+    yield MagicMock()
+
+
+def make_user(user_id: int) -> UserOut:
+    """
+    Создает пользователя для пула.
+
+    :param user_id: ID пользователя.
+    :type user_id: int
+    :returns: Пользователь.
+    :rtype: UserOut
+    """
+    return UserOut(
+        id=user_id,
+        created_at=datetime.now(UTC),
+        gender="female",
+        first_name="Ann",
+        last_name="Lee",
+        phone="123",
+        email=f"ann{user_id}@example.com",
+        picture="http://example.com/ann.jpg",
+    )
+
+
+def make_pool() -> tuple[RandomUserPool, MagicMock]:
+    """
+    Создает пул с замоканным клиентом Redis.
+
+    :returns: Пул и мок клиента Redis.
+    :rtype: tuple[RandomUserPool, MagicMock]
+    """
+    cache = RedisCache()
+    cache._client = MagicMock()
+    cache.client.srandmember = AsyncMock(return_value=None)
+    cache.client.set = AsyncMock(return_value=True)
+    cache.client.eval = AsyncMock(return_value=2)
+    return RandomUserPool(cache, fake_session, size=2, interval=60), cache.client
+
+
+async def test_pick_decodes_pool_member() -> None:
+    """
+    Проверяет, что пользователи из пула десериализуются без обращения к БД.
+
+    :returns: None
+    """
+    pool, client = make_pool()
+    assert await pool.pick() is None
+
+    user = make_user(7)
+    client.srandmember.return_value = user.model_dump_json()
+    assert await pool.pick() == user
+    client.srandmember.assert_awaited_with(POOL_KEY)
+
+
+async def test_refresh_rebuilds_pool(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что пул пересобирается из выборки и пропускается без блокировки.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    users = [make_user(1), make_user(5)]
+    get_random_users = mocker.patch("app.services.random_pool.get_random_users", new=AsyncMock(return_value=users))
+    pool, client = make_pool()
+
+    assert await pool.refresh() == 2
+    get_random_users.assert_awaited_once()
+    assert get_random_users.await_args.args[1] == 2
+    client.eval.assert_awaited_once_with(
+        REBUILD_SCRIPT,
+        3,
+        POOL_KEY,
+        POOL_INDEX_KEY,
+        POOL_EVICTED_KEY,
+        1,
+        users[0].model_dump_json(),
+        5,
+        users[1].model_dump_json(),
+    )
+
+    client.set.return_value = None
+    assert await pool.refresh() == 0
+    get_random_users.assert_awaited_once()
+
+
+async def test_evict_removes_user() -> None:
+    """
+    Проверяет, что вытеснение выполняется одним скриптом по ID пользователя.
+
+    :returns: None
+    """
+    pool, _ = make_pool()
+    pipe = MagicMock()
+    pool.queue_evict(pipe, 5)
+    pipe.eval.assert_called_once_with(EVICT_SCRIPT, [POOL_KEY, POOL_INDEX_KEY, POOL_EVICTED_KEY], [5, 120])
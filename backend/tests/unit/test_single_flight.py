@@ -0,0 +1,82 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.core.cache import RELEASE_LOCK_SCRIPT, RedisCache, SingleFlight
+
+
+async def test_single_flight_coalesces_concurrent_loads() -> None:
+    """
+    Проверяет, что одновременные загрузки одного ключа выполняются один раз.
+
+    :returns: None
+    """
+    flights = SingleFlight()
+    release = asyncio.Event()
+    calls = []
+
+    async def load() -> bool:
+        calls.append(1)
+        return await release.wait()
+
+    waiters = [asyncio.create_task(flights.do("user:1", load)) for _ in range(5)]
+    other = asyncio.create_task(flights.do("user:2", load))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*waiters, other) == [True] * 6
+    assert len(calls) == 2
+    assert flights._calls == {}
+
+
+async def test_single_flight_shares_errors_and_survives_cancellation() -> None:
+    """
+    Проверяет, что ошибка загрузки получают все ожидающие, а отмена одного из них не отменяет загрузку.
+
+    :returns: None
+    """
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def failing_load() -> None:
+        await release.wait()
+        raise RuntimeError("DB down")
+
+    leader = asyncio.create_task(flights.do("user:1", failing_load))
+    follower = asyncio.create_task(flights.do("user:1", failing_load))
+    await asyncio.sleep(0)
+    leader.cancel()
+    release.set()
+
+    with pytest.raises(RuntimeError, match="DB down"):
+        await follower
+    assert leader.cancelled()
+
+
+async def test_single_flight_waits_for_lock_of_other_worker(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что при занятой блокировке Redis загрузка выполняется после ее снятия, а своя блокировка снимается.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    mocker.patch("app.core.cache.settings.SINGLE_FLIGHT_LOCK_TTL", 1)
+    mocker.patch("app.core.cache.LOCK_POLL_INTERVAL", 0)
+    cache = RedisCache()
+    cache._client = client = MagicMock()
+    client.set = AsyncMock(side_effect=[None, True])
+    client.exists = AsyncMock(side_effect=[1, 1, 0])
+    client.eval = AsyncMock()
+    load = AsyncMock(return_value="user")
+
+    assert await cache.single_flight("user:1", load) == "user"
+    assert client.exists.await_count == 3
+    client.eval.assert_not_awaited()
+
+    assert await cache.single_flight("user:1", load) == "user"
+    lock_token = client.set.await_args.args[1]
+    client.eval.assert_awaited_once_with(RELEASE_LOCK_SCRIPT, 1, "lock:user:1", lock_token)
+    assert load.await_count == 2
@@ -0,0 +1,71 @@
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+from pytest_mock import MockerFixture
+
+from app.core.cache import RedisCache
+from app.services.user_existence import EXISTS_BUILD_KEY, EXISTS_KEY, MERGE_SCRIPT, UserExistenceFilter
+
+
+@asynccontextmanager
+async def fake_session() -> AsyncGenerator[MagicMock, None]:
+    """Фабрика сессий, не подключающаяся к БД."""
+    yield MagicMock()
+
+
+def make_filter() -> tuple[UserExistenceFilter, MagicMock]:
+    """
+    Создает включенный фильтр с замоканным клиентом Redis.
+
+    :returns: Фильтр и мок клиента Redis.
+    :rtype: tuple[UserExistenceFilter, MagicMock]
+    """
+    cache = RedisCache()
+    cache._client = cache._raw_client = client = MagicMock()
+    client.set = AsyncMock(return_value=True)
+    client.eval = AsyncMock(return_value=1)
+    return UserExistenceFilter(cache, fake_session, enabled=True, interval=600), client
+
+
+async def test_build_sets_bits_of_existing_users(mocker: MockerFixture) -> None:
+    """
+    Проверяет, что карта строится пачками ID с битом готовности и объединяется с текущей одним скриптом.
+
+    :param mocker: Фикстура для создания моков.
+    :type mocker: MockerFixture
+    :returns: None
+    """
+    mocker.patch("app.services.user_existence.BUILD_BATCH_SIZE", 2)
+    get_ids = mocker.patch(
+        "app.services.user_existence.get_user_ids_after", new=AsyncMock(side_effect=[[1, 3], [9], []])
+    )
+    existence, client = make_filter()
+
+    assert await existence.build() == 3
+    assert [call.args[2] for call in get_ids.await_args_list] == [0, 3, 9]
+    client.eval.assert_awaited_once_with(MERGE_SCRIPT, 2, EXISTS_KEY, EXISTS_BUILD_KEY, bytes([0b11010000, 0b01000000]))
+
+    client.set.return_value = None
+    assert await existence.build() == 0
+
+
+async def test_might_exist_trusts_only_built_map() -> None:
+    """
+    Проверяет, что ID отсеиваются только по построенной карте, а без нее все ID считаются возможными.
+
+    :returns: None
+    """
+    existence, client = make_filter()
+    operation = client.bitfield.return_value
+    operation.execute = AsyncMock(return_value=[1, 1, 0])
+
+    assert await existence.might_exist([5, 7]) == [5]
+    client.bitfield.assert_called_once_with(EXISTS_KEY)
+    assert [call.args for call in operation.get.call_args_list] == [("u1", 0), ("u1", 5), ("u1", 7)]
+
+    operation.execute.return_value = [0, 0, 0]
+    assert await existence.might_exist([5, 7]) == [5, 7]
+
+    existence.enabled = False
+    assert await existence.might_exist([5, 7]) == [5, 7]
@@ -0,0 +1,45 @@
+from unittest.mock import AsyncMock, MagicMock
+
+from app.core.cache import SET_IF_VERSION_SCRIPT, CacheCodec, CachePipeline, LocalCache, RedisCache
+
+
+async def test_set_many_if_unchanged_skips_updated_keys() -> None:
+    """
+    Проверяет, что значения пишутся с версиями, прочитанными до загрузки, и в кэш процесса попадают только записанные.
+
+    :returns: None
+    """
+    local = LocalCache(max_size=10, ttl=60)
+    cache = RedisCache(local)
+    cache._client = cache._raw_client = client = MagicMock()
+    client.mget = AsyncMock(return_value=["3", None])
+    client.eval = AsyncMock(return_value=[0, 1])
+
+    versions = await cache.get_versions(["user:1", "user:2"])
+    assert versions == {"user:1": "3", "user:2": "0"}
+    client.mget.assert_awaited_once_with(["version:user:1", "version:user:2"])
+
+    await cache.set_many_if_unchanged({"user:1": {"id": 1}, "user:2": {"id": 2}}, versions, ttl=60)
+    args = client.eval.await_args.args
+    assert args[:6] == (SET_IF_VERSION_SCRIPT, 4, "user:1", "user:2", "version:user:1", "version:user:2")
+    assert args[6:9] == (60, "3", "0")
+    assert local.get("user:1") is None
+    assert local.get("user:2") == {"id": 2}
+
+
+def test_set_versioned_bumps_version_and_invalidates_other_workers() -> None:
+    """
+    Проверяет, что запись через конвейер увеличивает версию ключа и сбрасывает его в кэше процессов.
+
+    :returns: None
+    """
+    local = LocalCache(max_size=10, ttl=60)
+    local.set("user:1", {"id": 1, "first_name": "Old"})
+    pipe = MagicMock()
+
+    CachePipeline(pipe, CacheCodec(), local).set_versioned("user:1", {"id": 1, "first_name": "New"}, ttl=60)
+
+    pipe.incr.assert_called_once_with("version:user:1")
+    assert pipe.setex.call_args.args[:2] == ("user:1", 60)
+    pipe.publish.assert_called_once()
+    assert local.get("user:1") is None
@@ -1,4 +1,5 @@
 import asyncio
+from collections.abc import AsyncIterator
 
 from faker import Faker
 
@@ -50,3 +51,19 @@ async def fake_fetch_random_users(count: int) -> dict:
         results.append(user)
     await asyncio.sleep(0)
     return {"results": results}
+
+
+async def fake_iter_random_users(count: int, concurrency: int | None = None) -> AsyncIterator[list[dict]]:
+    """
+    Асинхронно отдает фейковых пользователей страницами по 100 записей, как ``iter_random_users``.
+
+    :param count: Количество случайных пользователей для получения.
+    :type count: int
+    :param concurrency: Не используется, оставлен для совместимости сигнатуры.
+    :type concurrency: int | None
+    :return: Асинхронный итератор страниц пользователей.
+    :rtype: AsyncIterator[list[dict]]
+    """
+    for i in range(0, count, 100):
+        page = await fake_fetch_random_users(min(100, count - i))
+        yield page["results"]